@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+タスク行シリアライズのベンチマーク（従来経路 vs orjson直接エンコード）
+
+目的・理由:
+- GET /tasks の1ページ分の行をJSONのバイト列にするまでのCPU時間を比較する
+  - 従来経路: 行ごとにTaskResponseを生成（str()/isoformat()）→ FastAPIのresponse_model処理
+    （model_dump → 再検証 → mode="json"でダンプ）→ 標準jsonでエンコード
+  - 新経路: task_dict()で列を選び、TaskJSONResponse（orjson）でエンコード
+- DBアクセスを含まないため、シリアライズ部分のみの差を測定できる
+
+影響範囲:
+- なし（プロセス内で完結、DB接続不要）
+
+前提条件・制約:
+- asyncpgのRecordは直接生成できないため、同じキーを持つ辞書で代用する
+  （Recordのキー参照は辞書と同程度のコスト）
+
+使い方:
+    python benchmarks/bench_serialization.py --page-sizes 20 100 --repeat 2000
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "app"))
+
+from api.serialization import TaskJSONResponse, task_dict  # noqa: E402
+from api.tasks import TaskListResponse, TaskResponse  # noqa: E402
+
+
+def _make_rows(count: int) -> list[dict]:
+    """ベンチマーク用の行（日本語を含むタイトル・説明、マイクロ秒付きの日時）"""
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": uuid.uuid4(),
+            "title": f"X-Ray検証タスク{i}",
+            "description": "AWS X-Rayの分散トレーシング検証" * 3,
+            "status": ("pending", "in_progress", "completed")[i % 3],
+            "created_at": base - timedelta(seconds=i, microseconds=i),
+            "updated_at": base - timedelta(microseconds=i),
+            "version": 1 + i % 3,
+        }
+        for i in range(count)
+    ]
+
+
+def legacy_path(rows: list[dict]) -> bytes:
+    """
+    従来経路
+
+    目的・理由:
+    - エンドポイントでのTaskResponse生成と、FastAPI 0.109のserialize_response
+      （_prepare_response_content → field.validate → field.serialize）、
+      JSONResponse.render（json.dumps）を同じ順序で再現する
+    """
+    content = TaskListResponse(
+        tasks=[
+            TaskResponse(
+                id=str(row["id"]),
+                title=row["title"],
+                description=row["description"],
+                status=row["status"],
+                created_at=row["created_at"].isoformat() + "Z",
+                updated_at=row["updated_at"].isoformat() + "Z",
+                version=row["version"],
+            )
+            for row in rows
+        ],
+        total=len(rows),
+        limit=len(rows),
+        offset=0,
+        next_cursor=None,
+        count_mode="exact",
+    )
+    prepared = content.model_dump(by_alias=True, exclude_unset=False)
+    validated = TaskListResponse.model_validate(prepared)
+    jsonable = validated.model_dump(mode="json")
+    return json.dumps(jsonable, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def fast_path(rows: list[dict]) -> bytes:
+    """新経路（list_tasksと同じ辞書をTaskJSONResponseでエンコード）"""
+    content = {
+        "tasks": [task_dict(row) for row in rows],
+        "total": len(rows),
+        "limit": len(rows),
+        "offset": 0,
+        "next_cursor": None,
+        "count_mode": "exact",
+    }
+    return TaskJSONResponse(content).body
+
+
+def _measure(func, rows: list[dict], repeat: int) -> float:
+    """1回あたりの平均時間（マイクロ秒）"""
+    for _ in range(min(repeat, 50)):
+        func(rows)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(rows)
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="タスク行シリアライズのベンチマーク")
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=[1, 20, 100])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>6} {'legacy us':>12} {'fast us':>10} {'speedup':>8} {'legacy req/s':>13} {'fast req/s':>11}")
+    for size in args.page_sizes:
+        rows = _make_rows(size)
+        legacy = _measure(legacy_path, rows, args.repeat)
+        fast = _measure(fast_path, rows, args.repeat)
+        print(
+            f"{size:>6} {legacy:>12.1f} {fast:>10.1f} {legacy / fast:>7.1f}x "
+            f"{1_000_000 / legacy:>13.0f} {1_000_000 / fast:>11.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
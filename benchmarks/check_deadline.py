@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+リクエスト期限ミドルウェアの検証（期限到達・クライアント切断によるキャンセル）
+
+目的・理由:
+- middleware.deadline.DeadlineMiddleware が、期限到達時に処理をキャンセルして504を返すこと、
+  クライアント切断時に処理をキャンセルすることを、スタブのASGIアプリで確認する
+- 本文を読まないリクエスト（GET等）でも切断を検知できることを確認する
+  （受信済みのhttp.requestがバッファに残り、切断を検知できなかった不具合の回帰確認）
+
+影響範囲:
+- なし（DB・ネットワークを使わない）
+
+前提条件・制約:
+- 1つでも想定と異なる結果があれば終了コード1で終了する
+
+使い方:
+    python benchmarks/check_deadline.py
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "app"))
+
+from middleware.deadline import DeadlineMiddleware  # noqa: E402
+
+# スタブのエンドポイントの処理時間（秒）
+HANDLER_SECONDS = 3.0
+
+# クライアントが切断するまでの時間（秒）
+DISCONNECT_AFTER_SECONDS = 0.2
+
+
+def _stub_app(read_body: bool, state: dict):
+    """HANDLER_SECONDS秒かかるエンドポイント（キャンセルされたかをstateに記録する）"""
+
+    async def app(scope, receive, send) -> None:
+        try:
+            if read_body:
+                more_body = True
+                while more_body:
+                    more_body = (await receive()).get("more_body", False)
+            await asyncio.sleep(HANDLER_SECONDS)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    return app
+
+
+async def _request(method: str, path: str, app, headers=(), disconnect_after=None) -> tuple[float, list[dict]]:
+    """
+    1リクエスト分の実行
+
+    目的・理由:
+    - 本文を1件で送り、disconnect_after秒後（Noneなら応答完了後）にhttp.disconnectを受け渡す
+    - 戻り値は (所要時間, 送信されたメッセージ)
+    """
+    scope = {"type": "http", "method": method, "path": path, "headers": list(headers)}
+    sent: list[dict] = []
+    disconnect = asyncio.Event()
+    messages = [{"type": "http.request", "body": b"{}" if method != "GET" else b"", "more_body": False}]
+
+    async def receive() -> dict:
+        if messages:
+            return messages.pop(0)
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        sent.append(message)
+
+    async def disconnect_later() -> None:
+        await asyncio.sleep(disconnect_after)
+        disconnect.set()
+
+    timer = asyncio.create_task(disconnect_later()) if disconnect_after is not None else None
+    start = time.perf_counter()
+    await DeadlineMiddleware(app)(scope, receive, send)
+    elapsed = time.perf_counter() - start
+    if timer is not None:
+        timer.cancel()
+    disconnect.set()
+    return elapsed, sent
+
+
+async def run() -> int:
+    """
+    検証本体
+
+    目的・理由:
+    - 切断（本文なし・本文あり）→ 期限到達 → 切断なしの完了 の順に確認する
+    """
+    failures = 0
+
+    def check(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'OK' if ok else 'NG'} {label}{f' ({detail})' if detail and not ok else ''}")
+
+    for method, read_body in (("GET", False), ("POST", True)):
+        state = {"cancelled": False}
+        elapsed, _ = await _request(
+            method, "/tasks/slow-db", _stub_app(read_body, state), disconnect_after=DISCONNECT_AFTER_SECONDS
+        )
+        check(
+            f"{method} is cancelled on client disconnect",
+            state["cancelled"] and elapsed < HANDLER_SECONDS / 2,
+            f"elapsed {elapsed:.1f}s cancelled {state['cancelled']}",
+        )
+
+    state = {"cancelled": False}
+    elapsed, sent = await _request(
+        "GET", "/tasks/slow-db", _stub_app(False, state), headers=[(b"x-request-timeout", b"0.5")]
+    )
+    status = sent[0]["status"] if sent else None
+    check(
+        "deadline cancels the handler and answers 504",
+        state["cancelled"] and status == 504 and elapsed < HANDLER_SECONDS / 2,
+        f"elapsed {elapsed:.1f}s cancelled {state['cancelled']} status {status}",
+    )
+
+    state = {"cancelled": False}
+    elapsed, sent = await _request("GET", "/tasks/slow-db", _stub_app(False, state))
+    status = sent[0]["status"] if sent else None
+    check(
+        "request without disconnect completes",
+        not state["cancelled"] and status == 200,
+        f"elapsed {elapsed:.1f}s cancelled {state['cancelled']} status {status}",
+    )
+
+    print(f"{failures} check(s) failed" if failures else "deadline middleware works")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    sys.exit(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    main()
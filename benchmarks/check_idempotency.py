@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+冪等キー（Idempotency-Key）の検証（起動中のAPIに対する再送の嵐）
+
+目的・理由:
+- 同じIdempotency-Keyで POST /tasks を同時に多数送り、タスクが1件だけ作成され、
+  残りはすべて同じ応答（Idempotent-Replayed: true）になることを確認する
+  （先行の処理中に届いた再送は先行の完了を待ち、完了後の再送は保存済みの応答を返す）
+- 新規作成と再送の応答時間を比較する（再送はインデックス参照のみ）
+
+影響範囲:
+- 起動中のAPI（検証用のタスクを作成し、終了時に削除する）
+
+前提条件・制約:
+- docker compose up -d で起動したAPIを想定（--base-urlで変更可能）
+- 1つでも想定と異なる結果があれば終了コード1で終了する
+
+使い方:
+    python benchmarks/check_idempotency.py --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+
+
+async def _post(client: httpx.AsyncClient, key: str, body: dict) -> tuple[httpx.Response, float]:
+    """POST /tasks（応答と所要時間ミリ秒）"""
+    started = time.perf_counter()
+    response = await client.post("/tasks", json=body, headers={"Idempotency-Key": key})
+    return response, (time.perf_counter() - started) * 1000
+
+
+async def run(base_url: str, concurrency: int) -> int:
+    """
+    検証本体
+
+    目的・理由:
+    - 同時送信 → 完了後の再送 → 異なる本文での再利用 の順に確認する
+    """
+    failures = 0
+
+    def check(label: str, ok: bool, detail: str = "") -> None:
+        nonlocal failures
+        failures += not ok
+        print(f"{'OK' if ok else 'NG'} {label}{f' ({detail})' if detail and not ok else ''}")
+
+    key = f"idempotency-check-{uuid.uuid4()}"
+    body = {"title": "idempotency check", "description": key}
+    async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+        results = await asyncio.gather(*(_post(client, key, body) for _ in range(concurrency)))
+        statuses = sorted({response.status_code for response, _ in results})
+        check("all concurrent requests succeed", statuses == [201], str(statuses))
+
+        ids = {response.json().get("id") for response, _ in results if response.status_code == 201}
+        check("a single task is created", len(ids) == 1, str(ids))
+
+        fresh = [ms for response, ms in results if response.headers.get("Idempotent-Replayed") != "true"]
+        check("only one request performs the insert", len(fresh) == 1, f"{len(fresh)} inserts")
+
+        replay, replay_ms = await _post(client, key, body)
+        check("retry after completion is replayed", replay.headers.get("Idempotent-Replayed") == "true")
+        check("replayed body matches", replay.json().get("id") in ids)
+
+        mismatch, _ = await _post(client, key, {**body, "title": "different"})
+        check("reuse with a different body is rejected", mismatch.status_code == 422, str(mismatch.status_code))
+
+        waited = [ms for response, ms in results if response.headers.get("Idempotent-Replayed") == "true"]
+        print(
+            f"first: {fresh[0] if fresh else 0:.1f}ms, concurrent retries p50: "
+            f"{statistics.median(waited) if waited else 0:.1f}ms, retry after completion: {replay_ms:.1f}ms"
+        )
+
+        for task_id in ids:
+            if task_id:
+                await client.delete(f"/tasks/{task_id}")
+
+    print(f"{failures} check(s) failed" if failures else "idempotency keys work")
+    return 1 if failures else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Idempotency-Key retry storm check for POST /tasks")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=50)
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(run(args.base_url, args.concurrency)))
+
+
+if __name__ == "__main__":
+    main()
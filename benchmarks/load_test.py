@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+HTTP負荷試験（起動中のAPIに対するシナリオ実行とルートごとの遅延レポート）
+
+目的・理由:
+- アプリケーション（src/app/main.py）がどれだけの負荷に耐えられるかを、同じ条件で繰り返し測定できるようにする
+- タスクのCRUD・検索と障害シミュレーション（/tasks/slow-*）を、シナリオごとの比率で混ぜて送る
+- 目標RPS（一定間隔で送信するオープンループ）または同時実行数（応答を待って次を送るクローズドループ）で負荷をかける
+- ルートごとのp50/p90/p99/最大の遅延・スループット・エラー率を表とJSONで出力し、
+  前回のJSON（--compare）との差分で性能の劣化をリリースごとに確認する
+
+影響範囲:
+- 起動中のAPI（試験中に作成したタスクは終了時に削除する。更新・削除は試験中に作成したタスクのみ）
+
+前提条件・制約:
+- docker compose up -d で起動したAPIを想定（--base-urlで変更可能）
+- 目標RPS指定時の遅延は、送信予定時刻からの時間（送信側の待ちを含め、遅い応答で送信が間引かれて遅延を過小評価しないため）
+- 開始後--warmup秒の結果は集計しない
+- 障害シミュレーション（slow・mixedシナリオ）はAPIをENABLE_FAULT_SIMULATION=trueで起動した場合のみ有効
+- 比較は同じシナリオ・負荷条件・データ量の結果どうしで行うこと（JSONのmetaに条件を記録する）
+- --compare指定時、劣化があれば終了コード1で終了する
+
+使い方:
+    python benchmarks/load_test.py --scenario crud --rps 200 --duration 60 --output results/crud-1.2.0.json
+    python benchmarks/load_test.py --scenario read --concurrency 50 --duration 60 --compare results/read-1.1.0.json
+    python benchmarks/load_test.py --mix list=70,get=30 --rps 500
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Optional
+
+import httpx
+
+# シナリオごとの操作の比率
+SCENARIOS: dict[str, dict[str, float]] = {
+    "crud": {"list": 30, "list_next": 10, "get": 25, "search": 5, "create": 15, "update": 10, "delete": 5},
+    "read": {"list": 40, "list_next": 15, "get": 35, "search": 10},
+    "write": {"create": 50, "update": 35, "delete": 15},
+    "slow": {"slow_db": 1, "slow_logic": 1, "slow_external": 1},
+    "mixed": {
+        "list": 25, "list_next": 5, "get": 25, "search": 5, "create": 10, "update": 8, "delete": 4,
+        "slow_db": 6, "slow_logic": 6, "slow_external": 6,
+    },
+}
+
+# 検索語（seed_tasks.pyの生成データに含まれる語）
+SEARCH_TERMS = ("API", "DB", "キャッシュ", "検索", "障害対応", "移行", "timeout", "latency", "インデックス", "通知")
+
+STATUSES = ("pending", "in_progress", "completed")
+
+# 操作ごとのルート名（集計の単位。IDはテンプレートにまとめる）
+ROUTES = {
+    "list": "GET /tasks",
+    "list_next": "GET /tasks?cursor",
+    "get": "GET /tasks/{id}",
+    "search": "GET /tasks/search",
+    "create": "POST /tasks",
+    "update": "PUT /tasks/{id}",
+    "delete": "DELETE /tasks/{id}",
+    "slow_db": "GET /tasks/slow-db",
+    "slow_logic": "GET /tasks/slow-logic",
+    "slow_external": "GET /tasks/slow-external",
+}
+
+# 集計する遅延のパーセンタイル
+PERCENTILES = (50, 90, 99)
+
+
+class RunState:
+    """
+    試験中の状態（操作間で共有）
+
+    前提条件・制約:
+    - known_idsは取得の対象（開始時の一覧 + 作成したタスク）
+    - own_idsは試験中に作成し、まだ削除していないタスク（更新・削除の対象、終了時に削除）
+    """
+
+    def __init__(self, client: httpx.AsyncClient, seed: int) -> None:
+        self.client = client
+        self.random = random.Random(seed)
+        self.known_ids: list[str] = []
+        self.own_ids: list[str] = []
+        self.next_cursor: Optional[str] = None
+        self.created = 0
+
+
+async def _list(state: RunState) -> tuple[str, httpx.Response]:
+    response = await state.client.get("/tasks", params={"limit": 20})
+    if response.status_code == 200:
+        state.next_cursor = response.json().get("next_cursor")
+    return ROUTES["list"], response
+
+
+async def _list_next(state: RunState) -> tuple[str, httpx.Response]:
+    if not state.next_cursor:
+        return await _list(state)
+    response = await state.client.get("/tasks", params={"limit": 20, "cursor": state.next_cursor})
+    if response.status_code == 200:
+        state.next_cursor = response.json().get("next_cursor")
+    return ROUTES["list_next"], response
+
+
+async def _get(state: RunState) -> tuple[str, httpx.Response]:
+    if not state.known_ids:
+        return await _list(state)
+    task_id = state.random.choice(state.known_ids)
+    return ROUTES["get"], await state.client.get(f"/tasks/{task_id}")
+
+
+async def _search(state: RunState) -> tuple[str, httpx.Response]:
+    params = {"q": state.random.choice(SEARCH_TERMS), "limit": 20}
+    return ROUTES["search"], await state.client.get("/tasks/search", params=params)
+
+
+async def _create(state: RunState) -> tuple[str, httpx.Response]:
+    state.created += 1
+    body = {"title": f"load test {state.created}", "description": "load test", "status": "pending"}
+    response = await state.client.post("/tasks", json=body)
+    if response.status_code == 201:
+        task_id = response.json()["id"]
+        state.known_ids.append(task_id)
+        state.own_ids.append(task_id)
+    return ROUTES["create"], response
+
+
+async def _update(state: RunState) -> tuple[str, httpx.Response]:
+    if not state.own_ids:
+        return await _create(state)
+    task_id = state.random.choice(state.own_ids)
+    body = {"status": state.random.choice(STATUSES)}
+    return ROUTES["update"], await state.client.put(f"/tasks/{task_id}", json=body)
+
+
+async def _delete(state: RunState) -> tuple[str, httpx.Response]:
+    if not state.own_ids:
+        return await _create(state)
+    task_id = state.own_ids.pop(state.random.randrange(len(state.own_ids)))
+    if task_id in state.known_ids:
+        state.known_ids.remove(task_id)
+    return ROUTES["delete"], await state.client.delete(f"/tasks/{task_id}")
+
+
+# 障害シミュレーションの操作（サーバーがENABLE_FAULT_SIMULATION=trueの場合のみ有効。無効時は403）
+SIMULATIONS = ("slow_db", "slow_logic", "slow_external")
+
+
+def _simulation(name: str):
+    """障害シミュレーションの操作（GET /tasks/slow-*）"""
+    path = ROUTES[name].removeprefix("GET ")
+
+    async def operation(state: RunState) -> tuple[str, httpx.Response]:
+        return ROUTES[name], await state.client.get(path)
+
+    return operation
+
+
+OPERATIONS = {
+    "list": _list,
+    "list_next": _list_next,
+    "get": _get,
+    "search": _search,
+    "create": _create,
+    "update": _update,
+    "delete": _delete,
+    "slow_db": _simulation("slow_db"),
+    "slow_logic": _simulation("slow_logic"),
+    "slow_external": _simulation("slow_external"),
+}
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """操作の比率（list=70,get=30）"""
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation: {name} (choose from {', '.join(OPERATIONS)})")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class Recorder:
+    """
+    結果の記録
+
+    目的・理由:
+    - 1リクエストごとに (ルート, 遅延ミリ秒, ステータスコード or 例外名) を保持し、終了後にルートごとに集計する
+    """
+
+    def __init__(self, measure_from: float) -> None:
+        self.measure_from = measure_from
+        self.samples: list[tuple[str, float, str]] = []
+
+    async def call(self, state: RunState, name: str, scheduled: float) -> None:
+        try:
+            route, response = await OPERATIONS[name](state)
+            outcome = str(response.status_code)
+        except Exception as e:
+            # タイムアウト・接続失敗・不正な応答等。1件の失敗で試験全体を止めない
+            route, outcome = ROUTES[name], type(e).__name__
+        if scheduled >= self.measure_from:
+            self.samples.append((route, (time.perf_counter() - scheduled) * 1000, outcome))
+
+
+def _percentile(values: list[float], p: float) -> float:
+    """パーセンタイル（最近順位法。valuesは昇順）"""
+    return values[min(len(values) - 1, max(0, math.ceil(p / 100 * len(values)) - 1))]
+
+
+def summarize(samples: list[tuple[str, float, str]], duration: float) -> dict[str, dict[str, Any]]:
+    """
+    ルートごとの集計
+
+    前提条件・制約:
+    - エラーは5xxと例外（タイムアウト・接続失敗等）。4xx（並行操作による404等）はステータス別件数にのみ含める
+    - "ALL" は全ルートの合計
+    """
+    groups: dict[str, list[tuple[float, str]]] = {}
+    for route, latency, outcome in samples:
+        groups.setdefault(route, []).append((latency, outcome))
+        groups.setdefault("ALL", []).append((latency, outcome))
+
+    summary = {}
+    for route, items in sorted(groups.items(), key=lambda item: (item[0] == "ALL", item[0])):
+        latencies = sorted(latency for latency, _ in items)
+        outcomes: dict[str, int] = {}
+        for _, outcome in items:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        errors = sum(count for outcome, count in outcomes.items() if not outcome.isdigit() or int(outcome) >= 500)
+        summary[route] = {
+            "requests": len(items),
+            "throughput_rps": round(len(items) / duration, 2),
+            "error_rate": round(errors / len(items), 4),
+            "statuses": dict(sorted(outcomes.items())),
+            "latency_ms": {
+                **{f"p{p}": round(_percentile(latencies, p), 2) for p in PERCENTILES},
+                "max": round(latencies[-1], 2),
+                "mean": round(sum(latencies) / len(latencies), 2),
+            },
+        }
+    return summary
+
+
+def print_table(summary: dict[str, dict[str, Any]]) -> None:
+    """人が読む表（ルートごと）"""
+    print(
+        f"{'route':<26} | {'requests':>8} | {'rps':>8} | {'err %':>6} | "
+        + " | ".join(f"{f'p{p} ms':>8}" for p in PERCENTILES)
+        + f" | {'max ms':>8}"
+    )
+    print("-" * 104)
+    for route, stats in summary.items():
+        latency = stats["latency_ms"]
+        print(
+            f"{route:<26} | {stats['requests']:>8} | {stats['throughput_rps']:>8.1f} | "
+            f"{stats['error_rate'] * 100:>6.2f} | "
+            + " | ".join(f"{latency[f'p{p}']:>8.1f}" for p in PERCENTILES)
+            + f" | {latency['max']:>8.1f}"
+        )
+
+
+def compare(summary: dict[str, dict[str, Any]], baseline: dict[str, Any], threshold: float) -> int:
+    """
+    前回の結果との比較
+
+    目的・理由:
+    - 共通のルートごとにp50/p99・スループット・エラー率の変化を表示し、閾値を超えた劣化を数える
+
+    前提条件・制約:
+    - 劣化: p99・p50がthreshold%超の増加、スループットがthreshold%超の減少、エラー率が1ポイント超の増加
+    - 負荷条件（meta）が異なる場合の警告は呼び出し元で行う
+    """
+    regressions = 0
+    print(f"\ncompared with {baseline['meta'].get('label') or baseline['meta'].get('started_at')}")
+    print(f"{'route':<26} | {'p50':>16} | {'p99':>16} | {'rps':>16} | {'err %':>13} |")
+    print("-" * 104)
+    for route, stats in summary.items():
+        before = baseline["routes"].get(route)
+        if before is None:
+            continue
+        # (前回, 今回, 大きいほど悪いか)
+        metrics = (
+            (before["latency_ms"]["p50"], stats["latency_ms"]["p50"], True),
+            (before["latency_ms"]["p99"], stats["latency_ms"]["p99"], True),
+            (before["throughput_rps"], stats["throughput_rps"], False),
+        )
+        changes = []
+        flagged = False
+        for old, new, higher_is_worse in metrics:
+            delta = (new - old) / old * 100 if old else 0.0
+            worse = delta > threshold if higher_is_worse else delta < -threshold
+            flagged |= worse
+            changes.append(f"{old:>7.1f}→{new:<7.1f}{'!' if worse else ' '}")
+        old_errors, new_errors = before["error_rate"] * 100, stats["error_rate"] * 100
+        worse = new_errors - old_errors > 1
+        flagged |= worse
+        changes.append(f"{old_errors:>5.2f}→{new_errors:<6.2f}{'!' if worse else ' '}")
+        regressions += flagged
+        print(f"{route:<26} | " + " | ".join(changes) + (" REGRESSION" if flagged else ""))
+    return regressions
+
+
+def _git_revision() -> Optional[str]:
+    """実行時のコミット（結果の識別用。取得できなければNone）"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).resolve().parent,
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def _open_loop(state: RunState, recorder: Recorder, names: list[str], weights: list[float], args) -> None:
+    """目標RPSで送信（応答を待たずに一定間隔で送り、遅延は送信予定時刻から測る）"""
+    interval = 1 / args.rps
+    started = time.perf_counter()
+    end = started + args.warmup + args.duration
+    pending: set[asyncio.Task] = set()
+    sent = 0
+    while True:
+        scheduled = started + sent * interval
+        if scheduled >= end:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        name = state.random.choices(names, weights)[0]
+        task = asyncio.create_task(recorder.call(state, name, scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        sent += 1
+    if pending:
+        await asyncio.gather(*pending)
+
+
+async def _closed_loop(state: RunState, recorder: Recorder, names: list[str], weights: list[float], args) -> None:
+    """同時実行数で送信（各ワーカーが応答を受けてから次を送る）"""
+    end = time.perf_counter() + args.warmup + args.duration
+
+    async def worker() -> None:
+        while time.perf_counter() < end:
+            name = state.random.choices(names, weights)[0]
+            await recorder.call(state, name, time.perf_counter())
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def run(args: argparse.Namespace) -> int:
+    """
+    負荷試験本体
+
+    目的・理由:
+    - 開始時の一覧で取得対象のIDを集め、指定の方式で負荷をかけ、集計・出力・比較・後片付けを行う
+    """
+    mix = args.mix or SCENARIOS[args.scenario]
+    names, weights = list(mix), list(mix.values())
+    connections = args.concurrency or args.max_connections
+    limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        state = RunState(client, args.seed)
+        health = await client.get("/health")
+        listing = await client.get("/tasks", params={"limit": 100, "fields": "id", "count": "none"})
+        state.known_ids = [task["id"] for task in listing.json().get("tasks", [])] if listing.is_success else []
+        initial_ids = len(state.known_ids)
+
+        started_at = datetime.now(timezone.utc)
+        measure_from = time.perf_counter() + args.warmup
+        recorder = Recorder(measure_from)
+        mode = f"{args.rps} rps" if args.rps else f"{args.concurrency} concurrent"
+        scenario = "custom mix" if args.mix else args.scenario
+        print(f"running {scenario} at {mode} for {args.duration}s (+{args.warmup}s warmup) against {args.base_url}")
+        if args.rps:
+            await _open_loop(state, recorder, names, weights, args)
+        else:
+            await _closed_loop(state, recorder, names, weights, args)
+
+        # 後片付け（試験中に作成して残っているタスク。集計対象外）
+        for task_id in state.own_ids:
+            await client.delete(f"/tasks/{task_id}")
+
+    summary = summarize(recorder.samples, args.duration)
+    print_table(summary)
+    if any("403" in summary.get(ROUTES[name], {}).get("statuses", {}) for name in SIMULATIONS):
+        print("⚠️ fault simulation is disabled on the server (start the app with ENABLE_FAULT_SIMULATION=true)")
+
+    result = {
+        "meta": {
+            "label": args.label,
+            "started_at": started_at.isoformat(),
+            "git_revision": _git_revision(),
+            "app_version": health.json().get("version") if health.is_success else None,
+            "base_url": args.base_url,
+            "scenario": None if args.mix else args.scenario,
+            "mix": mix,
+            "mode": "rps" if args.rps else "concurrency",
+            "target": args.rps or args.concurrency,
+            "duration_seconds": args.duration,
+            "warmup_seconds": args.warmup,
+            "seed": args.seed,
+            "initial_tasks_sampled": initial_ids,
+        },
+        "routes": summary,
+    }
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\nresults written to {args.output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        conditions = ("mix", "mode", "target", "duration_seconds")
+        differing = [key for key in conditions if baseline["meta"].get(key) != result["meta"][key]]
+        if differing:
+            print(f"⚠️ load conditions differ from the baseline: {', '.join(differing)}")
+        regressions = compare(summary, baseline, args.threshold)
+        print(f"{regressions} route(s) regressed" if regressions else "no regressions")
+        return 1 if regressions else 0
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTTP load test with per-route latency reports")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--scenario", choices=sorted(SCENARIOS), default="crud")
+    parser.add_argument("--mix", type=parse_mix, help="操作の比率（list=70,get=30）。指定時は--scenarioより優先")
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument("--rps", type=float, help="目標RPS（オープンループ）")
+    load.add_argument("--concurrency", type=int, help="同時実行数（クローズドループ）")
+    parser.add_argument("--duration", type=float, default=30, help="計測時間（秒）")
+    parser.add_argument("--warmup", type=float, default=5, help="集計しない開始直後の時間（秒）")
+    parser.add_argument("--timeout", type=float, default=30, help="1リクエストのタイムアウト（秒）")
+    parser.add_argument("--max-connections", type=int, default=200, help="目標RPS指定時の最大接続数")
+    parser.add_argument("--seed", type=int, default=0, help="操作の選択の乱数シード")
+    parser.add_argument("--label", help="結果の名前（リリース番号等）")
+    parser.add_argument("--output", help="結果のJSONの出力先")
+    parser.add_argument("--compare", help="比較する前回の結果のJSON")
+    parser.add_argument("--threshold", type=float, default=10, help="劣化とみなす変化率（%%）")
+    args = parser.parse_args()
+    if not args.rps and not args.concurrency:
+        args.concurrency = 10
+
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
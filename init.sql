@@ -11,20 +11,74 @@
 -- 前提条件・制約:
 -- - PostgreSQL 15以上
 -- - gen_random_uuid()が使用可能
+-- - pg_trgm拡張が利用可能（タスク検索の誤字に強いタイトル一致）
+-- - tasksはcreated_atの月次パーティション（インデックスは親テーブルに作成し、各パーティションへ自動で作成される）
+-- - スキーマの正はsrc/app/migrations（python -m db.migrate で適用）。本ファイルはローカルの初回起動用で、最終形を一致させる
+--   （マイグレーションは作成済みのテーブル・インデックスを飛ばし、schema_versionに記録する）
 
--- tasksテーブル作成
+-- 拡張機能
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- tasksテーブル作成（created_atの月次レンジパーティション。src/app/db/partitions.py の TASKS_TABLE_DDL と一致させる）
+-- 主キーはパーティションキーを含めた (id, created_at)
 CREATE TABLE IF NOT EXISTS tasks (
-    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    id UUID NOT NULL DEFAULT gen_random_uuid(),
     title VARCHAR(100) NOT NULL,
     description VARCHAR(500),
     status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'in_progress', 'completed')),
     created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
-    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
-);
+    updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    -- 楽観的排他制御用（すべての更新で1ずつ増やす。PUT /tasks/{id}のexpected_versionと比較）
+    version INTEGER NOT NULL DEFAULT 1,
+    -- 全文検索用（タイトルを重みA、説明を重みBで索引。設定simpleは語幹処理なし）
+    search_vector TSVECTOR GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A')
+        || setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+    ) STORED,
+    PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+-- パーティション作成（当月から3か月先まで + 範囲外の行を受ける既定パーティション）
+-- 以降の月はアプリケーションの定期処理（TASK_PARTITION_PREMAKE_MONTHS）が作成する
+DO $$
+DECLARE
+    month_start TIMESTAMPTZ;
+BEGIN
+    FOR i IN 0..3 LOOP
+        month_start := date_trunc('month', now() AT TIME ZONE 'UTC') AT TIME ZONE 'UTC' + make_interval(months => i);
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF tasks FOR VALUES FROM (%L) TO (%L)',
+            'tasks_p' || to_char(month_start AT TIME ZONE 'UTC', 'YYYYMM'),
+            month_start,
+            month_start + interval '1 month'
+        );
+    END LOOP;
+END $$;
+CREATE TABLE IF NOT EXISTS tasks_default PARTITION OF tasks DEFAULT;
 
 -- インデックス作成
-CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status);
-CREATE INDEX IF NOT EXISTS idx_tasks_created_at ON tasks(created_at DESC);
+-- 一覧取得の並び順ごとの複合インデックス（src/app/db/task_repository.py の LIST_INDEXES と一致させる）
+-- キーは (status,) + 並び順の列 + id、INCLUDEはdescription以外の列（fields指定時のIndex Only Scan用）
+CREATE INDEX IF NOT EXISTS idx_tasks_created_at_id ON tasks (created_at DESC, id DESC) INCLUDE (title, status, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_created_at_id ON tasks (status, created_at DESC, id DESC) INCLUDE (title, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_updated_at_id ON tasks (updated_at DESC, id DESC) INCLUDE (title, status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_updated_at_id ON tasks (status, updated_at DESC, id DESC) INCLUDE (title, created_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_title_id ON tasks (title, id) INCLUDE (status, created_at, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_status_title_id ON tasks (status, title, id) INCLUDE (created_at, updated_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_search_vector ON tasks USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_tasks_title_trgm ON tasks USING GIN (title gin_trgm_ops);
+
+-- 冪等キー（POST /tasksのIdempotency-Key。src/app/db/idempotency.py の IDEMPOTENCY_TABLE_DDL と一致させる）
+-- キー・リクエスト本文のハッシュ・保存済みの応答のみを持ち、期限切れの行はアプリケーションが定期削除する
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(255) PRIMARY KEY,
+    request_hash BYTEA NOT NULL,
+    status_code SMALLINT,
+    response_body BYTEA,
+    etag VARCHAR(100),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
 
 -- サンプルデータ挿入
 INSERT INTO tasks (title, description, status) VALUES
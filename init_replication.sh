@@ -0,0 +1,17 @@
+#!/bin/sh
+# X-Ray Watch POC - レプリケーション接続の許可（ローカル開発用）
+#
+# 目的・理由:
+# - docker-composeのpostgres-replica（replicaプロファイル）がpg_basebackup・ストリーミング
+#   レプリケーションで接続できるよう、pg_hba.confにreplication接続を追加する
+#
+# 影響範囲:
+# - ローカル開発環境のPostgreSQL（プライマリ）のみ
+#
+# 前提条件・制約:
+# - PostgreSQL公式イメージの初回起動時（/docker-entrypoint-initdb.d）にのみ実行される
+# - wal_level=replica / max_wal_senders はPostgreSQL 15の既定値のまま使用する
+
+set -e
+
+echo "host replication all all scram-sha-256" >> "$PGDATA/pg_hba.conf"
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 RDS Database Initialization Script
-Purpose: Execute init.sql on AWS RDS PostgreSQL instance
+Purpose: Apply schema migrations (src/app/migrations) on AWS RDS PostgreSQL instance
 """
 
 import asyncio
@@ -9,6 +9,10 @@ import asyncpg
 import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / "src" / "app"))
+
+from db.migrate import run_migrations  # noqa: E402
+
 # Database connection details
 DB_CONFIG = {
     "host": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
@@ -19,16 +23,7 @@ DB_CONFIG = {
 }
 
 async def execute_init_sql():
-    """Execute init.sql on RDS database"""
-
-    # Read init.sql file
-    init_sql_path = Path(__file__).parent / "init.sql"
-    print(f"Reading SQL file: {init_sql_path}")
-
-    with open(init_sql_path, "r", encoding="utf-8") as f:
-        sql_content = f.read()
-
-    print(f"SQL content loaded ({len(sql_content)} characters)")
+    """Apply schema migrations on RDS database"""
 
     # Connect to database
     print(f"\nConnecting to RDS: {DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}")
@@ -43,28 +38,11 @@ async def execute_init_sql():
         )
         print("✓ Connection established")
 
-        # Execute SQL statements
-        print("\nExecuting SQL statements...")
-
-        # Split SQL by semicolons and execute each statement
-        statements = [s.strip() for s in sql_content.split(";") if s.strip() and not s.strip().startswith("--")]
-
-        for i, statement in enumerate(statements, 1):
-            # Skip comment-only statements
-            if all(line.strip().startswith("--") or not line.strip() for line in statement.split("\n")):
-                continue
-
-            print(f"\n[{i}/{len(statements)}] Executing statement:")
-            print(f"  {statement[:100]}..." if len(statement) > 100 else f"  {statement}")
-
-            try:
-                result = await conn.fetch(statement)
-                if result:
-                    print(f"  ✓ Result: {result}")
-                else:
-                    print(f"  ✓ Executed successfully")
-            except Exception as e:
-                print(f"  ⚠ Warning: {e}")
+        # Apply pending migrations (advisory-locked, recorded in schema_version)
+        print("\nApplying migrations...")
+        dsn = "postgresql://{user}:{password}@{host}:{port}/{database}".format(**DB_CONFIG)
+        applied = await run_migrations(dsn)
+        print(f"  ✓ Applied: {', '.join(applied) if applied else 'none (up to date)'}")
 
         # Verify table creation
         print("\n" + "="*60)
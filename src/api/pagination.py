@@ -0,0 +1,50 @@
+"""
+キーセット（カーソル）ページネーション
+
+目的: (created_at, id) のシーク条件によるページ送り
+理由: OFFSET方式は深いページほど読み飛ばす行が増えて遅くなるため
+影響範囲: GET /tasks
+前提条件: 並び順は created_at DESC, id DESC 固定
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from uuid import UUID
+
+
+def encode_cursor(created_at: datetime, task_id: UUID) -> str:
+    """
+    カーソル文字列を生成
+
+    目的: ページ最終行の位置を不透明な文字列で返す
+    理由: クライアントに内部構造を意識させないため
+    影響範囲: TaskListResponse.next_cursor
+    前提条件: created_atがタイムゾーン付きであること
+    """
+    payload = json.dumps({"c": created_at.isoformat(), "i": str(task_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    """
+    カーソル文字列を解析
+
+    目的: カーソルをシーク条件の値に戻す
+    理由: 次ページの開始位置を特定するため
+    影響範囲: GET /tasks の cursor パラメータ
+    前提条件: 不正なカーソルはValueErrorを送出
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        created_at = datetime.fromisoformat(payload["c"])
+        task_id = UUID(payload["i"])
+    except (binascii.Error, UnicodeError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    if created_at.tzinfo is None:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    return created_at, task_id
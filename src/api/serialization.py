@@ -0,0 +1,43 @@
+"""
+タスク行の高速JSONシリアライズ
+
+目的: asyncpgのRecordをorjsonで直接JSONに変換する
+理由: TaskResponse生成 → response_model再検証 → 標準jsonの経路が一覧取得のCPU時間の大半を占めるため
+影響範囲: タスクAPI（一覧/詳細/作成/更新）、障害シミュレーションAPI
+前提条件: 出力の形はmodels.taskのTaskResponse/TaskListResponseと一致させること（日時はUTCの"Z"形式）
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+TASK_COLUMNS = ("id", "title", "description", "status", "created_at", "updated_at")
+
+_ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NAIVE_UTC
+
+
+def task_dict(row: Any) -> dict[str, Any]:
+    """
+    1行をレスポンス用の辞書に変換
+
+    目的: 列を選ぶだけにし、UUID・日時の文字列化はorjsonに任せる
+    理由: 行ごとのstr()/isoformat()呼び出しとPydanticモデル生成を省くため
+    影響範囲: TaskJSONResponseを返すエンドポイント
+    前提条件: rowはTASK_COLUMNSを含むこと
+    """
+    return {column: row[column] for column in TASK_COLUMNS}
+
+
+class TaskJSONResponse(JSONResponse):
+    """
+    orjsonでエンコードするJSONレスポンス
+
+    目的: エンドポイントから直接返し、response_modelの再検証と標準jsonエンコードを省略する
+    理由: シリアライズのCPUコスト削減
+    影響範囲: タスクAPI
+    前提条件: なし
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
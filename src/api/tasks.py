@@ -16,6 +16,8 @@ import httpx
 from fastapi import APIRouter, HTTPException, Query, status
 from aws_xray_sdk.core import xray_recorder
 
+from api.pagination import decode_cursor, encode_cursor
+from api.serialization import TaskJSONResponse, task_dict
 from db.postgres import db
 from models.task import (
     TaskCreate,
@@ -33,60 +35,86 @@ router = APIRouter(prefix="/tasks", tags=["tasks"])
 async def list_tasks(
     status_filter: Optional[TaskStatus] = Query(None, alias="status"),
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None)
 ):
     """
     タスク一覧取得
 
-    目的: タスク一覧をページネーション付きで取得
-    理由: タスク管理機能
+    目的: タスク一覧をページネーション付きで取得（offset方式 / cursor方式）
+    理由: タスク管理機能。cursor方式は深いページでも遅延が一定
     影響範囲: フロントエンド一覧画面
-    前提条件: tasksテーブルが存在すること
+    前提条件: tasksテーブルが存在すること、cursorとoffsetは併用不可
     """
+    if cursor is not None and offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": "cursor and offset cannot be combined"}}
+        )
+
     try:
-        # クエリ構築
+        # WHERE句構築（status → シーク条件の順）
+        conditions = []
+        params = []
         if status_filter:
-            query = """
-                SELECT id, title, description, status, created_at, updated_at
-                FROM tasks
-                WHERE status = $1
-                ORDER BY created_at DESC
-                LIMIT $2 OFFSET $3
-            """
-            count_query = "SELECT COUNT(*) FROM tasks WHERE status = $1"
-
-            tasks = await db.fetch_with_xray(
-                query, status_filter.value, limit, offset,
-                operation_name="PostgreSQL SELECT tasks (filtered)"
-            )
-            total = await db.fetchrow_with_xray(
-                count_query, status_filter.value,
-                operation_name="PostgreSQL COUNT tasks (filtered)"
-            )
-        else:
-            query = """
-                SELECT id, title, description, status, created_at, updated_at
-                FROM tasks
-                ORDER BY created_at DESC
-                LIMIT $1 OFFSET $2
-            """
-            count_query = "SELECT COUNT(*) FROM tasks"
-
-            tasks = await db.fetch_with_xray(
-                query, limit, offset,
-                operation_name="PostgreSQL SELECT tasks"
-            )
-            total = await db.fetchrow_with_xray(
-                count_query,
-                operation_name="PostgreSQL COUNT tasks"
-            )
+            params.append(status_filter.value)
+            conditions.append(f"status = ${len(params)}")
+        count_params = list(params)
+
+        if cursor is not None:
+            try:
+                cursor_created_at, cursor_id = decode_cursor(cursor)
+            except ValueError:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail={"error": {"code": "INVALID_CURSOR", "message": "cursor is malformed"}}
+                )
+            params.extend([cursor_created_at, cursor_id])
+            c, i = len(params) - 1, len(params)
+            conditions.append(f"created_at <= ${c} AND (created_at < ${c} OR id < ${i})")
+
+        where_clause = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        # 次ページ有無の判定のためlimit+1件取得
+        params.append(limit + 1)
+        query = f"""
+            SELECT id, title, description, status, created_at, updated_at
+            FROM tasks
+            {where_clause}
+            ORDER BY created_at DESC, id DESC
+            LIMIT ${len(params)}
+        """
+        if cursor is None:
+            params.append(offset)
+            query += f" OFFSET ${len(params)}"
 
-        return TaskListResponse(
-            tasks=[TaskResponse(**dict(task)) for task in tasks],
-            total=total[0],
-            limit=limit,
-            offset=offset
+        count_query = "SELECT COUNT(*) FROM tasks WHERE status = $1" if status_filter else "SELECT COUNT(*) FROM tasks"
+        suffix = " (filtered)" if status_filter else ""
+
+        tasks = await db.fetch_with_xray(
+            query, *params,
+            operation_name=f"PostgreSQL SELECT tasks{suffix}"
         )
+        total = await db.fetchrow_with_xray(
+            count_query, *count_params,
+            operation_name=f"PostgreSQL COUNT tasks{suffix}"
+        )
+
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            next_cursor = encode_cursor(tasks[-1]["created_at"], tasks[-1]["id"])
+
+        # TaskListResponseの形をorjsonで直接エンコード（response_modelの再検証を省略）
+        return TaskJSONResponse({
+            "tasks": [task_dict(task) for task in tasks],
+            "total": total[0],
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": next_cursor
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -122,7 +150,7 @@ async def get_task(task_id: UUID):
                 detail={"error": {"code": "NOT_FOUND", "message": f"Task {task_id} not found"}}
             )
 
-        return TaskResponse(**dict(task))
+        return TaskJSONResponse(task_dict(task))
     except HTTPException:
         raise
     except Exception as e:
@@ -154,7 +182,7 @@ async def create_task(task: TaskCreate):
             operation_name="PostgreSQL INSERT INTO tasks"
         )
 
-        return TaskResponse(**dict(row))
+        return TaskJSONResponse(task_dict(row), status_code=status.HTTP_201_CREATED)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -199,8 +227,9 @@ async def update_task(task_id: UUID, task: TaskUpdate):
                 detail={"error": {"code": "VALIDATION_ERROR", "message": "No fields to update"}}
             )
 
-        # updated_atを更新
+        # updated_atを更新（versionも増やし、src/appの楽観的排他制御と整合させる）
         fields.append(f"updated_at = NOW()")
+        fields.append("version = version + 1")
 
         values.append(task_id)
         query = f"""
@@ -221,7 +250,7 @@ async def update_task(task_id: UUID, task: TaskUpdate):
                 detail={"error": {"code": "NOT_FOUND", "message": f"Task {task_id} not found"}}
             )
 
-        return TaskResponse(**dict(row))
+        return TaskJSONResponse(task_dict(row))
     except HTTPException:
         raise
     except Exception as e:
@@ -298,11 +327,11 @@ async def simulate_slow_db(
             operation_name="PostgreSQL SELECT tasks"
         )
 
-        return {
-            "tasks": [TaskResponse(**dict(task)) for task in tasks],
+        return TaskJSONResponse({
+            "tasks": [task_dict(task) for task in tasks],
             "simulation": "db-slow",
             "delay_seconds": 3
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -345,11 +374,11 @@ async def simulate_slow_logic(
             operation_name="PostgreSQL SELECT tasks"
         )
 
-        return {
-            "tasks": [TaskResponse(**dict(task)) for task in tasks],
+        return TaskJSONResponse({
+            "tasks": [task_dict(task) for task in tasks],
             "simulation": "logic-slow",
             "delay_seconds": 5
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -395,11 +424,11 @@ async def simulate_slow_external(
             operation_name="PostgreSQL SELECT tasks"
         )
 
-        return {
-            "tasks": [TaskResponse(**dict(task)) for task in tasks],
+        return TaskJSONResponse({
+            "tasks": [task_dict(task) for task in tasks],
             "simulation": "external-slow",
             "delay_seconds": 2
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,609 @@
+"""
+タスク一括操作API
+
+目的・理由:
+- 1リクエスト1行の取得/作成/更新/削除APIでは、大量処理時にリクエスト・DB往復・X-Rayセグメントが行数分発生する
+- 複数タスクを1リクエスト・集合演算のSQLで処理し、往復回数を削減する
+
+影響範囲:
+- タスクデータ（PostgreSQL）
+- X-Rayトレース（X-Ray Daemon経由）
+
+前提条件・制約:
+- PostgreSQLが稼働していること
+- 1リクエストあたりの件数（作成件数、ID指定数）はTASK_BULK_MAX_ITEMSまで
+"""
+
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Union
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from pydantic import BaseModel, Field, ValidationError, model_validator
+
+from aws_xray_sdk.core import xray_recorder
+from api.serialization import TaskJSONResponse, parse_fields, task_dict
+from api.tasks import TaskCreate, TaskResponse, TaskSparseResponse, TaskUpdate
+from db import task_repository
+from db.counts import adjust_cached_counts, move_cached_count
+from db.postgres import get_db_pool
+from db.single_flight import read_flight
+from db.task_cache import publish_invalidation, record_cache_result, task_cache
+from db.task_events import publish_task_event
+
+
+router = APIRouter(prefix="/tasks", tags=["tasks"])
+
+
+# 目的・理由: 1リクエストで受け付ける最大件数（メモリ使用量とトランザクション長の上限）
+# 影響範囲: /tasks/bulk
+# 前提条件・制約: 環境変数TASK_BULK_MAX_ITEMSで変更可能
+BULK_MAX_ITEMS = int(os.getenv("TASK_BULK_MAX_ITEMS", "100000"))
+
+# 目的・理由: 条件指定の一括更新/削除で1トランザクションあたりに処理する行数
+#             （行ロックの保持時間と1文あたりのWAL量を抑える）
+# 影響範囲: /tasks/bulk-update, /tasks/bulk-delete（filter指定時）
+# 前提条件・制約: 環境変数TASK_BULK_CHUNK_SIZEで変更可能
+BULK_CHUNK_SIZE = int(os.getenv("TASK_BULK_CHUNK_SIZE", "5000"))
+
+# 目的・理由: 一括取得で1リクエストに指定できる最大ID数（ダッシュボード1画面分を想定）
+# 影響範囲: /tasks/batch-get
+# 前提条件・制約: 環境変数TASK_BATCH_GET_MAX_IDSで変更可能
+BATCH_GET_MAX_IDS = int(os.getenv("TASK_BATCH_GET_MAX_IDS", "500"))
+
+
+# --------------------------------
+# Pydanticモデル（リクエスト/レスポンス）
+# --------------------------------
+
+
+class BulkItemError(BaseModel):
+    """
+    一括操作の項目別エラー
+
+    目的・理由:
+    - どの項目（入力順のindex）がなぜ不正かをクライアントに返す
+
+    影響範囲:
+    - タスク一括作成API
+
+    前提条件・制約:
+    - errorsはPydanticのエラー形式（loc/msg/type）
+    """
+
+    index: int
+    errors: list[dict[str, Any]]
+
+
+class TaskBulkCreateResponse(BaseModel):
+    """
+    タスク一括作成レスポンス
+
+    目的・理由:
+    - 生成されたIDを入力順で返す（不正でスキップした項目はNone）
+    - 件数と項目別エラーを返す
+
+    影響範囲:
+    - タスク一括作成API
+
+    前提条件・制約:
+    - idsの長さは入力件数と一致
+    """
+
+    ids: list[Optional[str]]
+    created: int
+    errors: list[BulkItemError]
+
+
+class BulkTaskFilter(BaseModel):
+    """
+    一括更新/削除の対象条件
+
+    目的・理由:
+    - ID列挙ではなく条件（ステータス、作成日時の範囲）で対象を指定する
+
+    影響範囲:
+    - タスク一括更新/削除API
+
+    前提条件・制約:
+    - 少なくとも1つの条件が必要（全件対象の誤操作を防ぐ）
+    - created_fromは以上、created_toは未満
+    """
+
+    status: Optional[str] = Field(None, pattern="^(pending|in_progress|completed)$")
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def _require_condition(self) -> "BulkTaskFilter":
+        if self.status is None and self.created_from is None and self.created_to is None:
+            raise ValueError("filter requires at least one condition")
+        return self
+
+
+class _BulkTarget(BaseModel):
+    """
+    一括更新/削除の対象指定（共通）
+
+    目的・理由:
+    - ids（1文・1トランザクション）とfilter（チャンク分割）のどちらか一方で対象を指定
+
+    前提条件・制約:
+    - idsとfilterはちょうど一方を指定すること
+    """
+
+    ids: Optional[list[uuid.UUID]] = Field(None, min_length=1)
+    filter: Optional[BulkTaskFilter] = None
+    return_rows: bool = False
+
+    @model_validator(mode="after")
+    def _require_one_target(self) -> "_BulkTarget":
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("specify exactly one of ids or filter")
+        if self.ids is not None and len(self.ids) > BULK_MAX_ITEMS:
+            raise ValueError(f"at most {BULK_MAX_ITEMS} ids per request")
+        return self
+
+
+class TaskBulkUpdateRequest(_BulkTarget):
+    """
+    タスク一括更新リクエスト
+
+    目的・理由:
+    - 対象（ids/filter）と変更内容（changes）を1リクエストで受け取る
+
+    影響範囲:
+    - タスク一括更新API
+
+    前提条件・制約:
+    - changesには少なくとも1フィールドが必要
+    """
+
+    changes: TaskUpdate
+
+
+class TaskBulkDeleteRequest(_BulkTarget):
+    """
+    タスク一括削除リクエスト
+
+    目的・理由:
+    - 対象（ids/filter）を1リクエストで受け取る
+
+    影響範囲:
+    - タスク一括削除API
+    """
+
+
+class TaskBulkMutationResponse(BaseModel):
+    """
+    タスク一括更新/削除レスポンス
+
+    目的・理由:
+    - 影響件数と実行チャンク数を返す
+    - return_rows=trueの場合は更新後（削除時は削除前）の行を返す
+
+    影響範囲:
+    - タスク一括更新/削除API
+
+    前提条件・制約:
+    - ids指定時はchunksは常に1
+    """
+
+    affected: int
+    chunks: int
+    tasks: Optional[list[TaskResponse]] = None
+
+
+class TaskBatchGetRequest(BaseModel):
+    """
+    タスク一括取得リクエスト
+
+    目的・理由:
+    - 複数IDを1リクエストで受け取る（GETのクエリ文字列ではURL長の上限に近づくためPOST）
+
+    影響範囲:
+    - タスク一括取得API
+
+    前提条件・制約:
+    - idsは1〜TASK_BATCH_GET_MAX_IDS件
+    - fieldsはGET /tasks/{task_id}と同じ形式（カンマ区切りの項目名、任意）
+    """
+
+    ids: list[uuid.UUID] = Field(..., min_length=1)
+    fields: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _limit_ids(self) -> "TaskBatchGetRequest":
+        if len(self.ids) > BATCH_GET_MAX_IDS:
+            raise ValueError(f"at most {BATCH_GET_MAX_IDS} ids per request")
+        return self
+
+
+class TaskBatchGetResponse(BaseModel):
+    """
+    タスク一括取得レスポンス
+
+    目的・理由:
+    - 見つかったタスクをリクエストのID順で返し、存在しないIDをmissingで返す
+
+    影響範囲:
+    - タスク一括取得API
+
+    前提条件・制約:
+    - 重複したIDは最初の1件のみ返す
+    """
+
+    tasks: list[Union[TaskResponse, TaskSparseResponse]]
+    missing: list[str]
+
+
+# --------------------------------
+# 一括取得
+# --------------------------------
+
+
+@router.post("/batch-get", response_model=TaskBatchGetResponse)
+async def batch_get_tasks(body: TaskBatchGetRequest) -> TaskJSONResponse:
+    """
+    タスク一括取得
+
+    目的・理由:
+    - ダッシュボード等でIDごとにGET /tasks/{task_id}を繰り返すと、ID数分のリクエスト・
+      接続取得・クエリ・X-Rayセグメントが発生する
+    - キャッシュにないIDだけを WHERE id = ANY($1) の1クエリで取得する
+    - 出力はGET /tasks/{task_id}と同じ（タスクキャッシュ、task_dict、TaskJSONResponse）
+
+    影響範囲:
+    - PostgreSQL（SELECT tasks WHERE id = ANY(...)、キャッシュミスがある場合のみ）
+    - タスクキャッシュ
+    - X-Rayトレース
+
+    前提条件・制約:
+    - 存在しないIDはキャッシュしない
+    - ETag・条件付きリクエストには対応しない（各タスクのupdated_atで判定すること）
+    """
+    try:
+        selected_fields = parse_fields(body.fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": str(e)}},
+        )
+
+    ids = list(dict.fromkeys(body.ids))
+    rows: dict[uuid.UUID, Any] = {}
+    for task_id in ids:
+        row = task_cache.get(task_id)
+        record_cache_result("hit" if row is not None else "miss")
+        if row is not None:
+            rows[task_id] = row
+
+    misses = [task_id for task_id in ids if task_id not in rows]
+    if misses:
+        generation = task_cache.generation()
+        pool = await get_db_pool()
+
+        # X-Rayサブセグメント（PostgreSQL SELECT、キャッシュミス分を1クエリで取得）
+        with xray_recorder.capture("PostgreSQL") as subsegment:
+            subsegment.namespace = "remote"
+            subsegment.put_annotation("batch_size", len(misses))
+            async with pool.acquire() as conn:
+                query = task_repository.sql("select_by_ids")
+                fetched = await task_repository.fetch(conn, "select_by_ids", misses)
+
+                # X-RayでRDS情報を設定
+                subsegment.sql = {
+                    "database_type": "PostgreSQL",
+                    "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
+                    "sanitized_query": query
+                }
+
+        for row in fetched:
+            rows[row["id"]] = row
+            task_cache.put(row["id"], row, generation)
+
+    return TaskJSONResponse({
+        "tasks": [task_dict(rows[task_id], selected_fields) for task_id in ids if task_id in rows],
+        "missing": [str(task_id) for task_id in ids if task_id not in rows],
+    })
+
+
+# --------------------------------
+# 一括作成
+# --------------------------------
+
+
+def _parse_items(body: bytes, content_type: str) -> tuple[list[Any], list[BulkItemError]]:
+    """
+    リクエストボディの解析
+
+    目的・理由:
+    - JSON配列とNDJSON（1行1オブジェクト）の両方を受け付ける
+    - NDJSONは行単位でJSONエラーを項目エラーとして扱う
+
+    影響範囲:
+    - タスク一括作成API
+
+    前提条件・制約:
+    - JSON配列としての解析に失敗した場合は400
+    """
+    if "ndjson" in content_type:
+        items: list[Any] = []
+        errors: list[BulkItemError] = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                errors.append(BulkItemError(index=len(items), errors=[{"loc": [], "msg": str(e), "type": "json_invalid"}]))
+                items.append(None)
+        return items, errors
+
+    try:
+        items = json.loads(body)
+    except json.JSONDecodeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": f"Invalid JSON: {e}"}},
+        )
+    if not isinstance(items, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": "Request body must be a JSON array"}},
+        )
+    return items, []
+
+
+@router.post("/bulk", response_model=TaskBulkCreateResponse, status_code=status.HTTP_201_CREATED)
+async def bulk_create_tasks(
+    request: Request,
+    partial: bool = Query(False),
+) -> TaskBulkCreateResponse:
+    """
+    タスク一括作成
+
+    目的・理由:
+    - JSON配列またはNDJSONで受け取ったタスクを1パスでバリデーション
+    - IDをアプリ側で採番し、COPY（copy_records_to_table）で一括投入
+      （RETURNINGが使えないCOPYでも、入力順どおりのIDを返せる）
+    - X-Rayサブセグメントは一括で1つ
+
+    影響範囲:
+    - PostgreSQL（COPY tasks）
+    - X-Rayトレース
+
+    前提条件・制約:
+    - Content-Typeがapplication/x-ndjsonの場合はNDJSON、それ以外はJSON配列として解析
+    - partial=false（既定）: 1件でも不正があれば何も登録せず422
+    - partial=true: 不正な項目をスキップし、正常な項目のみ登録（errorsで報告）
+    """
+    body = await request.body()
+    items, errors = _parse_items(body, request.headers.get("content-type", ""))
+
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail={"error": {"code": "PAYLOAD_TOO_LARGE", "message": f"At most {BULK_MAX_ITEMS} items per request"}},
+        )
+
+    # バリデーション（1パス）
+    failed = {error.index for error in errors}
+    ids: list[Optional[str]] = [None] * len(items)
+    records = []
+    for index, item in enumerate(items):
+        if index in failed:
+            continue
+        try:
+            task = TaskCreate.model_validate(item)
+        except ValidationError as e:
+            errors.append(BulkItemError(index=index, errors=e.errors(include_url=False, include_context=False)))
+            continue
+        task_id = uuid.uuid4()
+        ids[index] = str(task_id)
+        records.append((task_id, task.title, task.description, task.status))
+
+    errors.sort(key=lambda error: error.index)
+
+    if errors and not partial:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": {
+                    "code": "VALIDATION_ERROR",
+                    "message": f"{len(errors)} of {len(items)} items are invalid",
+                    "items": [error.model_dump() for error in errors],
+                }
+            },
+        )
+
+    if records:
+        pool = await get_db_pool()
+
+        # X-Rayサブセグメント（PostgreSQL COPY）
+        with xray_recorder.capture("PostgreSQL COPY tasks") as subsegment:
+            subsegment.namespace = "remote"
+            subsegment.put_annotation("bulk_items", len(records))
+            async with pool.acquire() as conn:
+                await conn.copy_records_to_table(
+                    "tasks",
+                    records=records,
+                    columns=["id", "title", "description", "status"],
+                )
+                await publish_task_event(conn, "bulk_created", count=len(records))
+
+                # X-RayでRDS情報を設定
+                subsegment.sql = {
+                    "database_type": "PostgreSQL",
+                    "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
+                    "sanitized_query": "COPY tasks (id, title, description, status) FROM STDIN (FORMAT binary)",
+                }
+
+        # 実行中の読み取りとの合流を打ち切り
+        read_flight.forget()
+
+        # 件数キャッシュへ反映
+        for record in records:
+            adjust_cached_counts(record[3], 1)
+
+    return TaskBulkCreateResponse(ids=ids, created=len(records), errors=errors)
+
+
+# --------------------------------
+# 一括更新・削除
+# --------------------------------
+
+
+def _target_params(target: _BulkTarget, params: list) -> Optional[tuple[str, ...]]:
+    """
+    対象指定のパラメータ
+
+    目的・理由:
+    - ids指定はIDの配列、filter指定は指定された条件の値をparamsに追記し、条件名（クエリ形状）を返す
+
+    前提条件・制約:
+    - ids指定時はNone
+    - filter指定時は末尾2つ（直前のid、チャンクサイズ）を呼び出し側が渡す
+    """
+    if target.ids is not None:
+        params.append(target.ids)
+        return None
+    filters = []
+    for name in task_repository.BULK_FILTERS:
+        value = getattr(target.filter, name)
+        if value is not None:
+            params.append(value)
+            filters.append(name)
+    return tuple(filters)
+
+
+async def _run_bulk_mutation(query_name: str, params: list, chunked: bool, return_rows: bool, operation: str):
+    """
+    一括更新/削除の実行
+
+    目的・理由:
+    - ids指定: 1文・1トランザクションで実行
+    - filter指定: BULK_CHUNK_SIZE行ごとにトランザクションを分けて実行し、
+      ロック保持時間とWAL量をチャンク単位に抑える
+
+    影響範囲:
+    - PostgreSQL（UPDATE/DELETE tasks）
+    - X-Rayトレース
+
+    前提条件・制約:
+    - filter指定時はチャンク間で原子性はない（途中失敗時は完了済みチャンクのみ反映）
+    - キャッシュ無効化・変更イベント（bulk_updated/bulk_deleted）はチャンクごとに送る
+      （countはそのチャンクの件数）
+    - query_nameはtask_repository.bulk_update_query_name / bulk_delete_query_nameの名前
+    """
+    pool = await get_db_pool()
+    affected = 0
+    chunks = 0
+    returned = []
+
+    # X-Rayサブセグメント（PostgreSQL UPDATE/DELETE）
+    with xray_recorder.capture(f"PostgreSQL {operation} tasks bulk") as subsegment:
+        subsegment.namespace = "remote"
+        subsegment.put_annotation("bulk_mode", "filter" if chunked else "ids")
+        async with pool.acquire() as conn:
+            last_id = uuid.UUID(int=0)
+            while True:
+                args = [*params, last_id, BULK_CHUNK_SIZE] if chunked else params
+                async with conn.transaction():
+                    rows = await task_repository.fetch(conn, query_name, *args)
+                    # タスクキャッシュの無効化（対象IDを列挙せず全レプリカで全件無効化）と変更イベント。
+                    # チャンクと同じトランザクションで送り、後続チャンクが失敗・タイムアウトしても
+                    # コミット済みのチャンクは必ず通知される
+                    if rows:
+                        await publish_invalidation(conn)
+                        event = "bulk_deleted" if operation == "DELETE" else "bulk_updated"
+                        await publish_task_event(conn, event, count=len(rows))
+                if rows:
+                    # 実行中の読み取りとの合流を打ち切り
+                    read_flight.forget()
+                chunks += 1
+                affected += len(rows)
+                if return_rows:
+                    returned.extend(rows)
+                for row in rows:
+                    if operation == "DELETE":
+                        adjust_cached_counts(row["previous_status"], -1)
+                    else:
+                        move_cached_count(row["previous_status"], row["status"])
+
+                if not chunked or len(rows) < BULK_CHUNK_SIZE:
+                    break
+                last_id = max(row["id"] for row in rows)
+
+            # X-RayでRDS情報を設定
+            subsegment.put_metadata("affected", affected)
+            subsegment.put_metadata("chunks", chunks)
+            subsegment.sql = {
+                "database_type": "PostgreSQL",
+                "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
+                "sanitized_query": task_repository.sql(query_name)
+            }
+
+    # TaskBulkMutationResponseの形をorjsonで直接エンコード（返却行が多い場合の検証コストを省略）
+    tasks = [task_dict(row) for row in returned] if return_rows else None
+    return TaskJSONResponse({"affected": affected, "chunks": chunks, "tasks": tasks})
+
+
+@router.post("/bulk-update", response_model=TaskBulkMutationResponse)
+async def bulk_update_tasks(body: TaskBulkUpdateRequest) -> TaskJSONResponse:
+    """
+    タスク一括更新
+
+    目的・理由:
+    - ID列挙または条件で指定した複数タスクを集合演算のUPDATEで更新
+    - 逐次のPUT /tasks/{id}呼び出しを置き換える
+
+    影響範囲:
+    - PostgreSQL（UPDATE tasks）
+    - X-Rayトレース
+
+    前提条件・制約:
+    - changesには少なくとも1フィールドが必要
+    - filter指定時はBULK_CHUNK_SIZE行ごとに別トランザクション
+    """
+    fields = []
+    params: list = []
+    for column in task_repository.UPDATABLE_FIELDS:
+        value = getattr(body.changes, column)
+        if value is not None:
+            params.append(value)
+            fields.append(column)
+
+    if not fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": "No fields to update"}},
+        )
+    # updated_at・version（楽観的排他制御（PUTのexpected_version）と整合させる）も更新される
+    query_name = task_repository.bulk_update_query_name(tuple(fields), _target_params(body, params))
+
+    return await _run_bulk_mutation(query_name, params, body.filter is not None, body.return_rows, "UPDATE")
+
+
+@router.post("/bulk-delete", response_model=TaskBulkMutationResponse)
+async def bulk_delete_tasks(body: TaskBulkDeleteRequest) -> TaskJSONResponse:
+    """
+    タスク一括削除
+
+    目的・理由:
+    - ID列挙または条件で指定した複数タスクを集合演算のDELETEで削除
+    - 逐次のDELETE /tasks/{id}呼び出しを置き換える
+
+    影響範囲:
+    - PostgreSQL（DELETE FROM tasks）
+    - X-Rayトレース
+
+    前提条件・制約:
+    - filter指定時はBULK_CHUNK_SIZE行ごとに別トランザクション
+    """
+    params: list = []
+    query_name = task_repository.bulk_delete_query_name(_target_params(body, params))
+
+    return await _run_bulk_mutation(query_name, params, body.filter is not None, body.return_rows, "DELETE")
@@ -0,0 +1,121 @@
+"""
+ETag（エンティティタグ）と条件付きリクエスト
+
+目的・理由:
+- タスク単体は (id, updated_at) から強いETagを生成し、If-None-Matchで304を返せるようにする
+- タスクETagはupdated_atを復元できる形式とし、If-Match（PUT/DELETE）を
+  UPDATE/DELETEのWHERE条件（比較・交換）に変換できるようにする
+- 一覧ページはページ内容（行のid/updated_atとページ情報）のハッシュをETagにする
+
+影響範囲:
+- タスク詳細取得/一覧取得API（If-None-Match → 304）
+- タスク更新/削除API（If-Match → 412）
+
+前提条件・制約:
+- updated_atはすべての更新でNOW()に更新されること
+- タスクETag形式: "<idの16進32桁>-<updated_atのエポックマイクロ秒の16進>"
+"""
+
+import hashlib
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def task_etag(task_id: uuid.UUID, updated_at: datetime) -> str:
+    """
+    タスク単体のETag生成
+
+    目的・理由:
+    - 浮動小数点を介さず、マイクロ秒単位の整数でupdated_atを埋め込む
+
+    影響範囲:
+    - タスク詳細取得/作成/更新APIのETagヘッダー
+    """
+    micros = (updated_at - _EPOCH) // _MICROSECOND
+    return f'"{task_id.hex}-{micros:x}"'
+
+
+def parse_task_etag(etag: str) -> Optional[tuple[uuid.UUID, datetime]]:
+    """
+    タスクETagの解析
+
+    目的・理由:
+    - If-Matchの値から比較・交換に使うupdated_atを復元する
+
+    前提条件・制約:
+    - 弱いETag（W/）や形式不正の場合はNone
+    """
+    etag = etag.strip()
+    if etag.startswith("W/") or len(etag) < 2 or not (etag.startswith('"') and etag.endswith('"')):
+        return None
+    try:
+        id_hex, micros_hex = etag[1:-1].split("-", 1)
+        return uuid.UUID(hex=id_hex), _EPOCH + timedelta(microseconds=int(micros_hex, 16))
+    except (ValueError, OverflowError):
+        return None
+
+
+def list_etag(parts: Iterable[str]) -> str:
+    """
+    一覧ページのETag生成
+
+    目的・理由:
+    - ページ内容を決める要素（パラメータ、件数、各行のid/updated_at）のハッシュ
+
+    影響範囲:
+    - タスク一覧取得APIのETagヘッダー
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x1f")
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def split_etags(header: str) -> list[str]:
+    """If-Match / If-None-Match ヘッダーのETag一覧"""
+    return [value.strip() for value in header.split(",") if value.strip()]
+
+
+def none_match(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Matchの判定
+
+    目的・理由:
+    - 一致した場合（304を返すべき場合）にFalseを返す
+    - RFC 9110に従い弱い比較（W/を無視）で判定する
+    """
+    if if_none_match is None:
+        return True
+    if if_none_match.strip() == "*":
+        return False
+    strong = etag[2:] if etag.startswith("W/") else etag
+    for candidate in split_etags(if_none_match):
+        if (candidate[2:] if candidate.startswith("W/") else candidate) == strong:
+            return False
+    return True
+
+
+def if_match_versions(if_match: str, task_id: uuid.UUID) -> Optional[list[datetime]]:
+    """
+    If-Matchから比較対象のupdated_atを抽出
+
+    目的・理由:
+    - UPDATE/DELETEの WHERE updated_at = ANY($n) 条件に使う
+
+    前提条件・制約:
+    - "*" の場合はNone（存在すれば無条件に一致）
+    - 当該タスクのETagが1つもない場合は空リスト（必ず412）
+    """
+    if if_match.strip() == "*":
+        return None
+    versions = []
+    for candidate in split_etags(if_match):
+        parsed = parse_task_etag(candidate)
+        if parsed is not None and parsed[0] == task_id:
+            versions.append(parsed[1])
+    return versions
@@ -0,0 +1,185 @@
+"""
+タスク一括エクスポートのエンコーダ
+
+目的・理由:
+- GET /tasks/export で、サーバーサイドカーソルから読んだ行をバッチ単位で
+  NDJSON / CSV / Arrow IPC（ストリーム形式）のバイト列に変換する
+- 結果セット全体をメモリに載せず、バッチごとにエンコードして即座に送出する
+
+影響範囲:
+- タスク一括エクスポートAPI
+
+前提条件・制約:
+- Arrow形式はpyarrowが必要（未インストール時はarrow形式のみ利用不可）
+- 各エンコーダはバッチ（asyncpg Recordのリスト）を受け取りbytesを返す
+"""
+
+import csv
+import io
+from typing import Any, Callable, Optional
+
+from api.serialization import dumps, isoformat_utc, task_dict
+from db.task_repository import TASK_COLUMNS
+
+# 目的・理由: エクスポートする列（NDJSON（task_dict）・JSONレスポンスと同じ列）
+# 前提条件・制約: _row_values・Arrowスキーマの列順と一致させること
+EXPORT_COLUMNS = TASK_COLUMNS
+
+# 目的・理由: 形式ごとのContent-Typeと拡張子
+# 影響範囲: StreamingResponseのヘッダー
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+}
+
+
+def _row_values(row: Any) -> list:
+    """
+    1行をエクスポート用の値リストに変換
+
+    目的・理由:
+    - JSONレスポンスと同じ表現（id文字列、ISO 8601 + "Z"）に揃える
+    """
+    return [
+        str(row["id"]),
+        row["title"],
+        row["description"],
+        row["status"],
+        isoformat_utc(row["created_at"]),
+        isoformat_utc(row["updated_at"]),
+        row["version"],
+    ]
+
+
+def arrow_available() -> bool:
+    """
+    Arrow形式の利用可否
+
+    目的・理由:
+    - pyarrowは任意依存のため、ストリーム開始前に判定して400を返せるようにする
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class _ChunkSink:
+    """
+    Arrow IPCライターの出力先
+
+    目的・理由:
+    - pyarrowが書き出したバイト列をバッチごとに取り出してストリーム送出する
+    """
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+
+    def write(self, data: Any) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class ExportEncoder:
+    """
+    形式別のバッチエンコーダ
+
+    目的・理由:
+    - ヘッダー（CSV列名、Arrowスキーマ）・本体・終端（Arrow EOS）の送出を形式ごとに管理
+
+    影響範囲:
+    - タスク一括エクスポートAPI
+
+    前提条件・制約:
+    - header() → batch() × N → footer() の順に呼び出すこと
+    """
+
+    def __init__(self, fmt: str) -> None:
+        self.fmt = fmt
+        self._arrow_schema: Optional[Any] = None
+        self._arrow_writer: Optional[Any] = None
+        self._arrow_sink: Optional[_ChunkSink] = None
+        self._encode: Callable[[list], bytes] = {
+            "ndjson": self._encode_ndjson,
+            "csv": self._encode_csv,
+            "arrow": self._encode_arrow,
+        }[fmt]
+
+    def header(self) -> bytes:
+        """ストリーム先頭（CSVは列名行、Arrowはスキーマ）"""
+        if self.fmt == "csv":
+            return self._encode_csv([EXPORT_COLUMNS], raw=True)
+        if self.fmt == "arrow":
+            import pyarrow as pa
+
+            self._arrow_schema = pa.schema(
+                [
+                    ("id", pa.string()),
+                    ("title", pa.string()),
+                    ("description", pa.string()),
+                    ("status", pa.string()),
+                    ("created_at", pa.timestamp("us", tz="UTC")),
+                    ("updated_at", pa.timestamp("us", tz="UTC")),
+                    ("version", pa.int32()),
+                ]
+            )
+            self._arrow_sink = _ChunkSink()
+            self._arrow_writer = pa.ipc.new_stream(self._arrow_sink, self._arrow_schema)
+            return self._arrow_sink.drain()
+        return b""
+
+    def batch(self, rows: list) -> bytes:
+        """行バッチのエンコード"""
+        return self._encode(rows)
+
+    def footer(self) -> bytes:
+        """ストリーム終端（ArrowのEOSマーカー）"""
+        if self._arrow_writer is not None:
+            self._arrow_writer.close()
+            return self._arrow_sink.drain()
+        return b""
+
+    @staticmethod
+    def _encode_ndjson(rows: list) -> bytes:
+        if not rows:
+            return b""
+        return b"\n".join(dumps(task_dict(row)) for row in rows) + b"\n"
+
+    @staticmethod
+    def _encode_csv(rows: list, raw: bool = False) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows(rows if raw else (_row_values(row) for row in rows))
+        return buffer.getvalue().encode("utf-8")
+
+    def _encode_arrow(self, rows: list) -> bytes:
+        import pyarrow as pa
+
+        if not rows:
+            return b""
+        batch = pa.record_batch(
+            [
+                pa.array([str(row["id"]) for row in rows], pa.string()),
+                pa.array([row["title"] for row in rows], pa.string()),
+                pa.array([row["description"] for row in rows], pa.string()),
+                pa.array([row["status"] for row in rows], pa.string()),
+                pa.array([row["created_at"] for row in rows], pa.timestamp("us", tz="UTC")),
+                pa.array([row["updated_at"] for row in rows], pa.timestamp("us", tz="UTC")),
+                pa.array([row["version"] for row in rows], pa.int32()),
+            ],
+            schema=self._arrow_schema,
+        )
+        self._arrow_writer.write_batch(batch)
+        return self._arrow_sink.drain()
@@ -19,7 +19,7 @@ from datetime import datetime
 from fastapi import APIRouter, status
 from fastapi.responses import JSONResponse
 
-from db.postgres import get_db_pool
+from db.postgres import get_db_pool, read_routing_stats
 
 
 router = APIRouter()
@@ -33,6 +33,8 @@ async def health_check() -> JSONResponse:
     目的・理由:
     - ALBからのヘルスチェックに応答
     - DB接続状態を確認し、異常時は503を返す
+    - リードレプリカ設定時は各レプリカの状態（遅延・振り分け可否）も返す
+      （レプリカの異常ではプライマリで処理を継続できるため503にしない）
     - X-Rayトレースは行わない（軽量エンドポイント）
 
     影響範囲:
@@ -55,6 +57,10 @@ async def health_check() -> JSONResponse:
                 "status": "healthy",
                 "timestamp": datetime.utcnow().isoformat() + "Z",
                 "version": "1.0.0",
+                "read_replicas": [
+                    {key: replica[key] for key in ("name", "available", "lag_seconds")}
+                    for replica in read_routing_stats()["replicas"]
+                ],
             },
         )
 
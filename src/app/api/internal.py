@@ -0,0 +1,199 @@
+"""
+内部運用API
+
+目的・理由:
+- キャッシュ・クエリ実行等のプロセス内統計を運用者が確認できるようにする
+- X-Rayトレースは行わない（軽量エンドポイント）
+
+影響範囲:
+- 運用・監視（/internal/*）
+
+前提条件・制約:
+- ENABLE_INTERNAL_API=true の場合のみルーターを登録する（未設定時は/internal/*が404）
+- 有効にする場合も、ALBのリスナールール等で外部公開しないこと（認証なし）
+- 値はリクエストを受けたプロセス（ECSタスク）単位
+"""
+
+import os
+
+from fastapi import APIRouter
+
+from db.idempotency import idempotency_stats
+from db.migrate import schema_status
+from db.partitions import partition_stats
+from db.postgres import pool_stats, read_routing_stats
+from db.single_flight import read_flight
+from db.task_cache import task_cache
+from db.task_events import event_hub
+from db.task_repository import statement_stats
+from db.write_batcher import insert_batcher
+
+
+# 目的・理由: 本番環境で内部運用API（キャッシュ・クエリ・接続プール・スキーマ等の統計）を公開しないため
+# 影響範囲: /internal/*
+# 前提条件・制約: 環境変数ENABLE_INTERNAL_APIがtrueの場合のみ有効（main.pyでルーターを登録する）
+ENABLE_INTERNAL_API = os.getenv("ENABLE_INTERNAL_API", "false").lower() == "true"
+
+router = APIRouter(prefix="/internal", tags=["internal"])
+
+
+@router.get("/task-cache")
+async def task_cache_stats() -> dict:
+    """
+    タスクキャッシュ統計
+
+    目的・理由:
+    - ヒット/ミス/追い出し/無効化の回数とヒット率を返す
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - プロセス起動からの累計値
+    """
+    return task_cache.stats()
+
+
+@router.get("/task-queries")
+async def task_query_stats() -> dict:
+    """
+    タスククエリ統計
+
+    目的・理由:
+    - プリペアドステートメント別の実行回数・エラー回数・平均/最大所要時間を返す
+    - 想定外に遅いクエリ形状（フィルター/更新列の組み合わせ）を特定する
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - プロセス起動からの累計値
+    """
+    return statement_stats()
+
+
+@router.get("/single-flight")
+async def single_flight_stats() -> dict:
+    """
+    読み取り合流統計
+
+    目的・理由:
+    - 同一読み取りの呼び出し回数・DB実行回数・合流回数と合流率を返す
+    - アクセス集中時に接続プールの負荷をどれだけ削減できているかを確認する
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - プロセス起動からの累計値
+    """
+    return read_flight.stats()
+
+
+@router.get("/task-stream")
+async def task_stream_stats() -> dict:
+    """
+    タスク変更ストリーム統計
+
+    目的・理由:
+    - 購読者数・配信イベント数・バッファ溢れによる切断数を返す
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - プロセス起動からの累計値
+    """
+    return event_hub.stats()
+
+
+@router.get("/db-pools")
+async def db_pool_stats() -> dict:
+    """
+    接続プール・読み取り振り分け統計
+
+    目的・理由:
+    - 接続プールごとの接続数・同時使用数の上限・接続取得の待ち時間ヒストグラム・接続の経過時間を返す
+      （プール枯渇による遅延の切り分け）
+    - リードレプリカごとの遅延・使用中の接続数・振り分け回数と、プライマリへのフォールバック回数を返す
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - 待ち時間・回数はプロセス起動からの累計値
+    - 遅延は直近の確認時点の値（DATABASE_READ_LAG_CHECK_SECONDSごと）
+    """
+    return {**read_routing_stats(), "pools": pool_stats()}
+
+
+@router.get("/idempotency")
+async def idempotency_key_stats() -> dict:
+    """
+    冪等キー統計
+
+    目的・理由:
+    - Idempotency-Key付きの作成のうち、新規作成・保存済み応答の再送出（先行の完了待ちを含む）・
+      本文不一致の件数と、期限切れキーの削除件数を返す（再送の嵐をどれだけ吸収できているかの確認）
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - プロセス起動からの累計値
+    """
+    return idempotency_stats()
+
+
+@router.get("/insert-batches")
+async def insert_batch_stats() -> dict:
+    """
+    タスク作成のグループコミット統計
+
+    目的・理由:
+    - 1文でINSERTしたバッチ数・行数・平均/最大件数・件数分布と、1件ずつのINSERTへのフォールバック回数を返す
+      （TASK_INSERT_BATCH_MAX_WAIT_MS / TASK_INSERT_BATCH_MAX_SIZEの調整に使う）
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - プロセス起動からの累計値
+    """
+    return insert_batcher.stats()
+
+
+@router.get("/task-partitions")
+async def task_partition_stats() -> dict:
+    """
+    tasksパーティション統計
+
+    目的・理由:
+    - 直近の定期処理時点のパーティション一覧（範囲・推定行数）と、作成・CSV保存・切り離し・削除の件数を返す
+      （翌月以降のパーティションが用意されているか、保持期間が適用されているかの確認）
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - 件数はプロセス起動からの累計値。パーティション一覧は定期処理を実行したプロセスのみ
+    """
+    return partition_stats()
+
+
+@router.get("/schema")
+async def schema_version_status() -> dict:
+    """
+    スキーマのバージョン
+
+    目的・理由:
+    - 起動時に確認したschema_versionの適用済みバージョン・最新のマイグレーション番号・未適用のマイグレーションを返す
+      （デプロイ前にマイグレーションを適用し忘れていないかの確認）
+
+    影響範囲:
+    - なし（読み取り専用）
+
+    前提条件・制約:
+    - 値は起動時点（起動後に適用したマイグレーションは再起動まで反映されない）
+    """
+    return schema_status()
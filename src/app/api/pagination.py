@@ -0,0 +1,149 @@
+"""
+キーセット（カーソル）ページネーション
+
+目的・理由:
+- OFFSET方式は深いページほど読み飛ばす行が増え、遅延が線形に悪化する
+- (created_at, id) のシーク条件で「前ページの最終行の次」から読み始める
+- カーソルは不透明な文字列としてクライアントに渡し、内部構造を隠蔽する
+
+影響範囲:
+- タスク一覧取得API（GET /tasks）
+- タスク検索API（GET /tasks/search、(score, id) のカーソル）
+
+前提条件・制約:
+- 並び順は created_at DESC, id DESC 固定（検索は score DESC, id DESC）
+- カーソルはBase64URL(JSON)形式。改ざん・破損時はValueErrorを送出
+"""
+
+import base64
+import binascii
+import json
+import math
+import uuid
+from datetime import datetime
+from typing import Union
+
+
+# 目的・理由: 既定の並び順（並び順を含まない従来のカーソルはこの並び順とみなす）
+DEFAULT_SORT = "-created_at"
+
+# 目的・理由: カーソル値を日時として復元する並び順の列
+_TIMESTAMP_COLUMNS = ("created_at", "updated_at")
+
+
+def encode_cursor(value: Union[datetime, str], task_id: uuid.UUID, sort: str = DEFAULT_SORT) -> str:
+    """
+    カーソル文字列の生成
+
+    目的・理由:
+    - ページ最終行の (並び順の列の値, id) を次ページの開始位置として返す
+    - マイクロ秒精度を保持するため日時はisoformat()をそのまま格納
+    - 並び順を格納し、別の並び順のリクエストで使われた場合に検出する
+
+    影響範囲:
+    - TaskListResponse.next_cursor
+
+    前提条件・制約:
+    - 日時はタイムゾーン付きdatetimeであること
+    """
+    payload = {"c": value.isoformat() if isinstance(value, datetime) else value, "i": str(task_id)}
+    if sort != DEFAULT_SORT:
+        payload["k"] = sort
+    encoded = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(encoded.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str = DEFAULT_SORT) -> tuple[Union[datetime, str], uuid.UUID]:
+    """
+    カーソル文字列の解析
+
+    目的・理由:
+    - クライアントから受け取ったカーソルをシーク条件の値に戻す
+
+    影響範囲:
+    - タスク一覧取得API（cursorパラメータ）
+
+    前提条件・制約:
+    - 不正なカーソル、並び順が一致しないカーソルの場合はValueErrorを送出（呼び出し側で400に変換）
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload.get("k", DEFAULT_SORT) != sort:
+            raise ValueError("cursor was issued for another sort order")
+        if sort.lstrip("-") in _TIMESTAMP_COLUMNS:
+            value = datetime.fromisoformat(payload["c"])
+            if value.tzinfo is None:
+                raise ValueError("cursor timestamp has no timezone")
+        else:
+            value = payload["c"]
+            if not isinstance(value, str):
+                raise ValueError("cursor value must be a string")
+        task_id = uuid.UUID(payload["i"])
+    except (binascii.Error, UnicodeError, json.JSONDecodeError, KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    return value, task_id
+
+
+def build_seek_condition(
+    value_param: int,
+    id_param: int,
+    column: str = "created_at",
+    descending: bool = True,
+) -> str:
+    """
+    シーク条件（WHERE句）の生成
+
+    目的・理由:
+    - 降順なら (column, id) < (カーソル値)、昇順なら > を表す条件を生成
+    - 先頭の column <= $n（昇順は >=）によって、並び順の列が先頭のインデックスの
+      範囲スキャンを効かせる（行値比較だけだとインデックスの境界条件として使われにくいため）
+
+    影響範囲:
+    - タスク一覧取得API
+
+    前提条件・制約:
+    - 引数はプレースホルダ番号（$n の n）
+    """
+    c = f"${value_param}"
+    i = f"${id_param}"
+    if descending:
+        return f"{column} <= {c} AND ({column} < {c} OR id < {i})"
+    return f"{column} >= {c} AND ({column} > {c} OR id > {i})"
+
+
+def encode_search_cursor(score: float, task_id: uuid.UUID) -> str:
+    """
+    検索カーソル文字列の生成
+
+    目的・理由:
+    - 検索結果の最終行の (score, id) を次ページの開始位置として返す
+    - scoreはfloat8のまま格納し、JSONの往復で値が変わらないようにする（等値比較のため）
+
+    影響範囲:
+    - TaskSearchResponse.next_cursor
+    """
+    payload = json.dumps({"s": score, "i": str(task_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    """
+    検索カーソル文字列の解析
+
+    前提条件・制約:
+    - 不正なカーソルの場合はValueErrorを送出（呼び出し側で400に変換）
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        score = float(payload["s"])
+        task_id = uuid.UUID(payload["i"])
+    except (binascii.Error, UnicodeError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+    if not math.isfinite(score):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    return score, task_id
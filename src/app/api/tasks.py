@@ -15,17 +15,33 @@
 - X-Ray Daemonが稼働していること（ECS環境）
 """
 
+import asyncio
 import os
 import time
 import uuid
-from typing import Optional
+from datetime import datetime
+from typing import Optional, Union
 
+import asyncpg
 import httpx
-from fastapi import APIRouter, HTTPException, Query, status
+import orjson
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from aws_xray_sdk.core import xray_recorder
-from db.postgres import get_db_pool
+from api.etag import if_match_versions, list_etag, none_match, task_etag
+from api.export import EXPORT_FORMATS, ExportEncoder, arrow_available
+from api.pagination import decode_cursor, decode_search_cursor, encode_cursor, encode_search_cursor
+from api.serialization import TaskJSONResponse, dumps, parse_fields, task_dict
+from db import idempotency, task_repository
+from db.counts import adjust_cached_counts, count_tasks, move_cached_count
+from db.postgres import DATABASE_READ_MAX_LAG_SECONDS, PRIMARY_POOL_NAME, get_db_pool, get_read_pool
+from db.single_flight import flight_key, read_flight, record_flight_result
+from db.task_events import TASK_STREAM_HEARTBEAT_SECONDS, Subscriber, event_hub, publish_task_event
+from db.task_cache import publish_invalidation, record_cache_result, task_cache
+from db.write_batcher import TASK_INSERT_BATCH_ENABLED, insert_batcher
+from middleware.deadline import DeadlineExceeded, outbound_timeout
 
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
@@ -40,6 +56,15 @@ router = APIRouter(prefix="/tasks", tags=["tasks"])
 # 前提条件・制約: 環境変数ENABLE_FAULT_SIMULATIONがtrueの場合のみ有効
 ENABLE_FAULT_SIMULATION = os.getenv("ENABLE_FAULT_SIMULATION", "false").lower() == "true"
 
+# 目的・理由: 一括エクスポートでサーバーサイドカーソルから一度に読む行数（メモリ使用量の上限を決める）
+# 影響範囲: /tasks/export
+# 前提条件・制約: 環境変数TASK_EXPORT_BATCH_SIZEで変更可能
+EXPORT_BATCH_SIZE = int(os.getenv("TASK_EXPORT_BATCH_SIZE", "1000"))
+
+
+# 目的・理由: ステータスの許容値（一覧取得の複数ステータス指定の検証に使用）
+TASK_STATUSES = ("pending", "in_progress", "completed")
+
 
 # --------------------------------
 # Pydanticモデル（リクエスト/レスポンス）
@@ -75,17 +100,20 @@ class TaskUpdate(BaseModel):
     目的・理由:
     - PUT /tasks/{id}のリクエストボディをバリデーション
     - 部分更新を許可（すべてのフィールドが任意）
+    - expected_version指定時は、タスクのversionが一致する場合のみ更新する（楽観的排他制御）
 
     影響範囲:
     - タスク更新API
 
     前提条件・制約:
     - すべてのフィールドが任意
+    - expected_versionはタスク取得時のversion（If-Matchヘッダーとは併用不可）
     """
 
     title: Optional[str] = Field(None, min_length=1, max_length=100)
     description: Optional[str] = Field(None, max_length=500)
     status: Optional[str] = Field(None, pattern="^(pending|in_progress|completed)$")
+    expected_version: Optional[int] = Field(None, ge=1)
 
 
 class TaskResponse(BaseModel):
@@ -102,6 +130,7 @@ class TaskResponse(BaseModel):
     前提条件・制約:
     - idはUUID形式
     - created_at/updated_atはISO 8601形式
+    - versionは作成時1、更新のたびに1増える（更新時のexpected_versionに指定する）
     """
 
     id: str
@@ -110,6 +139,31 @@ class TaskResponse(BaseModel):
     status: str
     created_at: str
     updated_at: str
+    version: int
+
+
+class TaskSparseResponse(BaseModel):
+    """
+    タスクレスポンス（疎なフィールドセット）
+
+    目的・理由:
+    - fieldsパラメータ指定時、指定されなかった項目はレスポンスに含めない
+    - すべての項目を任意とし、項目を省略したレスポンスもスキーマ上有効にする
+
+    影響範囲:
+    - タスク一覧取得API、タスク詳細取得API（fields指定時）
+
+    前提条件・制約:
+    - 含まれる項目の形式はTaskResponseと同じ
+    """
+
+    id: Optional[str] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    status: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    version: Optional[int] = None
 
 
 class TaskListResponse(BaseModel):
@@ -119,18 +173,59 @@ class TaskListResponse(BaseModel):
     目的・理由:
     - タスク一覧のページネーション対応
     - total/limit/offsetでページ情報を提供
+    - next_cursorで次ページのキーセットカーソルを提供
+    - count_modeでtotalの取得方法（精度）を明示
+    - fields指定時、tasksの各要素は指定された項目のみ（TaskSparseResponse）
 
     影響範囲:
     - タスク一覧取得API
 
     前提条件・制約:
     - tasksは空配列を許可
+    - next_cursorは次ページが存在しない場合None
+    - count_modeがnoneの場合totalはNone、estimate/cachedの場合は近似値
     """
 
-    tasks: list[TaskResponse]
-    total: int
+    tasks: list[Union[TaskResponse, TaskSparseResponse]]
+    total: Optional[int]
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
+    count_mode: str = "exact"
+
+
+class TaskSearchHit(TaskResponse):
+    """
+    タスク検索結果の1件
+
+    目的・理由:
+    - タスクオブジェクトに検索スコア（全文一致の順位 + タイトル類似度）を付与
+
+    影響範囲:
+    - タスク検索API
+    """
+
+    score: float
+
+
+class TaskSearchResponse(BaseModel):
+    """
+    タスク検索レスポンス
+
+    目的・理由:
+    - スコア順の検索結果とキーセットカーソルを返す
+    - 件数（total）は返さない（一致件数の集計は全候補の評価が必要なため）
+
+    影響範囲:
+    - タスク検索API
+
+    前提条件・制約:
+    - next_cursorは次ページが存在しない場合None
+    """
+
+    tasks: list[TaskSearchHit]
+    limit: int
+    next_cursor: Optional[str] = None
 
 
 # --------------------------------
@@ -142,7 +237,7 @@ class TaskListResponse(BaseModel):
 
 
 @router.get("/slow-db", response_model=dict)
-async def slow_db_simulation() -> dict:
+async def slow_db_simulation() -> TaskJSONResponse:
     """
     DB遅延シミュレーション（X-Ray検証用）
 
@@ -166,11 +261,12 @@ async def slow_db_simulation() -> dict:
             detail={"error": {"code": "FORBIDDEN", "message": "Fault simulation is disabled"}},
         )
 
-    pool = await get_db_pool()
+    pool, pool_name = await get_read_pool()
 
     # X-Rayサブセグメント（PostgreSQL pg_sleep(3)）
     with xray_recorder.capture("PostgreSQL Delay Simulation") as subsegment:
         subsegment.namespace = "remote"
+        subsegment.put_annotation("db_pool", pool_name)
         subsegment.put_annotation("simulation_type", "db-slow")
         subsegment.put_metadata("delay_seconds", 3)
 
@@ -186,32 +282,21 @@ async def slow_db_simulation() -> dict:
     # 通常のタスク一覧取得
     with xray_recorder.capture("PostgreSQL SELECT tasks") as subsegment:
         subsegment.namespace = "remote"
+        subsegment.put_annotation("db_pool", pool_name)
         async with pool.acquire() as conn:
-            query = "SELECT * FROM tasks ORDER BY created_at DESC LIMIT 20"
-            rows = await conn.fetch(query)
+            query = task_repository.sql("select_recent")
+            rows = await task_repository.fetch(conn, "select_recent")
             subsegment.sql = {
                 "database_type": "PostgreSQL",
                 "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
                 "sanitized_query": query
             }
 
-    tasks = [
-        {
-            "id": str(row["id"]),
-            "title": row["title"],
-            "description": row["description"],
-            "status": row["status"],
-            "created_at": row["created_at"].isoformat() + "Z",
-            "updated_at": row["updated_at"].isoformat() + "Z",
-        }
-        for row in rows
-    ]
-
-    return {"tasks": tasks, "simulation": "db-slow", "delay_seconds": 3}
+    return TaskJSONResponse({"tasks": [task_dict(row) for row in rows], "simulation": "db-slow", "delay_seconds": 3})
 
 
 @router.get("/slow-logic", response_model=dict)
-async def slow_logic_simulation() -> dict:
+async def slow_logic_simulation() -> TaskJSONResponse:
     """
     ロジック遅延シミュレーション（X-Ray検証用）
 
@@ -243,35 +328,24 @@ async def slow_logic_simulation() -> dict:
         time.sleep(5)  # 5秒遅延
 
     # 通常のタスク一覧取得
-    pool = await get_db_pool()
+    pool, pool_name = await get_read_pool()
     with xray_recorder.capture("PostgreSQL SELECT tasks") as subsegment:
         subsegment.namespace = "remote"
+        subsegment.put_annotation("db_pool", pool_name)
         async with pool.acquire() as conn:
-            query = "SELECT * FROM tasks ORDER BY created_at DESC LIMIT 20"
-            rows = await conn.fetch(query)
+            query = task_repository.sql("select_recent")
+            rows = await task_repository.fetch(conn, "select_recent")
             subsegment.sql = {
                 "database_type": "PostgreSQL",
                 "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
                 "sanitized_query": query
             }
 
-    tasks = [
-        {
-            "id": str(row["id"]),
-            "title": row["title"],
-            "description": row["description"],
-            "status": row["status"],
-            "created_at": row["created_at"].isoformat() + "Z",
-            "updated_at": row["updated_at"].isoformat() + "Z",
-        }
-        for row in rows
-    ]
-
-    return {"tasks": tasks, "simulation": "logic-slow", "delay_seconds": 5}
+    return TaskJSONResponse({"tasks": [task_dict(row) for row in rows], "simulation": "logic-slow", "delay_seconds": 5})
 
 
 @router.get("/slow-external", response_model=dict)
-async def slow_external_simulation() -> dict:
+async def slow_external_simulation() -> TaskJSONResponse:
     """
     外部API遅延シミュレーション（X-Ray検証用）
 
@@ -288,6 +362,7 @@ async def slow_external_simulation() -> dict:
     - 本番環境では無効化すべき
     - httpbin.orgが利用可能であること
     - ENABLE_FAULT_SIMULATION=true の場合のみ有効
+    - 外部APIのタイムアウトは10秒とリクエストの残り時間の小さい方（超えた場合は504）
     """
     # 環境変数チェック
     if not ENABLE_FAULT_SIMULATION:
@@ -304,91 +379,174 @@ async def slow_external_simulation() -> dict:
         subsegment.put_metadata("external_url", "https://httpbin.org/delay/2")
 
         async with httpx.AsyncClient() as client:
-            response = await client.get("https://httpbin.org/delay/2", timeout=10.0)
+            try:
+                response = await client.get("https://httpbin.org/delay/2", timeout=outbound_timeout(10.0))
+            except httpx.TimeoutException as e:
+                raise DeadlineExceeded(f"external API call timed out: {e}") from e
             subsegment.put_metadata("external_api_status", response.status_code)
             subsegment.put_metadata("external_api_response_time_ms", response.elapsed.total_seconds() * 1000)
 
     # 通常のタスク一覧取得
-    pool = await get_db_pool()
+    pool, pool_name = await get_read_pool()
     with xray_recorder.capture("PostgreSQL SELECT tasks") as subsegment:
         subsegment.namespace = "remote"
+        subsegment.put_annotation("db_pool", pool_name)
         async with pool.acquire() as conn:
-            query = "SELECT * FROM tasks ORDER BY created_at DESC LIMIT 20"
-            rows = await conn.fetch(query)
+            query = task_repository.sql("select_recent")
+            rows = await task_repository.fetch(conn, "select_recent")
             subsegment.sql = {
                 "database_type": "PostgreSQL",
                 "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
                 "sanitized_query": query
             }
 
-    tasks = [
-        {
-            "id": str(row["id"]),
-            "title": row["title"],
-            "description": row["description"],
-            "status": row["status"],
-            "created_at": row["created_at"].isoformat() + "Z",
-            "updated_at": row["updated_at"].isoformat() + "Z",
-        }
-        for row in rows
-    ]
+    return TaskJSONResponse({"tasks": [task_dict(row) for row in rows], "simulation": "external-slow", "delay_seconds": 2})
+
+
+# --------------------------------
+# 一括エクスポート
+# --------------------------------
+
+
+async def _stream_export(query_name: str, params: list, export_format: str):
+    """
+    エクスポートのストリーム生成
+
+    目的・理由:
+    - REPEATABLE READ / READ ONLYトランザクション内のサーバーサイドカーソルから
+      EXPORT_BATCH_SIZE行ずつ読み、エンコードして即座に送出する
+    - 全バッチが同一スナップショットから読まれるため、途中の書き込みの影響を受けない
+    - メモリ使用量はバッチサイズで頭打ちになり、テーブルサイズに依存しない
+
+    影響範囲:
+    - PostgreSQL（接続を1本、ストリーム完了まで占有）
+
+    前提条件・制約:
+    - クライアント切断時はジェネレータが閉じられ、トランザクションと接続が解放される
+    - レスポンス送出はX-Rayセグメント終了後に行われるため、サブセグメントは作成しない
+    """
+    pool = await get_db_pool()
+    encoder = ExportEncoder(export_format)
+
+    async with pool.acquire() as conn:
+        async with conn.transaction(isolation="repeatable_read", readonly=True):
+            cursor = await task_repository.cursor(conn, query_name, *params)
+            yield encoder.header()
+            while True:
+                rows = await cursor.fetch(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                yield encoder.batch(rows)
+            yield encoder.footer()
+
+
+@router.get("/export")
+async def export_tasks(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv|arrow)$"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+) -> StreamingResponse:
+    """
+    タスク一括エクスポート
+
+    目的・理由:
+    - GET /tasks（limit最大100）の繰り返し取得に代わり、全件を1リクエストでストリーム送出
+    - NDJSON / CSV / Arrow IPC（ストリーム形式）に対応
+
+    影響範囲:
+    - PostgreSQL（SELECT tasks、サーバーサイドカーソル）
+    - X-Rayトレース（リクエストセグメントへのアノテーションのみ）
+
+    前提条件・制約:
+    - formatはndjson/csv/arrowのいずれか（arrowはpyarrowが必要）
+    - status_filterはpending/in_progress/completedのいずれか（任意）
+    - 行の順序は保証しない（全件スキャンを優先）
+    """
+    if export_format == "arrow" and not arrow_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "UNSUPPORTED_FORMAT", "message": "Arrow export requires pyarrow"}},
+        )
 
-    return {"tasks": tasks, "simulation": "external-slow", "delay_seconds": 2}
+    query_name = "export_status" if status_filter else "export"
+    params = [status_filter] if status_filter else []
+    query = task_repository.sql(query_name)
+
+    segment = xray_recorder.current_segment()
+    if segment is not None:
+        segment.put_annotation("export_format", export_format)
+        segment.put_metadata("export_query", query)
+
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        _stream_export(query_name, params, export_format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{extension}"'},
+    )
 
 
 # --------------------------------
-# タスクCRUD操作
+# タスク検索
 # --------------------------------
 
 
-@router.get("", response_model=TaskListResponse)
-async def list_tasks(
+@router.get("/search", response_model=TaskSearchResponse)
+async def search_tasks(
+    q: str = Query(..., min_length=1, max_length=100),
     status_filter: Optional[str] = Query(None, alias="status"),
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-) -> TaskListResponse:
+    cursor: Optional[str] = Query(None),
+) -> TaskJSONResponse:
     """
-    タスク一覧取得
+    タスク検索
 
     目的・理由:
-    - タスク一覧をページネーション対応で取得
-    - ステータスフィルター機能を提供
-    - X-Rayでクエリ実行をトレース
+    - タイトル・説明を対象に、全文検索（tsvector + GIN、各語の前方一致）と
+      タイトルの類似度検索（pg_trgm、誤字に強い）で検索する
+    - スコア順（score DESC, id DESC）に返し、(score, id) のキーセットカーソルでページングする
+    - クライアント側で全ページを取得して絞り込む必要をなくす
 
     影響範囲:
-    - PostgreSQL（SELECT tasks）
+    - PostgreSQL（SELECT tasks、idx_tasks_search_vector / idx_tasks_title_trgm）
     - X-Rayトレース
 
     前提条件・制約:
-    - limitは1〜100の範囲
-    - offsetは0以上
+    - qは1〜100文字。単語構成文字を1文字も含まない場合は400
+    - 日本語は分かち書きしないため、語の途中からの一致はタイトルの類似度検索のみが対象
     - status_filterはpending/in_progress/completedのいずれか（任意）
     """
-    pool = await get_db_pool()
+    tsquery = task_repository.prefix_tsquery(q)
+    if tsquery is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": "q must contain at least one word"}},
+        )
+
+    params: list = [q, tsquery]
+    if status_filter:
+        params.append(status_filter)
+    if cursor is not None:
+        try:
+            params.extend(decode_search_cursor(cursor))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"error": {"code": "INVALID_CURSOR", "message": "cursor is malformed"}},
+            )
 
-    # X-Rayサブセグメント（PostgreSQL SELECT）
+    # 次ページ有無の判定のためlimit+1件取得
+    params.append(limit + 1)
+    query_name = task_repository.search_query_name(bool(status_filter), cursor is not None)
+    query = task_repository.sql(query_name)
+
+    pool, pool_name = await get_read_pool()
+
+    # X-Rayサブセグメント（PostgreSQL SELECT、全文検索）
     with xray_recorder.capture("PostgreSQL") as subsegment:
         subsegment.namespace = "remote"
+        subsegment.put_annotation("db_pool", pool_name)
+        subsegment.put_annotation("search", True)
         async with pool.acquire() as conn:
-            # WHERE句の構築
-            where_clause = ""
-            params = []
-            if status_filter:
-                where_clause = "WHERE status = $1"
-                params.append(status_filter)
-                query = f"SELECT * FROM tasks {where_clause} ORDER BY created_at DESC LIMIT ${len(params) + 1} OFFSET ${len(params) + 2}"
-                params.extend([limit, offset])
-                count_query = f"SELECT COUNT(*) FROM tasks {where_clause}"
-                count_params = [status_filter]
-            else:
-                query = "SELECT * FROM tasks ORDER BY created_at DESC LIMIT $1 OFFSET $2"
-                params = [limit, offset]
-                count_query = "SELECT COUNT(*) FROM tasks"
-                count_params = []
-
-            # タスク取得
-            rows = await conn.fetch(query, *params)
-            total = await conn.fetchval(count_query, *count_params)
+            rows = await task_repository.fetch(conn, query_name, *params)
 
             # X-RayでRDS情報を設定
             subsegment.sql = {
@@ -397,54 +555,384 @@ async def list_tasks(
                 "sanitized_query": query
             }
 
-    # レスポンス構築
-    tasks = [
-        TaskResponse(
-            id=str(row["id"]),
-            title=row["title"],
-            description=row["description"],
-            status=row["status"],
-            created_at=row["created_at"].isoformat() + "Z",
-            updated_at=row["updated_at"].isoformat() + "Z",
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_search_cursor(rows[-1]["score"], rows[-1]["id"])
+
+    hits = []
+    for row in rows:
+        hit = task_dict(row)
+        hit["score"] = row["score"]
+        hits.append(hit)
+
+    return TaskJSONResponse({"tasks": hits, "limit": limit, "next_cursor": next_cursor})
+
+
+# --------------------------------
+# タスク変更ストリーム
+# --------------------------------
+
+
+async def _stream_events(subscriber: Subscriber):
+    """
+    SSEの送出
+
+    目的・理由:
+    - 購読者のキューからエンコード済みフレームを送り、イベントがない間はコメントを送る
+    - バッファ溢れで切断された場合はdroppedイベントを送って終了する（クライアントは再接続・再取得する）
+
+    前提条件・制約:
+    - クライアント切断時はジェネレーターがキャンセルされ、finallyで購読を解除する
+    """
+    try:
+        yield b"retry: 3000\n: connected\n\n"
+        while not subscriber.dropped:
+            try:
+                frame = await asyncio.wait_for(subscriber.queue.get(), TASK_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            if subscriber.dropped:
+                break
+            yield frame
+        yield b'event: dropped\ndata: {"op":"dropped"}\n\n'
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+
+@router.get("/stream")
+async def stream_task_events(
+    status_filter: Optional[list[str]] = Query(None, alias="status"),
+) -> StreamingResponse:
+    """
+    タスク変更ストリーム（Server-Sent Events）
+
+    目的・理由:
+    - GET /tasksのポーリングに代わり、作成/更新/削除をイベントとして受け取れるようにする
+    - プロセスごとに1本のLISTEN接続で受信したイベントを全購読者へ配る（購読者ごとのDB接続は使わない）
+
+    影響範囲:
+    - なし（DBアクセスなし。X-Rayはリクエストセグメントのみ）
+
+    前提条件・制約:
+    - status_filterはpending/in_progress/completedのいずれか（任意、複数可）。
+      変更前後のステータスのいずれかが一致するイベントと、一括操作・resyncイベントを受け取る
+    - イベント: created/updated/deleted（data.task）、bulk_created/bulk_updated/bulk_deleted（data.count。
+      条件指定の一括更新/削除はチャンクごと）、
+      resync（取りこぼしの可能性あり、一覧を再取得すること）、dropped（読み取りが遅く切断された）
+    - 購読者数がTASK_STREAM_MAX_SUBSCRIBERSに達している場合は503
+    """
+    try:
+        statuses = _parse_statuses(status_filter)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": str(e)}},
         )
-        for row in rows
-    ]
 
-    return TaskListResponse(tasks=tasks, total=total, limit=limit, offset=offset)
+    subscriber = event_hub.subscribe(frozenset(statuses) if statuses else None)
+    if subscriber is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail={"error": {"code": "TOO_MANY_SUBSCRIBERS", "message": "Task stream subscriber limit reached"}},
+        )
+
+    segment = xray_recorder.current_segment()
+    if segment is not None:
+        segment.put_annotation("task_stream", True)
+
+    return StreamingResponse(
+        _stream_events(subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
-@router.get("/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: str) -> TaskResponse:
+# --------------------------------
+# タスクCRUD操作
+# --------------------------------
+
+
+def _parse_statuses(values: Optional[list[str]]) -> tuple[str, ...]:
+    """
+    statusパラメータ（複数指定）の解析
+
+    目的・理由:
+    - status=pending&status=completed と status=pending,completed の両方を受け付ける
+    - 重複を除きTASK_STATUSES順に揃え、同じ組み合わせが同じETag・クエリになるようにする
+
+    前提条件・制約:
+    - 未指定時は空タプル、未知のステータスはValueError
+    """
+    requested = {value.strip() for item in values or () for value in item.split(",") if value.strip()}
+    unknown = requested.difference(TASK_STATUSES)
+    if unknown:
+        raise ValueError(f"unknown status: {', '.join(sorted(unknown))}")
+    return tuple(value for value in TASK_STATUSES if value in requested)
+
+
+@router.get("", response_model=TaskListResponse)
+async def list_tasks(
+    status_filter: Optional[list[str]] = Query(None, alias="status"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None),
+    count_mode: str = Query("exact", alias="count", pattern="^(exact|estimate|cached|none)$"),
+    fields: Optional[str] = Query(None),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    updated_from: Optional[datetime] = Query(None),
+    updated_to: Optional[datetime] = Query(None),
+    sort: str = Query(task_repository.DEFAULT_LIST_SORT, pattern="^-?(created_at|updated_at|title)$"),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
+    """
+    タスク一覧取得
+
+    目的・理由:
+    - タスク一覧をページネーション対応で取得
+    - ステータス（複数指定可）・作成日時/更新日時の範囲で絞り込む
+    - 作成日時・更新日時・タイトルの昇順/降順で並べる（同順位はid）
+    - cursor指定時はキーセット方式で取得し、深いページでも一定の遅延に抑える
+    - ページ内容のETagを返し、If-None-Matchが一致すれば304（本文の構築・送信を省略）
+    - 本文はTaskJSONResponse（orjson）で直接エンコードし、response_modelの再検証を省略
+    - fields指定時は指定項目のみをSELECTし（description等の転送・デコードを省略）、出力も指定項目のみにする
+    - リードレプリカ設定時はレプリカから読む（遅延上限を超えたレプリカは使わない）
+    - X-Rayでクエリ実行と読み取り先の接続プール（db_pool）をトレース
+
+    影響範囲:
+    - PostgreSQL（SELECT tasks）
+    - X-Rayトレース
+
+    前提条件・制約:
+    - limitは1〜100の範囲
+    - offsetは0以上（後方互換のため維持、cursorとの併用は不可）
+    - cursorは直前レスポンスのnext_cursor（任意）
+    - countはexact/estimate/cached/noneのいずれか（totalの取得方法、既定exact）
+    - status_filterはpending/in_progress/completedのいずれか（任意、繰り返し指定またはカンマ区切りで複数可）
+    - created_from/updated_fromは以上、created_to/updated_toは未満（任意、タイムゾーン付きISO 8601）
+    - sortは created_at/updated_at/title（"-"付きで降順、既定-created_at）。cursorは同じsortでのみ有効
+    - fieldsはカンマ区切りの項目名（任意）。id/created_at/updated_atと並び順の列はカーソル・ETagのため常にSELECTする
+    """
+    if cursor is not None and offset:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": "cursor and offset cannot be combined"}},
+        )
+
+    try:
+        selected_fields = parse_fields(fields)
+        statuses = _parse_statuses(status_filter)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": str(e)}},
+        )
+
+    range_values = {
+        "created_from": created_from,
+        "created_to": created_to,
+        "updated_from": updated_from,
+        "updated_to": updated_to,
+    }
+    ranges = tuple(name for name, value in range_values.items() if value is not None)
+    if any(range_values[name].tzinfo is None for name in ranges):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": "date range values must include a timezone"}},
+        )
+
+    # パラメータの構築（SQLはフィルター形状・並び順・射影ごとにリポジトリで確定）
+    params: list = []
+    if statuses:
+        params.append(statuses[0] if len(statuses) == 1 else list(statuses))
+    params.extend(range_values[name] for name in ranges)
+    filter_params = list(params)
+    if cursor is not None:
+        try:
+            params.extend(decode_cursor(cursor, sort))
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"error": {"code": "INVALID_CURSOR", "message": "cursor is malformed"}},
+            )
+
+    # 次ページ有無の判定のためlimit+1件取得
+    params.append(limit + 1)
+    if cursor is None:
+        params.append(offset)
+    query_name = task_repository.list_query_name(
+        cursor is not None,
+        task_repository.list_columns(selected_fields, sort),
+        len(statuses),
+        ranges,
+        sort,
+    )
+    query = task_repository.sql(query_name)
+
+    async def load_page() -> tuple[list, Optional[int]]:
+        pool, pool_name = await get_read_pool()
+
+        # X-Rayサブセグメント（PostgreSQL SELECT）
+        with xray_recorder.capture("PostgreSQL") as subsegment:
+            subsegment.namespace = "remote"
+            subsegment.put_annotation("db_pool", pool_name)
+            subsegment.put_annotation("pagination", "cursor" if cursor is not None else "offset")
+            subsegment.put_annotation("count_mode", count_mode)
+            async with pool.acquire() as conn:
+                # タスク取得
+                page_rows = await task_repository.fetch(conn, query_name, *params)
+                page_total = await count_tasks(conn, count_mode, statuses, ranges, filter_params)
+
+                # X-RayでRDS情報を設定
+                subsegment.sql = {
+                    "database_type": "PostgreSQL",
+                    "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
+                    "sanitized_query": query
+                }
+        return page_rows, page_total
+
+    # 同時に実行中の同一ページ取得があれば合流（接続取得・クエリを1回にまとめる）
+    (rows, total), shared = await read_flight.do(flight_key("list", query_name, *params, count_mode), load_page)
+    record_flight_result(shared)
+
+    # 次ページカーソル（limit+1件目が存在する場合のみ）
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        sort_column = task_repository.LIST_SORTS[sort][0]
+        next_cursor = encode_cursor(rows[-1][sort_column], rows[-1]["id"], sort)
+
+    # ページ内容のETag（パラメータ・件数・各行のid/updated_at）
+    etag = list_etag(
+        [
+            repr((
+                statuses, ranges, filter_params, sort, limit, offset, cursor,
+                count_mode, selected_fields, total, next_cursor,
+            ))
+        ]
+        + [task_etag(row["id"], row["updated_at"]) for row in rows]
+    )
+    if not none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    # レスポンス構築（TaskListResponseの形をorjsonで直接エンコード）
+    content = {
+        "tasks": [task_dict(row, selected_fields) for row in rows],
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        "next_cursor": next_cursor,
+        "count_mode": count_mode,
+    }
+    return TaskJSONResponse(content, headers={"ETag": etag})
+
+
+@router.get("/{task_id}", response_model=Union[TaskResponse, TaskSparseResponse])
+async def get_task(
+    task_id: str,
+    fields: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None),
+) -> Response:
     """
     タスク詳細取得
 
     目的・理由:
     - 指定IDのタスク詳細を取得
     - 存在しない場合は404を返す
-    - X-Rayでクエリ実行をトレース
+    - プロセス内キャッシュにヒットした場合はDBに問い合わせない
+    - (id, updated_at) の強いETagを返す
+    - If-None-Match指定時は、キャッシュまたはupdated_atのみの軽量クエリで一致判定し、
+      一致すれば304（行全体の取得・レスポンス構築を省略）
+    - 本文はTaskJSONResponse（orjson）で直接エンコードし、response_modelの再検証を省略
+    - fields指定時は指定項目のみ出力する
+    - リードレプリカ設定時はレプリカから読む（直近に更新/削除されたタスク、レプリカで見つからない場合はプライマリ）
+    - X-Rayでクエリ実行とキャッシュ結果（hit/miss）、読み取り先の接続プール（db_pool）をトレース
 
     影響範囲:
-    - PostgreSQL（SELECT tasks WHERE id = ?）
+    - PostgreSQL（SELECT tasks WHERE id = ?、キャッシュミス時のみ）
+    - タスクキャッシュ
     - X-Rayトレース
 
     前提条件・制約:
     - task_idはUUID形式
+    - 存在しないIDはキャッシュしない
+    - fields指定時もキャッシュを埋めるため行全体を取得する（射影は出力時のみ。1行のため転送量の差は小さい）
     """
-    pool = await get_db_pool()
+    task_uuid = uuid.UUID(task_id)
 
-    # X-Rayサブセグメント（PostgreSQL SELECT）
-    with xray_recorder.capture("PostgreSQL") as subsegment:
-        subsegment.namespace = "remote"
-        async with pool.acquire() as conn:
-            query = "SELECT * FROM tasks WHERE id = $1"
-            row = await conn.fetchrow(query, uuid.UUID(task_id))
+    try:
+        selected_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"error": {"code": "VALIDATION_ERROR", "message": str(e)}},
+        )
 
-            # X-RayでRDS情報を設定
-            subsegment.sql = {
-                "database_type": "PostgreSQL",
-                "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
-                "sanitized_query": query
-            }
+    row = task_cache.get(task_uuid)
+    record_cache_result("hit" if row is not None else "miss")
+
+    # 直近に更新/削除されたタスクは、遅延のあるレプリカから更新前の行を読まないようプライマリから読む
+    prefer_primary = task_cache.recently_invalidated(task_uuid, DATABASE_READ_MAX_LAG_SECONDS)
+
+    if row is None and if_none_match is not None:
+        pool, pool_name = await get_read_pool(prefer_primary)
+
+        # X-Rayサブセグメント（PostgreSQL SELECT updated_at、条件付きリクエストの軽量判定）
+        with xray_recorder.capture("PostgreSQL") as subsegment:
+            subsegment.namespace = "remote"
+            subsegment.put_annotation("db_pool", pool_name)
+            subsegment.put_annotation("conditional", "if-none-match")
+            async with pool.acquire() as conn:
+                query = task_repository.sql("select_updated_at")
+                updated_at = await task_repository.fetchval(conn, "select_updated_at", task_uuid)
+
+                # X-RayでRDS情報を設定
+                subsegment.sql = {
+                    "database_type": "PostgreSQL",
+                    "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
+                    "sanitized_query": query
+                }
+
+        if updated_at is not None:
+            etag = task_etag(task_uuid, updated_at)
+            if not none_match(if_none_match, etag):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    if row is None:
+
+        async def load_task() -> Optional[asyncpg.Record]:
+            generation = task_cache.generation()
+            loaded = None
+            pool_name = None
+
+            # レプリカで見つからない場合（作成直後で未反映の可能性）はプライマリで再取得
+            while pool_name != PRIMARY_POOL_NAME and loaded is None:
+                pool, pool_name = await get_read_pool(prefer_primary or pool_name is not None)
+
+                # X-Rayサブセグメント（PostgreSQL SELECT）
+                with xray_recorder.capture("PostgreSQL") as subsegment:
+                    subsegment.namespace = "remote"
+                    subsegment.put_annotation("db_pool", pool_name)
+                    async with pool.acquire() as conn:
+                        query = task_repository.sql("select_by_id")
+                        loaded = await task_repository.fetchrow(conn, "select_by_id", task_uuid)
+
+                        # X-RayでRDS情報を設定
+                        subsegment.sql = {
+                            "database_type": "PostgreSQL",
+                            "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
+                            "sanitized_query": query
+                        }
+
+            if loaded:
+                task_cache.put(task_uuid, loaded, generation)
+            return loaded
+
+        # 同時に実行中の同一タスク取得があれば合流（キャッシュミスが集中した場合の接続取得を1回にまとめる）
+        row, shared = await read_flight.do(flight_key("task", task_uuid, prefer_primary), load_task)
+        record_flight_result(shared)
 
     if not row:
         raise HTTPException(
@@ -452,122 +940,270 @@ async def get_task(task_id: str) -> TaskResponse:
             detail={"error": {"code": "NOT_FOUND", "message": f"Task {task_id} not found"}},
         )
 
-    return TaskResponse(
-        id=str(row["id"]),
-        title=row["title"],
-        description=row["description"],
-        status=row["status"],
-        created_at=row["created_at"].isoformat() + "Z",
-        updated_at=row["updated_at"].isoformat() + "Z",
+    etag = task_etag(row["id"], row["updated_at"])
+    if not none_match(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    return TaskJSONResponse(task_dict(row, selected_fields), headers={"ETag": etag})
+
+
+def _replay_response(key: str, request_digest: bytes, stored: asyncpg.Record) -> Response:
+    """
+    保存済みの応答の再送出（冪等キー）
+
+    前提条件・制約:
+    - 同じキーで異なる本文が送られた場合は422（保存済みの応答は返さない）
+    """
+    if stored["request_hash"] != request_digest:
+        idempotency.record("mismatched")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail={
+                "error": {
+                    "code": "IDEMPOTENCY_KEY_REUSED",
+                    "message": f"Idempotency-Key {key} was used with a different request body",
+                }
+            },
+        )
+    idempotency.record("replayed")
+    return Response(
+        content=stored["response_body"],
+        status_code=stored["status_code"],
+        media_type="application/json",
+        headers={"ETag": stored["etag"], "Idempotent-Replayed": "true"},
     )
 
 
 @router.post("", response_model=TaskResponse, status_code=status.HTTP_201_CREATED)
-async def create_task(task: TaskCreate) -> TaskResponse:
+async def create_task(
+    task: TaskCreate,
+    idempotency_key: Optional[str] = Header(None),
+) -> Response:
     """
     タスク作成
 
     目的・理由:
     - 新規タスクをDBに登録
     - UUID自動生成、created_at/updated_at自動設定
+    - TASK_INSERT_BATCH_ENABLED=true（Idempotency-Keyなし）の場合は、同時に届いた作成を
+      1文の複数行INSERTにまとめて書き込む（グループコミット、X-Rayにinsert_batch_sizeアノテーション）
+    - Idempotency-Key指定時は、キーの確保・INSERT・応答の保存を1トランザクションで行い、
+      同じキーの再送には保存済みの応答を返す（Idempotent-Replayed: true、行は作成しない）
+      - 先行リクエストの処理中に届いた再送は、キーの確保で先行のコミットを待ってから応答を返す
     - X-Rayでクエリ実行をトレース
 
     影響範囲:
-    - PostgreSQL（INSERT INTO tasks）
+    - PostgreSQL（INSERT INTO tasks、idempotency_keys）
     - X-Rayトレース
 
     前提条件・制約:
     - titleは必須（バリデーション済み）
+    - Idempotency-Keyは1〜255文字。同じキーで異なる本文を送った場合は422
     """
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= idempotency.IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": {
+                    "code": "VALIDATION_ERROR",
+                    "message": f"Idempotency-Key must be 1 to {idempotency.IDEMPOTENCY_KEY_MAX_LENGTH} characters",
+                }
+            },
+        )
+    request_digest = idempotency.request_hash(task.model_dump()) if idempotency_key is not None else b""
+
     pool = await get_db_pool()
 
     # X-Rayサブセグメント（PostgreSQL INSERT）
     with xray_recorder.capture("PostgreSQL") as subsegment:
         subsegment.namespace = "remote"
-        async with pool.acquire() as conn:
-            query = """
-                INSERT INTO tasks (title, description, status)
-                VALUES ($1, $2, $3)
-                RETURNING *
-                """
-            row = await conn.fetchrow(
-                query,
-                task.title,
-                task.description,
-                task.status,
-            )
-
-            # X-RayでRDS情報を設定
+        if idempotency_key is None and TASK_INSERT_BATCH_ENABLED:
+            # グループコミット（接続の取得・INSERT・変更イベントの送信は同時作成のバッチ単位）
             subsegment.sql = {
                 "database_type": "PostgreSQL",
                 "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
-                "sanitized_query": query
+                "sanitized_query": task_repository.sql("insert_batch")
             }
+            row, batch_size = await insert_batcher.insert(task.title, task.description, task.status)
+            subsegment.put_annotation("insert_batch_size", batch_size)
+        else:
+            async with pool.acquire() as conn:
+                query = task_repository.sql("insert")
+
+                # X-RayでRDS情報を設定
+                subsegment.sql = {
+                    "database_type": "PostgreSQL",
+                    "url": "xray-poc-database-rds.cj0qqo84wrtl.ap-northeast-1.rds.amazonaws.com",
+                    "sanitized_query": query
+                }
+
+                if idempotency_key is None:
+                    row = await task_repository.fetchrow(conn, "insert", task.title, task.description, task.status)
+                    await publish_task_event(conn, "created", row)
+                else:
+                    # 再送（完了済み）はインデックス1回の参照で応答を返す
+                    stored = await idempotency.find_response(conn, idempotency_key)
+                    if stored is None:
+                        async with conn.transaction():
+                            if await idempotency.claim(conn, idempotency_key, request_digest):
+                                row = await task_repository.fetchrow(
+                                    conn, "insert", task.title, task.description, task.status
+                                )
+                                await publish_task_event(conn, "created", row)
+                                body = dumps(task_dict(row))
+                                etag = task_etag(row["id"], row["updated_at"])
+                                await idempotency.store_response(
+                                    conn, idempotency_key, status.HTTP_201_CREATED, body, etag
+                                )
+                            else:
+                                # 処理中だった先行のコミットを待った後の再送
+                                stored = await idempotency.find_response(conn, idempotency_key)
+                                if stored is None:
+                                    raise HTTPException(
+                                        status_code=status.HTTP_409_CONFLICT,
+                                        detail={
+                                            "error": {
+                                                "code": "IDEMPOTENCY_KEY_IN_USE",
+                                                "message": f"Idempotency-Key {idempotency_key} is being processed",
+                                            }
+                                        },
+                                    )
+                                idempotency.record("waited")
+                    if stored is not None:
+                        subsegment.put_annotation("idempotency", "replayed")
+                        return _replay_response(idempotency_key, request_digest, stored)
+                    subsegment.put_annotation("idempotency", "created")
+                    idempotency.record("created")
+
+    # 実行中の読み取りとの合流を打ち切り（以降の読み取りは書き込み後の状態を取得）
+    read_flight.forget()
+
+    # 件数キャッシュへ反映
+    adjust_cached_counts(row["status"], 1)
+
+    return TaskJSONResponse(
+        task_dict(row),
+        status_code=status.HTTP_201_CREATED,
+        headers={"ETag": task_etag(row["id"], row["updated_at"])},
+    )
+
+
+def _precondition_failed(task_id: str) -> HTTPException:
+    """If-Match不一致（412）の例外"""
+    return HTTPException(
+        status_code=status.HTTP_412_PRECONDITION_FAILED,
+        detail={"error": {"code": "PRECONDITION_FAILED", "message": f"Task {task_id} has been modified"}},
+    )
+
 
-    return TaskResponse(
-        id=str(row["id"]),
-        title=row["title"],
-        description=row["description"],
-        status=row["status"],
-        created_at=row["created_at"].isoformat() + "Z",
-        updated_at=row["updated_at"].isoformat() + "Z",
+def _version_conflict(task_id: str, expected_version: int, current: dict, etag: str) -> Response:
+    """
+    expected_version不一致（409）のレスポンス
+
+    目的・理由:
+    - 他クライアントの更新が先に反映されていることを通知し、現在のタスクを同じレスポンスで返す
+      （クライアントは再取得せずに差分の確認・再送ができる）
+
+    前提条件・制約:
+    - 本文はエラー形式（detail.error）に現在のタスク（detail.current）を加えたもの。ETagは現在のタスクのもの
+    """
+    message = (
+        f"Task {task_id} has been modified "
+        f"(expected version {expected_version}, current version {current['version']})"
+    )
+    return TaskJSONResponse(
+        {"detail": {"error": {"code": "VERSION_CONFLICT", "message": message}, "current": current}},
+        status_code=status.HTTP_409_CONFLICT,
+        headers={"ETag": etag},
     )
 
 
 @router.put("/{task_id}", response_model=TaskResponse)
-async def update_task(task_id: str, task: TaskUpdate) -> TaskResponse:
+async def update_task(
+    task_id: str,
+    task: TaskUpdate,
+    if_match: Optional[str] = Header(None),
+) -> Response:
     """
     タスク更新
 
     目的・理由:
     - 指定IDのタスクを更新
     - 部分更新対応（指定されたフィールドのみ更新）
+    - If-Match指定時は、ETagのupdated_atをUPDATEの条件に含めて比較・交換し、
+      不一致なら412（他クライアントの更新を上書きしない）
+    - expected_version指定時は、UPDATE ... WHERE id = ? AND version = ? で比較・交換し（行ロックの事前取得なし）、
+      不一致なら409と現在のタスクを返す（同じ往復で取得）
     - X-Rayでクエリ実行をトレース
 
     影響範囲:
-    - PostgreSQL（UPDATE tasks WHERE id = ?）
+    - PostgreSQL（UPDATE tasks WHERE id = ?、更新のたびにversionを1増やす）
+    - タスクキャッシュ（全レプリカで無効化）
     - X-Rayトレース
 
     前提条件・制約:
     - task_idはUUID形式
-    - 存在しないIDの場合は404
+    - 存在しないIDの場合は404（If-Match指定時は412）
+    - If-Matchとexpected_versionの併用は400
     """
     pool = await get_db_pool()
+    task_uuid = uuid.UUID(task_id)
 
-    # 更新フィールドを動的に構築
-    updates = []
-    params = []
-    param_idx = 1
-
-    if task.title is not None:
-        updates.append(f"title = ${param_idx}")
-        params.append(task.title)
-        param_idx += 1
-
-    if task.description is not None:
-        updates.append(f"description = ${param_idx}")
-        params.append(task.description)
-        param_idx += 1
-
-    if task.status is not None:
-        updates.append(f"status = ${param_idx}")
-        params.append(task.status)
-        param_idx += 1
-
-    if not updates:
-        # 更新内容がない場合は現在のタスクを返す
-        return await get_task(task_id)
-
-    updates.append(f"updated_at = NOW()")
-    params.append(uuid.UUID(task_id))
+    if if_match is not None and task.expected_version is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={
+                "error": {
+                    "code": "VALIDATION_ERROR",
+                    "message": "Specify either If-Match or expected_version, not both",
+                }
+            },
+        )
 
-    query = f"UPDATE tasks SET {', '.join(updates)} WHERE id = ${param_idx} RETURNING *"
+    versions = if_match_versions(if_match, task_uuid) if if_match is not None else None
+    if versions is not None and not versions:
+        raise _precondition_failed(task_id)
+
+    # 更新フィールドの組み合わせ（UPDATE文はリポジトリで組み合わせごとに確定済み）
+    fields = [field for field in task_repository.UPDATABLE_FIELDS if getattr(task, field) is not None]
+    params = [getattr(task, field) for field in fields]
+
+    if not fields:
+        # 更新内容がない場合は現在のタスクを返す（If-Matchは現在のETagと比較）
+        current = await get_task(task_id, fields=None, if_none_match=None)
+        if versions and current.headers["ETag"] not in {task_etag(task_uuid, version) for version in versions}:
+            raise _precondition_failed(task_id)
+        if task.expected_version is not None:
+            current_task = orjson.loads(current.body)
+            if current_task["version"] != task.expected_version:
+                return _version_conflict(task_id, task.expected_version, current_task, current.headers["ETag"])
+        return current
+
+    params.append(task_uuid)
+
+    # If-Match: 更新前のupdated_atがETagと一致する場合のみ対象にする
+    # expected_version: versionが一致する場合のみ更新し、不一致なら現在の行を返す
+    compare_version = task.expected_version is not None
+    if versions:
+        params.append(versions)
+    elif compare_version:
+        params.append(task.expected_version)
+
+    # 件数キャッシュ更新のため、更新前のステータスも同じ往復で取得
+    query_name = task_repository.update_query_name(fields, bool(versions), compare_version)
+    query = task_repository.sql(query_name)
 
     # X-Rayサブセグメント（PostgreSQL UPDATE）
     with xray_recorder.capture("PostgreSQL") as subsegment:
         subsegment.namespace = "remote"
         async with pool.acquire() as conn:
-            row = await conn.fetchrow(query, *params)
+            row = await task_repository.fetchrow(conn, query_name, *params)
+            applied = row is not None and row.get("applied", True)
+            if applied:
+                await publish_invalidation(conn, row["id"])
+                await publish_task_event(conn, "updated", row, row["previous_status"])
+            elif row is not None:
+                subsegment.put_annotation("version_conflict", True)
 
             # X-RayでRDS情報を設定
             subsegment.sql = {
@@ -577,46 +1213,66 @@ async def update_task(task_id: str, task: TaskUpdate) -> TaskResponse:
             }
 
     if not row:
+        if if_match is not None:
+            raise _precondition_failed(task_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"error": {"code": "NOT_FOUND", "message": f"Task {task_id} not found"}},
         )
+    if not applied:
+        etag = task_etag(row["id"], row["updated_at"])
+        return _version_conflict(task_id, task.expected_version, task_dict(row), etag)
 
-    return TaskResponse(
-        id=str(row["id"]),
-        title=row["title"],
-        description=row["description"],
-        status=row["status"],
-        created_at=row["created_at"].isoformat() + "Z",
-        updated_at=row["updated_at"].isoformat() + "Z",
-    )
+    # 実行中の読み取りとの合流を打ち切り（以降の読み取りは書き込み後の状態を取得）
+    read_flight.forget()
+
+    # 件数キャッシュへ反映（ステータス変更時のみ）
+    move_cached_count(row["previous_status"], row["status"])
+
+    return TaskJSONResponse(task_dict(row), headers={"ETag": task_etag(row["id"], row["updated_at"])})
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(task_id: str) -> None:
+async def delete_task(task_id: str, if_match: Optional[str] = Header(None)) -> None:
     """
     タスク削除
 
     目的・理由:
     - 指定IDのタスクを削除
+    - If-Match指定時は、ETagのupdated_atが一致する場合のみ削除し、不一致なら412
     - X-Rayでクエリ実行をトレース
 
     影響範囲:
     - PostgreSQL（DELETE FROM tasks WHERE id = ?）
+    - タスクキャッシュ（全レプリカで無効化）
     - X-Rayトレース
 
     前提条件・制約:
     - task_idはUUID形式
-    - 存在しないIDの場合は404
+    - 存在しないIDの場合は404（If-Match指定時は412）
     """
     pool = await get_db_pool()
+    task_uuid = uuid.UUID(task_id)
+
+    params = [task_uuid]
+    query_name = "delete"
+    if if_match is not None:
+        versions = if_match_versions(if_match, task_uuid)
+        if versions is not None and not versions:
+            raise _precondition_failed(task_id)
+        if versions:
+            params.append(versions)
+            query_name = "delete_if_match"
+    query = task_repository.sql(query_name)
 
     # X-Rayサブセグメント（PostgreSQL DELETE）
     with xray_recorder.capture("PostgreSQL") as subsegment:
         subsegment.namespace = "remote"
         async with pool.acquire() as conn:
-            query = "DELETE FROM tasks WHERE id = $1"
-            result = await conn.execute(query, uuid.UUID(task_id))
+            deleted_status = await task_repository.fetchval(conn, query_name, *params)
+            if deleted_status is not None:
+                await publish_invalidation(conn, task_uuid)
+                await publish_task_event(conn, "deleted", {"id": task_uuid, "status": deleted_status})
 
             # X-RayでRDS情報を設定
             subsegment.sql = {
@@ -625,8 +1281,16 @@ async def delete_task(task_id: str) -> None:
                 "sanitized_query": query
             }
 
-    if result == "DELETE 0":
+    if deleted_status is None:
+        if if_match is not None:
+            raise _precondition_failed(task_id)
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail={"error": {"code": "NOT_FOUND", "message": f"Task {task_id} not found"}},
         )
+
+    # 実行中の読み取りとの合流を打ち切り（以降の読み取りは書き込み後の状態を取得）
+    read_flight.forget()
+
+    # 件数キャッシュへ反映
+    adjust_cached_counts(deleted_status, -1)
@@ -0,0 +1,181 @@
+"""
+タスク件数の取得戦略
+
+目的・理由:
+- GET /tasks のたびに SELECT COUNT(*) を実行すると、大きなテーブルでは
+  ページ取得より件数取得の方が重くなる
+- 用途に応じて精度とコストを選べるよう、件数取得を戦略として切り出す
+  - exact: SELECT COUNT(*)（正確だが全件スキャン）
+  - estimate: pg_class.reltuples / プランナの推定行数（カタログ参照のみ）
+  - cached: プロセス内のステータス別件数キャッシュ（TTL付き、作成/更新/削除で差分更新）
+  - none: 件数を取得しない
+
+影響範囲:
+- タスク一覧取得API（GET /tasks の total）
+- タスク作成/更新/削除（キャッシュの差分更新）
+
+前提条件・制約:
+- cachedはプロセス（ECSタスク）単位。他レプリカでの書き込みはTTL経過まで反映されない
+- estimateはANALYZE/autovacuumの実行状況に依存する近似値
+"""
+
+import json
+import os
+import time
+from typing import Any, Optional
+
+import asyncpg
+
+from db import task_repository
+
+
+COUNT_MODES = ("exact", "estimate", "cached", "none")
+
+# 目的・理由: キャッシュ件数の最大鮮度（他レプリカの書き込みが反映されるまでの上限）
+# 影響範囲: countモードcached
+# 前提条件・制約: 環境変数TASK_COUNT_CACHE_TTL_SECONDSで変更可能
+COUNT_CACHE_TTL_SECONDS = float(os.getenv("TASK_COUNT_CACHE_TTL_SECONDS", "30"))
+
+# ステータス別件数キャッシュ（キーNoneは全件）: {status: (件数, 取得時刻)}
+_cached_counts: dict[Optional[str], tuple[int, float]] = {}
+
+
+async def count_tasks(
+    conn: asyncpg.Connection,
+    mode: str,
+    statuses: tuple[str, ...] = (),
+    ranges: tuple[str, ...] = (),
+    params: Optional[list[Any]] = None,
+) -> Optional[int]:
+    """
+    件数取得（戦略の振り分け）
+
+    目的・理由:
+    - countパラメータに応じて件数取得方法を切り替える
+
+    影響範囲:
+    - タスク一覧取得API
+
+    前提条件・制約:
+    - modeはCOUNT_MODESのいずれか
+    - noneの場合はNoneを返す
+    - paramsは絞り込み条件の値（task_repository.filter_clause()のパラメータ順）。
+      省略時はstatusesから組み立てる（範囲条件なしの場合のみ）
+    """
+    if mode == "none":
+        return None
+    if params is None:
+        params = [] if not statuses else [statuses[0] if len(statuses) == 1 else list(statuses)]
+    if mode == "estimate":
+        return await _estimate_count(conn, statuses, ranges, params)
+    if mode == "cached" and not ranges:
+        return await _cached_count(conn, statuses)
+    return await _exact_count(conn, statuses, ranges, params)
+
+
+async def _exact_count(
+    conn: asyncpg.Connection, statuses: tuple[str, ...], ranges: tuple[str, ...], params: list[Any]
+) -> int:
+    """正確な件数（SELECT COUNT(*)）"""
+    query_name = task_repository.count_query_name(len(statuses), ranges)
+    return await task_repository.fetchval(conn, query_name, *params)
+
+
+async def _estimate_count(
+    conn: asyncpg.Connection, statuses: tuple[str, ...], ranges: tuple[str, ...], params: list[Any]
+) -> int:
+    """
+    推定件数
+
+    目的・理由:
+    - フィルターなし: pg_class.reltuples（統計情報の行数）を参照（パーティション化済みなら各パーティションの合計）
+    - 絞り込みあり: EXPLAINのプランナ推定行数（列統計のMCV・ヒストグラムから算出）を参照
+    - いずれもテーブルを読まないため、件数に依存せず一定コスト
+
+    前提条件・制約:
+    - 一度もANALYZEされていないテーブル（reltuples < 0）はプランナ推定にフォールバック
+      （パーティションは、すべてが未ANALYZEの場合のみフォールバックし、未ANALYZEのパーティションは0件として数える）
+    """
+    if not statuses and not ranges:
+        reltuples = await conn.fetchval(
+            "SELECT CASE WHEN bool_and(c.reltuples < 0) THEN -1 ELSE sum(greatest(c.reltuples, 0)) END::bigint "
+            "FROM pg_partition_tree('tasks') AS t JOIN pg_class AS c ON c.oid = t.relid WHERE t.isleaf"
+        )
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+    clause = task_repository.filter_clause(len(statuses), ranges)
+    plan = await conn.fetchval(f"EXPLAIN (FORMAT JSON) SELECT 1 FROM tasks{clause}", *params)
+
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def _cached_count(conn: asyncpg.Connection, statuses: tuple[str, ...]) -> int:
+    """
+    キャッシュ件数
+
+    目的・理由:
+    - TTL内はキャッシュ値を返し、DBに問い合わせない
+    - 期限切れ・未取得の場合のみ正確な件数を取得してキャッシュ
+    - 複数ステータス指定はステータス別件数の合計（差分更新済みのキーをそのまま使う）
+
+    前提条件・制約:
+    - 同時ミス時は複数回COUNTが走りうる（結果は同じため許容）
+    - 範囲条件付きはキャッシュしない（count_tasksでexactにフォールバック）
+    """
+    total = 0
+    for key in statuses or (None,):
+        entry = _cached_counts.get(key)
+        now = time.monotonic()
+        if entry is None or now - entry[1] >= COUNT_CACHE_TTL_SECONDS:
+            count = await _exact_count(conn, (key,) if key else (), (), [key] if key else [])
+            entry = _cached_counts[key] = (count, now)
+        total += entry[0]
+    return total
+
+
+def adjust_cached_counts(status_value: str, delta: int) -> None:
+    """
+    キャッシュ件数の差分更新
+
+    目的・理由:
+    - 作成/削除/ステータス変更時にキャッシュを即時反映し、TTL内でも自プロセスの書き込みを正確に返す
+
+    影響範囲:
+    - countモードcached
+
+    前提条件・制約:
+    - 全件とstatus_valueの2キーを更新
+    - キャッシュされていないキーは更新しない（次回取得時に正確な件数を取得）
+    """
+    for key in (None, status_value):
+        entry = _cached_counts.get(key)
+        if entry is not None:
+            _cached_counts[key] = (max(entry[0] + delta, 0), entry[1])
+
+
+def move_cached_count(old_status: Optional[str], new_status: Optional[str]) -> None:
+    """
+    ステータス変更時のキャッシュ件数の付け替え
+
+    目的・理由:
+    - 更新でステータスが変わった場合、旧ステータスから新ステータスへ1件移す
+    - 全件は変わらないため更新しない
+    """
+    if old_status == new_status or old_status is None or new_status is None:
+        return
+    for key, delta in ((old_status, -1), (new_status, 1)):
+        entry = _cached_counts.get(key)
+        if entry is not None:
+            _cached_counts[key] = (max(entry[0] + delta, 0), entry[1])
+
+
+def reset_cached_counts() -> None:
+    """
+    キャッシュ件数の破棄
+
+    目的・理由:
+    - パーティションの切り離し等、行単位の差分更新を伴わない一括削除の後に呼び、次回取得時に正確な件数を取得する
+    """
+    _cached_counts.clear()
@@ -0,0 +1,163 @@
+"""
+冪等キー（Idempotency-Key）
+
+目的・理由:
+- ALBやクライアントがタイムアウト後にPOST /tasksを再送すると、再送のたびに行が重複して作成され、
+  DBが遅いときほど書き込みが増える
+- Idempotency-Keyヘッダー付きの作成では、キーと応答をidempotency_keysテーブルに保存し、
+  同じキーの再送には保存済みの応答を返す（重複はインデックス1回の参照で済む）
+- 先行リクエストの処理中に届いた再送は、キーの行（一意インデックス）のロック待ちで先行の完了を待つ
+
+影響範囲:
+- タスク作成API（Idempotency-Keyヘッダー指定時）
+- PostgreSQL（idempotency_keysテーブル（migrations/0003）、期限切れ行の定期削除）
+
+前提条件・制約:
+- キーの確保・タスク作成・応答の保存は1トランザクションで行う
+  （処理中のまま残るキーはなく、先行が失敗した場合は待っていた再送が処理を引き継ぐ）
+- 同じキーで異なるリクエスト本文が送られた場合は422（本文のハッシュで判定）
+- キーの有効期限はIDEMPOTENCY_KEY_TTL_SECONDS。期限切れのキーは未使用として扱う
+"""
+
+import asyncio
+import hashlib
+import os
+from typing import Any, Optional
+
+import asyncpg
+
+from api.serialization import dumps
+from db import task_repository
+
+
+# 目的・理由: キーの有効期限（秒）。クライアントの再送期間をカバーする
+# 影響範囲: タスク作成API（Idempotency-Key指定時）
+# 前提条件・制約: 環境変数IDEMPOTENCY_KEY_TTL_SECONDSで変更可能
+IDEMPOTENCY_KEY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_KEY_TTL_SECONDS", "86400"))
+
+# 目的・理由: 期限切れキーの削除間隔（秒）と1回に削除する最大行数（長いトランザクション・ロックを避ける）
+# 影響範囲: idempotency_keysテーブル
+# 前提条件・制約: 環境変数IDEMPOTENCY_CLEANUP_SECONDS / IDEMPOTENCY_CLEANUP_BATCH_SIZEで変更可能
+IDEMPOTENCY_CLEANUP_SECONDS = float(os.getenv("IDEMPOTENCY_CLEANUP_SECONDS", "300"))
+IDEMPOTENCY_CLEANUP_BATCH_SIZE = int(os.getenv("IDEMPOTENCY_CLEANUP_BATCH_SIZE", "1000"))
+
+# 目的・理由: キーの最大長（テーブル定義 VARCHAR(255) と一致させる）
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# 統計（プロセス起動からの累計）
+_stats = {"created": 0, "replayed": 0, "waited": 0, "mismatched": 0, "purged": 0}
+
+# 期限切れキーの削除タスク
+_cleanup_task: Optional["asyncio.Task[None]"] = None
+
+
+def request_hash(payload: dict[str, Any]) -> bytes:
+    """
+    リクエスト本文のハッシュ
+
+    目的・理由:
+    - 同じキーで異なる内容を送った誤用を検知する（本文そのものは保存しない）
+
+    前提条件・制約:
+    - payloadはバリデーション済みのモデルの辞書（キー順・空白の違いは無視される）
+    """
+    return hashlib.sha256(dumps(dict(sorted(payload.items())))).digest()
+
+
+async def find_response(conn: asyncpg.Connection, key: str) -> Optional[asyncpg.Record]:
+    """
+    保存済みの応答の取得
+
+    前提条件・制約:
+    - 期限切れのキーはNone
+    - 戻り値の列は request_hash, status_code, response_body, etag
+    """
+    return await task_repository.fetchrow(conn, "idempotency_select", key)
+
+
+async def claim(conn: asyncpg.Connection, key: str, request_digest: bytes) -> bool:
+    """
+    キーの確保
+
+    目的・理由:
+    - 未使用（または期限切れ）のキーを確保する。確保できなければ保存済みの応答がある
+    - 他のトランザクションが同じキーを確保中なら、そのトランザクションの終了まで待つ
+
+    前提条件・制約:
+    - トランザクション内で呼び出し、同じトランザクションでstore_response()まで行うこと
+    """
+    ttl = IDEMPOTENCY_KEY_TTL_SECONDS
+    return await task_repository.fetchval(conn, "idempotency_claim", key, request_digest, ttl) is not None
+
+
+async def store_response(conn: asyncpg.Connection, key: str, status_code: int, body: bytes, etag: str) -> None:
+    """応答の保存（claim()と同じトランザクション内）"""
+    await task_repository.fetchval(conn, "idempotency_store", key, status_code, body, etag)
+
+
+def record(outcome: str) -> None:
+    """結果の集計（created/replayed/waited/mismatched）"""
+    _stats[outcome] += 1
+
+
+async def _purge_expired(pool: Any) -> int:
+    """期限切れキーの削除（削除件数がバッチサイズに達した場合は続けて削除する）"""
+    purged = 0
+    while True:
+        async with pool.acquire() as conn:
+            count = await task_repository.fetchval(conn, "idempotency_purge", IDEMPOTENCY_CLEANUP_BATCH_SIZE)
+        purged += count
+        if count < IDEMPOTENCY_CLEANUP_BATCH_SIZE:
+            return purged
+
+
+async def _cleanup_forever(pool: Any) -> None:
+    """
+    期限切れキーの定期削除
+
+    前提条件・制約:
+    - stop_idempotency_cleanup()でキャンセルされるまで動作
+    - 複数レプリカで同時に実行しても、同じ行の削除が競合するだけで結果は変わらない
+    """
+    while True:
+        await asyncio.sleep(IDEMPOTENCY_CLEANUP_SECONDS)
+        try:
+            _stats["purged"] += await _purge_expired(pool)
+        except Exception as e:
+            print(f"⚠️ Idempotency key cleanup failed: {e}")
+
+
+async def start_idempotency_cleanup(pool: Any) -> None:
+    """
+    期限切れキーの定期削除の開始
+
+    目的・理由:
+    - アプリケーション起動時に呼び、idempotency_keysテーブルが期限切れの行で肥大化しないようにする
+    """
+    global _cleanup_task
+
+    if _cleanup_task is None:
+        _cleanup_task = asyncio.create_task(_cleanup_forever(pool))
+
+
+async def stop_idempotency_cleanup() -> None:
+    """期限切れキーの定期削除の停止"""
+    global _cleanup_task
+
+    if _cleanup_task is not None:
+        _cleanup_task.cancel()
+        try:
+            await _cleanup_task
+        except asyncio.CancelledError:
+            pass
+        _cleanup_task = None
+
+
+def idempotency_stats() -> dict[str, Any]:
+    """
+    統計情報
+
+    目的・理由:
+    - 新規作成・再送への応答の再送出（処理中の先行を待った件数を含む）・本文不一致・削除件数を内部APIで確認する
+    """
+    return {"ttl_seconds": IDEMPOTENCY_KEY_TTL_SECONDS, **_stats}
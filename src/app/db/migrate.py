@@ -0,0 +1,334 @@
+"""
+スキーママイグレーション（番号付きマイグレーションファイルの適用）
+
+目的・理由:
+- 起動のたびに全レプリカがCREATE TABLE / CREATE INDEX / サンプルデータのINSERTを実行しており、
+  コールドスタートが遅く、同時に起動したタスク同士でDDLが競合する（失敗は握りつぶされていた）
+- migrations/ の番号付きファイル（NNNN_説明.sql / NNNN_説明.py）を番号順に1回だけ適用し、
+  適用済みの番号をschema_versionテーブルに記録する
+- アドバイザリロック（pg_advisory_lock）で同時に1プロセスだけが適用する（他は待って、適用済みとして何もしない）
+- オンラインのインデックス作成（CREATE INDEX CONCURRENTLY、パーティション化したテーブルにも対応）を提供する
+
+影響範囲:
+- PostgreSQL（スキーマ全体、schema_versionテーブル）
+- アプリケーション起動時（スキーマのバージョン確認のみ。DB_MIGRATE_ON_STARTUP=true時は適用も行う）
+
+前提条件・制約:
+- 適用は `python -m db.migrate`（src/appで実行）。docker-composeではmigrateサービスがアプリより先に実行する
+- .sqlファイルは1トランザクションでそのまま実行する（;での分割はしないため、DO $$ ... $$ も記述できる）
+- .pyファイルは async def upgrade(conn) を定義する。TRANSACTION = False の場合はトランザクション外で実行する
+  （CREATE INDEX CONCURRENTLY用。途中で失敗しても再実行できるよう、各文を冪等に書くこと）
+- 適用済みのファイルを変更しても再適用しない（チェックサムの不一致を警告する）。変更は新しい番号で追加する
+"""
+
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import os
+import re
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import asyncpg
+
+
+# 目的・理由: アプリケーション起動時にマイグレーションを適用するか（既定はバージョン確認のみ）
+# 影響範囲: アプリケーション起動時間、PostgreSQL（スキーマ）
+# 前提条件・制約: 環境変数DB_MIGRATE_ON_STARTUPがtrueの場合のみ適用（ローカル開発用。複数レプリカでもロックで1回だけ適用される）
+DB_MIGRATE_ON_STARTUP = os.getenv("DB_MIGRATE_ON_STARTUP", "false").lower() == "true"
+
+# 目的・理由: マイグレーションファイルのディレクトリ
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+# 目的・理由: マイグレーション適用の排他用アドバイザリロックのキー（パーティション定期処理のキーと別）
+MIGRATION_LOCK_KEY = 0x7461736B0002
+
+# 目的・理由: 適用済みバージョンの記録テーブル
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR(200) NOT NULL,
+        checksum VARCHAR(64) NOT NULL,
+        applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        execution_ms INTEGER NOT NULL
+    );
+"""
+
+# PostgreSQLの識別子の最大長
+_MAX_IDENTIFIER_LENGTH = 63
+
+_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.(sql|py)$")
+
+# 直近のバージョン確認の結果
+_status: dict[str, Any] = {"current": None, "latest": None, "pending": [], "checked_at": None, "applied": []}
+
+
+class Migration:
+    """
+    マイグレーションファイル1つ
+
+    前提条件・制約:
+    - versionはファイル名の先頭4桁の番号
+    - .pyは適用時に読み込む（バージョン確認のみの起動ではimportしない）
+    """
+
+    def __init__(self, path: Path) -> None:
+        match = _FILE_PATTERN.match(path.name)
+        if match is None:
+            raise ValueError(f"invalid migration file name: {path.name}")
+        self.path = path
+        self.version = int(match.group(1))
+        self.name = match.group(2)
+        self.kind = match.group(3)
+        self.checksum = hashlib.sha256(path.read_bytes()).hexdigest()
+
+    def load(self) -> Any:
+        """.pyのモジュール読み込み"""
+        spec = importlib.util.spec_from_file_location(f"migration_{self.path.stem}", self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    async def apply(self, conn: asyncpg.Connection) -> None:
+        """
+        適用（schema_versionへの記録を含む）
+
+        目的・理由:
+        - トランザクション内のマイグレーションは、記録と同じトランザクションで適用する（途中で失敗しても未適用のまま）
+        - トランザクション外のマイグレーションは、完了後に記録する（失敗した場合は次回に最初から再実行）
+        """
+        started = time.perf_counter()
+        module = self.load() if self.kind == "py" else None
+        if module is not None and not getattr(module, "TRANSACTION", True):
+            await module.upgrade(conn)
+            await self._record(conn, started)
+            return
+
+        async with conn.transaction():
+            if module is not None:
+                await module.upgrade(conn)
+            else:
+                await conn.execute(self.path.read_text(encoding="utf-8"))
+            await self._record(conn, started)
+
+    async def _record(self, conn: asyncpg.Connection, started: float) -> None:
+        await conn.execute(
+            "INSERT INTO schema_version (version, name, checksum, execution_ms) VALUES ($1, $2, $3, $4)",
+            self.version,
+            self.name,
+            self.checksum,
+            int((time.perf_counter() - started) * 1000),
+        )
+
+
+def discover_migrations(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """
+    マイグレーションファイルの一覧（番号順）
+
+    前提条件・制約:
+    - 番号の重複はエラー（ブランチのマージで同じ番号が付いた場合等）
+    - __init__.py等、番号で始まらないファイルは無視する
+    """
+    migrations = [
+        Migration(path) for path in sorted(directory.iterdir()) if _FILE_PATTERN.match(path.name)
+    ]
+    versions = [migration.version for migration in migrations]
+    duplicates = sorted({version for version in versions if versions.count(version) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate migration versions: {duplicates}")
+    return migrations
+
+
+async def applied_versions(conn: asyncpg.Connection) -> dict[int, str]:
+    """適用済みのバージョンとチェックサム（schema_version未作成時は空）"""
+    if await conn.fetchval("SELECT to_regclass('schema_version')") is None:
+        return {}
+    rows = await conn.fetch("SELECT version, checksum FROM schema_version")
+    return {row["version"]: row["checksum"] for row in rows}
+
+
+async def run_migrations(database_url: str) -> list[str]:
+    """
+    未適用のマイグレーションの適用
+
+    目的・理由:
+    - 専用の接続でアドバイザリロックを取り、schema_versionにない番号を順に適用する
+    - ロック待ちの間に他のプロセスが適用した番号は、ロック取得後に読み直すため再適用しない
+
+    影響範囲:
+    - PostgreSQL（スキーマ）
+
+    前提条件・制約:
+    - 接続のstatement_timeoutは無効にする（大きなテーブルのインデックス作成等）
+    - 失敗したマイグレーションの例外をそのまま送出する（以降の番号は適用しない）
+    - 適用したマイグレーションの名前（NNNN_説明）を返す
+    """
+    migrations = discover_migrations()
+    conn = await asyncpg.connect(
+        database_url, server_settings={"application_name": "db.migrate", "statement_timeout": "0"}
+    )
+    applied = []
+    try:
+        await conn.execute("SELECT pg_advisory_lock($1)", MIGRATION_LOCK_KEY)
+        try:
+            await conn.execute(SCHEMA_VERSION_DDL)
+            done = await applied_versions(conn)
+            _warn_changed(migrations, done)
+            for migration in migrations:
+                if migration.version in done:
+                    continue
+                label = f"{migration.version:04d}_{migration.name}"
+                print(f"⏳ Applying migration {label}")
+                await migration.apply(conn)
+                applied.append(label)
+                print(f"✅ Migration {label} applied")
+        finally:
+            await conn.execute("SELECT pg_advisory_unlock($1)", MIGRATION_LOCK_KEY)
+    finally:
+        await conn.close()
+
+    _status["applied"] = applied
+    if not applied:
+        print("✅ Database schema is up to date")
+    return applied
+
+
+def _warn_changed(migrations: list[Migration], done: dict[int, str]) -> None:
+    """適用後に変更されたマイグレーションファイルの警告（再適用はしない）"""
+    for migration in migrations:
+        checksum = done.get(migration.version)
+        if checksum is not None and checksum != migration.checksum:
+            print(f"⚠️ Migration {migration.version:04d}_{migration.name} changed after it was applied")
+
+
+async def check_schema_version(conn: asyncpg.Connection) -> dict[str, Any]:
+    """
+    スキーマのバージョン確認（アプリケーション起動時）
+
+    目的・理由:
+    - DDLを実行せず、schema_versionの読み取りだけで未適用のマイグレーションの有無を確認する
+    - 未適用がある場合は警告を出す（アプリケーションは起動を継続。新しい列等を使うAPIは失敗しうる）
+
+    前提条件・制約:
+    - データベースがアプリケーションより新しいバージョン（ローリングデプロイ中等）は正常とする
+    """
+    migrations = discover_migrations()
+    done = await applied_versions(conn)
+    pending = [f"{m.version:04d}_{m.name}" for m in migrations if m.version not in done]
+    _status.update(
+        current=max(done, default=0),
+        latest=max((m.version for m in migrations), default=0),
+        pending=pending,
+        checked_at=datetime.now(timezone.utc),
+    )
+    if pending:
+        print(f"⚠️ Database schema is behind: {len(pending)} pending migration(s) ({', '.join(pending)})")
+    else:
+        print(f"✅ Database schema version {_status['current']}")
+    return dict(_status)
+
+
+def schema_status() -> dict[str, Any]:
+    """
+    スキーマのバージョン情報
+
+    目的・理由:
+    - 起動時に確認したバージョン・未適用のマイグレーションを内部APIで確認する
+    """
+    return {"migrate_on_startup": DB_MIGRATE_ON_STARTUP, **_status}
+
+
+def _partition_index_name(index: str, partition: str) -> str:
+    """パーティション側のインデックス名（識別子の最大長に収める）"""
+    return f"{index}_{partition.removeprefix('tasks_')}"[:_MAX_IDENTIFIER_LENGTH]
+
+
+async def drop_invalid_index(conn: asyncpg.Connection, name: str) -> None:
+    """CREATE INDEX CONCURRENTLYの失敗で残った無効なインデックスの削除"""
+    valid = await conn.fetchval(
+        "SELECT i.indisvalid FROM pg_index AS i WHERE i.indexrelid = to_regclass($1)", name
+    )
+    if valid is False:
+        print(f"⚠️ Dropping invalid index {name} left by an interrupted build")
+        await conn.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+async def create_index_concurrently(conn: asyncpg.Connection, name: str, table: str, definition: str) -> None:
+    """
+    オンラインのインデックス作成
+
+    目的・理由:
+    - 書き込みを止めずにインデックスを作成する（CREATE INDEX CONCURRENTLY）
+    - パーティション化したテーブルはCONCURRENTLYで直接作成できないため、
+      親テーブルにON ONLYで（無効な）インデックスを作成し、各パーティションにCONCURRENTLYで作成して接続する
+      （全パーティションを接続した時点で親のインデックスが有効になる。以降に作成するパーティションには自動で作成される）
+
+    影響範囲:
+    - PostgreSQL（インデックス作成中はテーブル全体を走査するが、読み書きはブロックしない）
+
+    前提条件・制約:
+    - TRANSACTION = False のマイグレーションから呼ぶこと（トランザクション内では実行できない）
+    - definitionは列指定以降（例: "USING GIN (search_vector)"、"(created_at DESC, id DESC) INCLUDE (title)"）
+    - 途中で失敗して残った無効なインデックスは削除して作り直す（再実行できる）
+    """
+    relkind = await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass($1)", table)
+    if relkind != "p":
+        await drop_invalid_index(conn, name)
+        await conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+        return
+
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {table} {definition}")
+    partitions = await conn.fetch(
+        """
+        SELECT c.relname,
+               EXISTS (
+                   SELECT 1 FROM pg_inherits AS ii JOIN pg_index AS x ON x.indexrelid = ii.inhrelid
+                   WHERE ii.inhparent = to_regclass($2) AND x.indrelid = c.oid
+               ) AS attached
+        FROM pg_inherits AS i JOIN pg_class AS c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass($1)
+        ORDER BY c.relname
+        """,
+        table,
+        name,
+    )
+    for partition in partitions:
+        if partition["attached"]:
+            continue
+        child = _partition_index_name(name, partition["relname"])
+        await drop_invalid_index(conn, child)
+        await conn.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {child} ON {partition['relname']} {definition}")
+        await conn.execute(f"ALTER INDEX {name} ATTACH PARTITION {child}")
+
+
+async def _print_status(database_url: str) -> None:
+    """適用状況の表示（--status）"""
+    conn = await asyncpg.connect(database_url)
+    try:
+        await check_schema_version(conn)
+        done = await applied_versions(conn)
+    finally:
+        await conn.close()
+    for migration in discover_migrations():
+        state = "applied" if migration.version in done else "pending"
+        print(f"  {migration.version:04d}_{migration.name}.{migration.kind}: {state}")
+
+
+def main() -> None:
+    from db.postgres import get_database_url
+
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="適用せず、適用状況のみ表示する")
+    args = parser.parse_args()
+
+    if args.status:
+        asyncio.run(_print_status(get_database_url()))
+    else:
+        asyncio.run(run_migrations(get_database_url()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,465 @@
+"""
+tasksテーブルの月次パーティション（作成・保持期間・アーカイブ）
+
+目的・理由:
+- tasksが単一のテーブルのため、数年前の完了済みタスクがインデックス（idx_tasks_created_at_id等）を肥大化させ、
+  一覧・件数取得が遅くなっていく
+- created_atの月単位でレンジパーティションに分割し、古い行は大量のDELETEではなく
+  パーティションの切り離し（DETACH PARTITION）と削除で一括して取り除く（VACUUM・WAL増加なし）
+- created_atの範囲条件付きの一覧（created_from/created_to、キーセットのcreated_at <= $n）は
+  該当しないパーティションを読まない（パーティションプルーニング。プリペアドステートメントでも実行時に除外）
+
+影響範囲:
+- PostgreSQL（tasksテーブルの定義、パーティションの作成・切り離し・削除）
+- マイグレーション（migrations/0001_tasks_table.py、既存の単一テーブルの変換）
+- ローカルファイル（TASK_ARCHIVE_DIR指定時、切り離す前のパーティションをCSVで保存）
+
+前提条件・制約:
+- 主キーは (id, created_at)（パーティションキーを含める必要があるため）。idのみの検索は全パーティションの主キーを参照する
+- 範囲外のcreated_atの行（過去日付の投入等）は既定パーティション（tasks_default）に入る
+  （既定パーティションに行がある月のパーティションは作成できないため、警告を出して作成しない）
+- 既存の単一テーブルは、行を移さずそのまま最古のパーティション（tasks_legacy、下限なし〜変換した月の翌月）として接続する
+  （範囲の検査・(id, created_at) の一意インデックスの作成は読み書きを止めずに先に行い、排他ロックは接続の一瞬のみ）
+- 定期処理（作成・保持期間の適用）はアドバイザリロックを取れたプロセスのみが実行する（複数レプリカで重複しない）
+- 切り離した行はタスクキャッシュに残りうる（キャッシュのTTLまで）
+"""
+
+import asyncio
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+import asyncpg
+
+from db.counts import reset_cached_counts
+from db.migrate import drop_invalid_index
+from db.task_repository import SEARCH_CONFIG, TASK_COLUMNS
+
+
+# 目的・理由: 先行して作成しておく月数（当月の後、何か月分のパーティションを用意するか）
+# 影響範囲: tasksテーブルのパーティション
+# 前提条件・制約: 環境変数TASK_PARTITION_PREMAKE_MONTHSで変更可能（定期処理が止まっても書き込みを既定パーティションへ逃がさない猶予）
+TASK_PARTITION_PREMAKE_MONTHS = int(os.getenv("TASK_PARTITION_PREMAKE_MONTHS", "3"))
+
+# 目的・理由: 保持する月数（当月を除く）。これより古い月のパーティションを切り離して削除する
+# 影響範囲: tasksテーブルの行（古い月の行はすべて削除される）
+# 前提条件・制約: 環境変数TASK_RETENTION_MONTHSで変更可能。0（既定）は保持期間なし（削除しない）
+TASK_RETENTION_MONTHS = int(os.getenv("TASK_RETENTION_MONTHS", "0"))
+
+# 目的・理由: 切り離す前にパーティションをCSVで保存するディレクトリ（アプリケーションのローカルファイル）
+# 影響範囲: 保持期間の適用
+# 前提条件・制約: 環境変数TASK_ARCHIVE_DIRで指定（未指定時は保存しない）。保存に失敗した月は切り離さない
+TASK_ARCHIVE_DIR = os.getenv("TASK_ARCHIVE_DIR", "")
+
+# 目的・理由: 切り離したパーティションを削除するか（falseなら独立したテーブルとして残し、外部でアーカイブする）
+# 影響範囲: 保持期間の適用
+# 前提条件・制約: 環境変数TASK_RETENTION_DROP_DETACHEDで変更可能
+TASK_RETENTION_DROP_DETACHED = os.getenv("TASK_RETENTION_DROP_DETACHED", "true").lower() == "true"
+
+# 目的・理由: 定期処理（パーティション作成・保持期間の適用）の間隔（秒）
+# 影響範囲: tasksテーブルのパーティション
+# 前提条件・制約: 環境変数TASK_PARTITION_MAINTENANCE_SECONDSで変更可能
+TASK_PARTITION_MAINTENANCE_SECONDS = float(os.getenv("TASK_PARTITION_MAINTENANCE_SECONDS", "3600"))
+
+# 目的・理由: パーティションの作成・切り離しで親テーブルのロックを待つ上限（秒）
+# 前提条件・制約: 長いトランザクションの後ろでロック待ちになり、後続の読み書きを止めないようにする（次回の定期処理で再試行）
+PARTITION_LOCK_TIMEOUT_SECONDS = 5
+
+# 目的・理由: 定期処理・変換の排他用アドバイザリロックのキー
+PARTITION_MAINTENANCE_LOCK_KEY = 0x7461736B0001
+
+# 目的・理由: 既定パーティション・変換した既存テーブルの名前
+DEFAULT_PARTITION = "tasks_default"
+LEGACY_PARTITION = "tasks_legacy"
+
+# 目的・理由: パーティション化したtasksテーブルの定義（init.sqlと一致させる）
+TASKS_TABLE_DDL = f"""
+    CREATE TABLE IF NOT EXISTS tasks (
+        id UUID NOT NULL DEFAULT gen_random_uuid(),
+        title VARCHAR(100) NOT NULL,
+        description VARCHAR(500),
+        status VARCHAR(20) NOT NULL DEFAULT 'pending'
+            CHECK (status IN ('pending', 'in_progress', 'completed')),
+        created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+        version INTEGER NOT NULL DEFAULT 1,
+        search_vector TSVECTOR GENERATED ALWAYS AS (
+            setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')
+        ) STORED,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+"""
+
+_BOUND_PATTERN = re.compile(r"FROM \((.+?)\) TO \((.+?)\)")
+
+# 統計（プロセス起動からの累計）と直近の定期処理の結果
+_stats: dict[str, Any] = {"runs": 0, "skipped": 0, "created": 0, "archived": 0, "detached": 0, "dropped": 0}
+_last_run: dict[str, Any] = {"at": None, "partitions": [], "error": None}
+
+# 定期処理タスク
+_maintenance_task: Optional["asyncio.Task[None]"] = None
+
+
+def month_start(value: datetime) -> datetime:
+    """月初（UTC）"""
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    """月初の日時にmonths月を加算（負数は減算）"""
+    index = value.year * 12 + value.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    """月のパーティション名（tasks_pYYYYMM）"""
+    return f"tasks_p{month:%Y%m}"
+
+
+class Partition:
+    """
+    パーティション1つ
+
+    前提条件・制約:
+    - lower/upperがNoneは下限なし（MINVALUE）/上限なし（MAXVALUE）
+    - is_defaultの場合は範囲なし（他のパーティションに入らない行）
+    """
+
+    def __init__(self, name: str, bound: str, rows: int) -> None:
+        self.name = name
+        self.rows = max(rows, 0)
+        self.is_default = bound == "DEFAULT"
+        self.lower: Optional[datetime] = None
+        self.upper: Optional[datetime] = None
+        match = _BOUND_PATTERN.search(bound)
+        if match:
+            self.lower = _parse_bound(match.group(1))
+            self.upper = _parse_bound(match.group(2))
+
+    def overlaps(self, lower: datetime, upper: datetime) -> bool:
+        """[lower, upper) と範囲が重なるか"""
+        if self.is_default:
+            return False
+        return (self.lower is None or self.lower < upper) and (self.upper is None or lower < self.upper)
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "from": self.lower,
+            "to": self.upper,
+            "default": self.is_default,
+            "estimated_rows": self.rows,
+        }
+
+
+def _parse_bound(value: str) -> Optional[datetime]:
+    """パーティション境界の値（'2025-01-01 00:00:00+00' / MINVALUE / MAXVALUE）"""
+    if value in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+async def is_partitioned(conn: asyncpg.Connection) -> bool:
+    """tasksがパーティション化済みか（単一テーブル・未作成はFalse）"""
+    return await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass('tasks')") == "p"
+
+
+async def list_partitions(conn: asyncpg.Connection) -> list[Partition]:
+    """tasksのパーティション一覧（範囲の古い順、既定パーティションは末尾）"""
+    rows = await conn.fetch(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) AS bound, c.reltuples::bigint AS rows "
+        "FROM pg_inherits AS i JOIN pg_class AS c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'tasks'::regclass"
+    )
+    partitions = [Partition(row["relname"], row["bound"], row["rows"]) for row in rows]
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(partitions, key=lambda p: (p.is_default, p.lower or oldest))
+
+
+async def _ddl(conn: asyncpg.Connection, sql: str) -> None:
+    """親テーブルのロック待ちに上限を付けたDDLの実行"""
+    async with conn.transaction():
+        await conn.execute(f"SET LOCAL lock_timeout = '{PARTITION_LOCK_TIMEOUT_SECONDS}s'")
+        await conn.execute(sql)
+
+
+async def convert_to_partitioned(conn: asyncpg.Connection) -> bool:
+    """
+    既存の単一テーブルのパーティション化
+
+    目的・理由:
+    - 行を移さず、既存のテーブルを最古のパーティション（tasks_legacy）として新しい親テーブルに接続する
+      （範囲は下限なし〜変換した月（またはcreated_atの最大値の月）の翌月。以降の月はパーティションを作成する）
+    - 全行を読む処理は、読み書きを止めないロックで先に済ませる
+      - 範囲のCHECK制約: NOT VALIDで付けてからVALIDATE CONSTRAINT（SHARE UPDATE EXCLUSIVE）で検査する。
+        検査済みの制約があるため、接続時の全行の検査は行われない
+      - 親テーブルの主キーと同じ (id, created_at) の一意インデックス: CREATE UNIQUE INDEX CONCURRENTLYで作成する
+    - 排他ロック（ACCESS EXCLUSIVE）を取るのは、主キーの付け替え（作成済みのインデックスを使う）・名前の変更・
+      親テーブルの作成・接続の1トランザクションのみ（いずれもカタログの更新だけで、行数によらず一瞬で終わる）
+    - 既存のインデックスは名前に_legacyを付けて残し、同じ定義の親テーブルのインデックス作成時にそのまま接続させる
+
+    影響範囲:
+    - tasksテーブル（検査・インデックス作成中は読み書きできる。排他ロックは最後の短いトランザクションのみ）
+
+    前提条件・制約:
+    - トランザクション外で呼ぶこと（CREATE INDEX CONCURRENTLYを使うため）
+    - 列（version・search_vectorを含む）を追加済みであること（親テーブルと列が一致しないと接続できない）
+    - created_atがNOT NULLであること（主キーの列になる）
+    - 検査後に範囲外のcreated_at（変換した月の翌月以降）を書き込むとCHECK制約で失敗する
+    - 複数プロセスが同時に起動しても、アドバイザリロックで1回だけ実行する。途中で失敗した場合は再実行できる
+    - 変換した場合はTrue
+    """
+    bound = f"{LEGACY_PARTITION}_bound"
+    key = f"{LEGACY_PARTITION}_pkey"
+    await conn.execute("SELECT pg_advisory_lock($1)", PARTITION_MAINTENANCE_LOCK_KEY)
+    try:
+        if await conn.fetchval("SELECT relkind FROM pg_class WHERE oid = to_regclass('tasks')") != "r":
+            return False
+
+        now = datetime.now(timezone.utc)
+        newest = await conn.fetchval("SELECT max(created_at) FROM tasks")
+        cutover = add_months(month_start(max(now, newest or now)), 1).isoformat()
+
+        # 全行を読む処理（読み書きを止めない）。再実行時は前回の制約・無効なインデックスを作り直す
+        await conn.execute(
+            f"ALTER TABLE tasks DROP CONSTRAINT IF EXISTS {bound}, "
+            f"ADD CONSTRAINT {bound} CHECK (created_at < '{cutover}') NOT VALID"
+        )
+        await conn.execute(f"ALTER TABLE tasks VALIDATE CONSTRAINT {bound}")
+        await drop_invalid_index(conn, key)
+        await conn.execute(f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {key} ON tasks (id, created_at)")
+
+        # 排他ロックを取る区間（カタログの更新のみ）
+        async with conn.transaction():
+            # 親テーブルの主キーに接続できるのは主キー制約のインデックスのみ（一意インデックスでは接続されない）
+            primary_key = await conn.fetchval(
+                "SELECT conname FROM pg_constraint WHERE conrelid = 'tasks'::regclass AND contype = 'p'"
+            )
+            drop = f'DROP CONSTRAINT "{primary_key}", ' if primary_key else ""
+            await conn.execute(f"ALTER TABLE tasks {drop}ADD CONSTRAINT {key} PRIMARY KEY USING INDEX {key}")
+            await conn.execute(f"ALTER TABLE tasks RENAME TO {LEGACY_PARTITION}")
+            indexes = await conn.fetch(
+                "SELECT indexname FROM pg_indexes "
+                "WHERE schemaname = current_schema() AND tablename = $1 AND indexname <> $2",
+                LEGACY_PARTITION,
+                key,
+            )
+            for index in indexes:
+                await conn.execute(f'ALTER INDEX "{index["indexname"]}" RENAME TO "{index["indexname"]}_legacy"')
+
+            await conn.execute(TASKS_TABLE_DDL)
+            await conn.execute(
+                f"ALTER TABLE tasks ATTACH PARTITION {LEGACY_PARTITION} FOR VALUES FROM (MINVALUE) TO ('{cutover}')"
+            )
+            await conn.execute(f"ALTER TABLE {LEGACY_PARTITION} DROP CONSTRAINT {bound}")
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", PARTITION_MAINTENANCE_LOCK_KEY)
+
+    print(f"✅ tasks converted to a partitioned table (existing rows in {LEGACY_PARTITION} until {cutover})")
+    return True
+
+
+async def ensure_partitions(
+    conn: asyncpg.Connection, now: Optional[datetime] = None, since: Optional[datetime] = None
+) -> list[str]:
+    """
+    パーティションの作成
+
+    目的・理由:
+    - 当月からTASK_PARTITION_PREMAKE_MONTHS月先までの月次パーティションと、既定パーティションを用意する
+    - 既存のパーティションと範囲が重なる月（tasks_legacyの範囲等）は作成しない
+
+    前提条件・制約:
+    - tasksがパーティション化済みであること
+    - since指定時はその月から作成する（過去日付のデータを投入する前。既定パーティションに入れないため）
+    - 作成に失敗した月（既定パーティションに該当月の行がある、他のプロセスが同時に作成した等）は警告を出して次回に回す
+    - 作成したパーティション名を返す
+    """
+    partitions = await list_partitions(conn)
+    current = month_start(now or datetime.now(timezone.utc))
+    first = month_start(min(since, current)) if since else current
+    months = (current.year - first.year) * 12 + current.month - first.month + TASK_PARTITION_PREMAKE_MONTHS + 1
+    created = []
+    for offset in range(months):
+        lower, upper = add_months(first, offset), add_months(first, offset + 1)
+        if any(partition.overlaps(lower, upper) for partition in partitions):
+            continue
+        name = partition_name(lower)
+        try:
+            await _ddl(
+                conn,
+                f"CREATE TABLE {name} PARTITION OF tasks "
+                f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')",
+            )
+        except asyncpg.PostgresError as e:
+            # 既定パーティションに該当月の行がある場合等。行は既定パーティションのまま読み書きできる
+            print(f"⚠️ Task partition {name} not created: {e}")
+            continue
+        created.append(name)
+
+    if not any(partition.is_default for partition in partitions):
+        try:
+            await _ddl(conn, f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF tasks DEFAULT")
+            created.append(DEFAULT_PARTITION)
+        except asyncpg.PostgresError as e:
+            # 他のプロセスが同時に作成した場合等
+            print(f"⚠️ Task partition {DEFAULT_PARTITION} not created: {e}")
+
+    if created:
+        _stats["created"] += len(created)
+        print(f"✅ Task partitions created: {', '.join(created)}")
+    return created
+
+
+async def _archive(conn: asyncpg.Connection, name: str) -> str:
+    """
+    パーティションのCSV保存
+
+    目的・理由:
+    - 切り離す前にCOPY TO STDOUTでローカルファイルへ保存する（一時ファイルに書き、完了後に置き換える）
+    - 生成列（search_vector）は保存しない（復元時に再計算される）
+    """
+    os.makedirs(TASK_ARCHIVE_DIR, exist_ok=True)
+    path = os.path.join(TASK_ARCHIVE_DIR, f"{name}.csv")
+    temporary = f"{path}.tmp"
+    await conn.copy_from_table(name, columns=list(TASK_COLUMNS), output=temporary, format="csv", header=True)
+    os.replace(temporary, path)
+    return path
+
+
+async def apply_retention(conn: asyncpg.Connection, now: Optional[datetime] = None) -> list[str]:
+    """
+    保持期間の適用
+
+    目的・理由:
+    - 範囲の上限が保持期間の開始（当月初 − TASK_RETENTION_MONTHS月）以前のパーティションを、
+      古い順に（TASK_ARCHIVE_DIR指定時はCSVに保存してから）切り離して削除する
+    - 行単位のDELETEを行わないため、削除する行数によらずカタログ操作のみで終わる
+
+    影響範囲:
+    - tasksテーブル（古い月の行）、件数キャッシュ（切り離した後に破棄）
+
+    前提条件・制約:
+    - TASK_RETENTION_MONTHSが0の場合は何もしない
+    - 既定パーティションは対象外（範囲がないため）
+    - 切り離したパーティション名を返す
+    """
+    if TASK_RETENTION_MONTHS <= 0:
+        return []
+    cutoff = add_months(month_start(now or datetime.now(timezone.utc)), -TASK_RETENTION_MONTHS)
+    detached = []
+    for partition in await list_partitions(conn):
+        if partition.is_default or partition.upper is None or partition.upper > cutoff:
+            continue
+        if TASK_ARCHIVE_DIR:
+            try:
+                path = await _archive(conn, partition.name)
+            except (OSError, asyncpg.PostgresError) as e:
+                print(f"⚠️ Task partition {partition.name} not archived, keeping it attached: {e}")
+                continue
+            _stats["archived"] += 1
+            print(f"📦 Task partition {partition.name} archived to {path}")
+
+        await _ddl(conn, f"ALTER TABLE tasks DETACH PARTITION {partition.name}")
+        _stats["detached"] += 1
+        detached.append(partition.name)
+        if TASK_RETENTION_DROP_DETACHED:
+            await _ddl(conn, f"DROP TABLE {partition.name}")
+            _stats["dropped"] += 1
+        print(f"🗑️ Task partition {partition.name} detached ({partition.rows} rows, before {cutoff:%Y-%m})")
+
+    if detached:
+        reset_cached_counts()
+    return detached
+
+
+async def run_partition_maintenance(pool: Any) -> None:
+    """
+    定期処理1回分（パーティション作成・保持期間の適用）
+
+    前提条件・制約:
+    - アドバイザリロックを取れない場合（他のプロセスが実行中）は何もしない
+    - tasksがパーティション化されていない場合は何もしない
+    """
+    async with pool.acquire() as conn:
+        if not await conn.fetchval("SELECT pg_try_advisory_lock($1)", PARTITION_MAINTENANCE_LOCK_KEY):
+            _stats["skipped"] += 1
+            return
+        try:
+            if not await is_partitioned(conn):
+                return
+            _stats["runs"] += 1
+            await ensure_partitions(conn)
+            await apply_retention(conn)
+            _last_run["partitions"] = [partition.snapshot() for partition in await list_partitions(conn)]
+            _last_run["error"] = None
+        finally:
+            _last_run["at"] = datetime.now(timezone.utc)
+            await conn.execute("SELECT pg_advisory_unlock($1)", PARTITION_MAINTENANCE_LOCK_KEY)
+
+
+async def _maintain_forever(pool: Any) -> None:
+    """
+    定期処理の繰り返し
+
+    前提条件・制約:
+    - stop_partition_maintenance()でキャンセルされるまで動作
+    """
+    while True:
+        try:
+            await run_partition_maintenance(pool)
+        except Exception as e:
+            _last_run["error"] = str(e)
+            print(f"⚠️ Task partition maintenance failed: {e}")
+        await asyncio.sleep(TASK_PARTITION_MAINTENANCE_SECONDS)
+
+
+async def start_partition_maintenance(pool: Any) -> None:
+    """
+    定期処理の開始
+
+    目的・理由:
+    - アプリケーション起動時に呼び、月の切り替わり前に翌月以降のパーティションを用意し、保持期間を適用する
+    """
+    global _maintenance_task
+
+    if _maintenance_task is None:
+        _maintenance_task = asyncio.create_task(_maintain_forever(pool))
+
+
+async def stop_partition_maintenance() -> None:
+    """定期処理の停止"""
+    global _maintenance_task
+
+    if _maintenance_task is not None:
+        _maintenance_task.cancel()
+        try:
+            await _maintenance_task
+        except asyncio.CancelledError:
+            pass
+        _maintenance_task = None
+
+
+def partition_stats() -> dict[str, Any]:
+    """
+    統計情報
+
+    目的・理由:
+    - 直近の定期処理時点のパーティション一覧（範囲・推定行数）と、作成・保存・切り離し・削除の件数を内部APIで確認する
+
+    前提条件・制約:
+    - パーティション一覧は定期処理を実行したプロセスのみ（他のプロセスは空）
+    """
+    return {
+        "premake_months": TASK_PARTITION_PREMAKE_MONTHS,
+        "retention_months": TASK_RETENTION_MONTHS,
+        "archive_dir": TASK_ARCHIVE_DIR or None,
+        "drop_detached": TASK_RETENTION_DROP_DETACHED,
+        "last_run_at": _last_run["at"],
+        "last_error": _last_run["error"],
+        "partitions": _last_run["partitions"],
+        **_stats,
+    }
@@ -0,0 +1,396 @@
+"""
+接続プールの計測と上限の自動調整
+
+目的・理由:
+- 接続プールが枯渇しても「原因不明の遅延」としか見えないため、接続取得の待ち時間をヒストグラムで記録し、
+  使用中/アイドル接続数・接続の経過時間と合わせて内部APIとX-Rayのメタデータで確認できるようにする
+- 同時に使用できる接続数（上限）をプール内で管理し、観測した待ち時間に応じて
+  最小〜最大接続数の範囲で増減できるようにする（任意。DATABASE_POOL_ADAPTIVE=true）
+- 使われなくなった接続はmax_inactive_connection_lifetime経過後にasyncpgが閉じる（上限を下げた分の接続の回収）
+
+影響範囲:
+- すべてのDBアクセス処理（プライマリ・リードレプリカの接続プール）
+- X-Rayトレース（リクエストセグメントのメタデータ db_pool）
+
+前提条件・制約:
+- 接続の取得は async with pool.acquire() で行うこと（await pool.acquire() / pool.release() は非対応）
+- asyncioの単一スレッド上で使用すること（ロック不要）
+"""
+
+import asyncio
+import os
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
+
+import asyncpg
+
+from middleware.deadline import statement_timeout
+
+
+# 目的・理由: 接続プールの最小・最大接続数（自動調整時は上限の下限・上限）
+# 影響範囲: すべてのDBアクセス処理（プールごとの値。プライマリ・レプリカ共通）
+# 前提条件・制約: 環境変数DATABASE_POOL_MIN_SIZE / DATABASE_POOL_MAX_SIZEで変更可能
+DATABASE_POOL_MIN_SIZE = int(os.getenv("DATABASE_POOL_MIN_SIZE", "2"))
+DATABASE_POOL_MAX_SIZE = int(os.getenv("DATABASE_POOL_MAX_SIZE", "10"))
+
+# 目的・理由: 使われていない接続を閉じるまでの秒数（上限を下げた後の余剰接続・長時間放置された接続の回収）
+# 影響範囲: すべてのDBアクセス処理
+# 前提条件・制約: 環境変数DATABASE_POOL_MAX_INACTIVE_SECONDSで変更可能（0で無効。asyncpgの既定値は300秒）
+DATABASE_POOL_MAX_INACTIVE_SECONDS = float(os.getenv("DATABASE_POOL_MAX_INACTIVE_SECONDS", "300"))
+
+# 目的・理由: 同時使用数の上限の自動調整の有効/無効
+# 影響範囲: すべてのDBアクセス処理
+# 前提条件・制約: 環境変数DATABASE_POOL_ADAPTIVEがtrueの場合のみ有効（無効時の上限は最大接続数で固定）
+DATABASE_POOL_ADAPTIVE = os.getenv("DATABASE_POOL_ADAPTIVE", "false").lower() == "true"
+
+# 目的・理由: 自動調整の間隔（秒）。この間の待ち時間から上限を決める
+# 影響範囲: 自動調整
+# 前提条件・制約: 環境変数DATABASE_POOL_ADJUST_SECONDSで変更可能
+DATABASE_POOL_ADJUST_SECONDS = float(os.getenv("DATABASE_POOL_ADJUST_SECONDS", "10"))
+
+# 目的・理由: 上限を増やす待ち時間のしきい値（ミリ秒）。調整間隔内のp95がこれ以上なら増やす
+# 影響範囲: 自動調整
+# 前提条件・制約: 環境変数DATABASE_POOL_GROW_WAIT_MSで変更可能
+DATABASE_POOL_GROW_WAIT_MS = float(os.getenv("DATABASE_POOL_GROW_WAIT_MS", "10"))
+
+# 目的・理由: 接続取得の待ち時間ヒストグラムの区切り（ミリ秒、上限値）
+ACQUIRE_WAIT_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# 目的・理由: リクエスト単位の接続取得の記録（X-Rayミドルウェアがセグメントのメタデータに書き出す）
+_request_pool_usage: ContextVar[Optional[dict[str, Any]]] = ContextVar("request_pool_usage", default=None)
+
+
+class WaitHistogram:
+    """
+    待ち時間ヒストグラム
+
+    目的・理由:
+    - 固定の区切りで件数を数え、パーセンタイルを区切りの上限値で近似する（メモリ使用量が一定）
+    """
+
+    def __init__(self) -> None:
+        self.buckets = [0] * (len(ACQUIRE_WAIT_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, wait_ms: float) -> None:
+        index = next((i for i, bound in enumerate(ACQUIRE_WAIT_BUCKETS_MS) if wait_ms <= bound), -1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total_ms += wait_ms
+        self.max_ms = max(self.max_ms, wait_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """パーセンタイル（該当する区切りの上限値。最後の区切りを超える場合は最大値）"""
+        if self.count == 0:
+            return 0.0
+        threshold = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(ACQUIRE_WAIT_BUCKETS_MS, self.buckets):
+            cumulative += count
+            if cumulative >= threshold:
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def stats(self) -> dict[str, Any]:
+        labels = [f"le_{bound}" for bound in ACQUIRE_WAIT_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "p50_ms": self.percentile(0.50),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "buckets": dict(zip(labels, self.buckets)),
+        }
+
+
+class ManagedPool:
+    """
+    計測付きの接続プール（asyncpg.Poolのラッパー）
+
+    目的・理由:
+    - 同時使用数の上限（limit）を自前のゲートで管理し、asyncpgのプールは最大接続数で作成する
+      （asyncpgのプールは作成後に最大接続数を変えられないため）
+    - ゲートとasyncpgの接続取得を合わせた時間を接続取得の待ち時間として記録する
+    - 接続確立時刻を記録し、接続の経過時間（古い接続が残り続けていないか）を確認できるようにする
+
+    影響範囲:
+    - すべてのDBアクセス処理
+
+    前提条件・制約:
+    - fetch/fetchrow/fetchval/executeはacquire()経由で実行する（計測・上限の対象）
+    """
+
+    def __init__(self, name: str, min_size: int, max_size: int, adaptive: bool) -> None:
+        self.name = name
+        self.min_size = min_size
+        self.max_size = max_size
+        self.adaptive = adaptive
+        self.limit = max_size
+        self._pool: Optional[asyncpg.Pool] = None
+        self._in_use = 0
+        self._waiters: deque["asyncio.Future[None]"] = deque()
+        self._connected_at: "weakref.WeakKeyDictionary[asyncpg.Connection, float]" = weakref.WeakKeyDictionary()
+        self._adjust_task: Optional["asyncio.Task[None]"] = None
+        self.histogram = WaitHistogram()
+        self._window = WaitHistogram()
+        self._window_peak = 0
+        self.opened = 0
+        self.timeouts = 0
+        self.adjustments = 0
+
+    async def open(
+        self,
+        database_url: str,
+        init: Optional[Callable[[asyncpg.Connection], Awaitable[None]]] = None,
+        **kwargs: Any,
+    ) -> "ManagedPool":
+        """
+        asyncpgのプール作成と自動調整の開始
+
+        前提条件・制約:
+        - initは接続確立時に一度だけ呼ばれる（接続確立時刻の記録と合わせて実行する）
+        """
+        async def on_connect(conn: asyncpg.Connection) -> None:
+            self._connected_at[conn] = time.monotonic()
+            self.opened += 1
+            if init is not None:
+                await init(conn)
+
+        self._pool = await asyncpg.create_pool(
+            database_url,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_inactive_connection_lifetime=DATABASE_POOL_MAX_INACTIVE_SECONDS,
+            init=on_connect,
+            **kwargs,
+        )
+        if self.adaptive:
+            self._adjust_task = asyncio.create_task(self._adjust_forever())
+        return self
+
+    async def close(self) -> None:
+        """自動調整の停止とasyncpgのプールのクローズ"""
+        if self._adjust_task is not None:
+            self._adjust_task.cancel()
+            try:
+                await self._adjust_task
+            except asyncio.CancelledError:
+                pass
+            self._adjust_task = None
+        if self._pool is not None:
+            await self._pool.close()
+
+    @property
+    def in_use(self) -> int:
+        """使用中（ゲート通過済み）の接続数"""
+        return self._in_use
+
+    def get_size(self) -> int:
+        return self._pool.get_size() if self._pool is not None else 0
+
+    def get_idle_size(self) -> int:
+        return self._pool.get_idle_size() if self._pool is not None else 0
+
+    async def _enter(self) -> None:
+        """ゲート通過（上限に達している場合は到着順に待つ）"""
+        if self._in_use < self.limit and not self._waiters:
+            self._in_use += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # 枠を受け取った直後にキャンセルされた場合は返却する
+            if waiter.done() and not waiter.cancelled():
+                self._leave()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+
+    def _leave(self) -> None:
+        """ゲート返却（待機中の呼び出しへ枠を渡す）"""
+        self._in_use -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self._in_use < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._in_use += 1
+                waiter.set_result(None)
+
+    @asynccontextmanager
+    async def acquire(self, timeout: Optional[float] = None) -> AsyncIterator[asyncpg.Connection]:
+        """
+        接続取得
+
+        目的・理由:
+        - ゲート → asyncpgの順に接続を取得し、合計の待ち時間を記録する
+
+        前提条件・制約:
+        - timeoutは待ち時間全体の上限（秒）。未指定時はリクエストの残り時間（期限）
+        - 超えた場合はasyncio.TimeoutError
+        """
+        if self._pool is None:
+            raise RuntimeError(f"Database pool {self.name} is not open")
+        timeout = statement_timeout(timeout)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._enter(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise
+        try:
+            remaining = None if timeout is None else max(timeout - (time.perf_counter() - started), 0.001)
+            try:
+                connection = self._pool.acquire(timeout=remaining)
+                conn = await connection.__aenter__()
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise
+            try:
+                self._record_wait((time.perf_counter() - started) * 1000)
+                yield conn
+            finally:
+                await connection.__aexit__(None, None, None)
+        finally:
+            self._leave()
+
+    def _record_wait(self, wait_ms: float) -> None:
+        self.histogram.record(wait_ms)
+        self._window.record(wait_ms)
+        self._window_peak = max(self._window_peak, self._in_use)
+
+        usage = _request_pool_usage.get()
+        if usage is not None:
+            usage["acquires"] += 1
+            usage["wait_ms_total"] = round(usage["wait_ms_total"] + wait_ms, 3)
+            usage["wait_ms_max"] = round(max(usage["wait_ms_max"], wait_ms), 3)
+            usage["pools"][self.name] = self.snapshot()
+
+    async def fetch(self, query: str, *args: Any, timeout: Optional[float] = None) -> list:
+        async with self.acquire() as conn:
+            return await conn.fetch(query, *args, timeout=timeout)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: Optional[float] = None) -> Any:
+        async with self.acquire() as conn:
+            return await conn.fetchrow(query, *args, timeout=timeout)
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0, timeout: Optional[float] = None) -> Any:
+        async with self.acquire() as conn:
+            return await conn.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def execute(self, query: str, *args: Any, timeout: Optional[float] = None) -> str:
+        async with self.acquire() as conn:
+            return await conn.execute(query, *args, timeout=timeout)
+
+    def _adjust(self) -> None:
+        """
+        上限の調整（調整間隔ごと）
+
+        目的・理由:
+        - 待ち時間のp95がしきい値以上なら上限を25%（最低1）増やす
+        - 待ちがなく、使用中の最大数が上限を2以上下回っていれば上限を1減らす（急に絞らない）
+
+        前提条件・制約:
+        - 上限は最小〜最大接続数の範囲
+        """
+        window, peak = self._window, self._window_peak
+        self._window, self._window_peak = WaitHistogram(), self._in_use
+
+        p95 = window.percentile(0.95)
+        limit = self.limit
+        if p95 >= DATABASE_POOL_GROW_WAIT_MS and limit < self.max_size:
+            limit = min(self.max_size, limit + max(1, limit // 4))
+        elif p95 < DATABASE_POOL_GROW_WAIT_MS and peak < limit - 1 and limit > self.min_size:
+            limit -= 1
+        if limit == self.limit:
+            return
+
+        print(f"🔧 Database pool limit changed: {self.name} {self.limit} -> {limit} (p95 wait {p95}ms, peak {peak})")
+        self.limit = limit
+        self.adjustments += 1
+        self._wake()
+
+    async def _adjust_forever(self) -> None:
+        """自動調整の定期実行（close()でキャンセルされるまで動作）"""
+        while True:
+            await asyncio.sleep(DATABASE_POOL_ADJUST_SECONDS)
+            self._adjust()
+
+    def snapshot(self) -> dict[str, int]:
+        """現在の接続数（X-Rayメタデータ用の軽量な値）"""
+        return {
+            "limit": self.limit,
+            "in_use": self._in_use,
+            "waiting": len(self._waiters),
+            "size": self.get_size(),
+            "idle": self.get_idle_size(),
+        }
+
+    def stats(self) -> dict[str, Any]:
+        """
+        統計情報
+
+        目的・理由:
+        - 接続数・待ち時間ヒストグラム・接続の経過時間・上限の調整回数を内部APIで確認する
+        """
+        now = time.monotonic()
+        ages = [now - connected_at for conn, connected_at in self._connected_at.items() if not conn.is_closed()]
+        return {
+            "name": self.name,
+            **self.snapshot(),
+            "min_size": self.min_size,
+            "max_size": self.max_size,
+            "adaptive": self.adaptive,
+            "adjustments": self.adjustments,
+            "acquire_timeouts": self.timeouts,
+            "acquire_wait": self.histogram.stats(),
+            "connections": {
+                "opened": self.opened,
+                "live": len(ages),
+                "oldest_age_seconds": round(max(ages), 1) if ages else 0.0,
+                "mean_age_seconds": round(sum(ages) / len(ages), 1) if ages else 0.0,
+                "max_inactive_seconds": DATABASE_POOL_MAX_INACTIVE_SECONDS,
+            },
+        }
+
+
+async def create_managed_pool(
+    name: str,
+    database_url: str,
+    init: Optional[Callable[[asyncpg.Connection], Awaitable[None]]] = None,
+    **kwargs: Any,
+) -> ManagedPool:
+    """
+    計測付き接続プールの作成
+
+    目的・理由:
+    - 最小・最大接続数と自動調整の設定を環境変数から一箇所で決める
+
+    前提条件・制約:
+    - kwargsはasyncpg.create_pool()へそのまま渡す（min_size/max_size/initを除く）
+    """
+    pool = ManagedPool(name, DATABASE_POOL_MIN_SIZE, DATABASE_POOL_MAX_SIZE, DATABASE_POOL_ADAPTIVE)
+    return await pool.open(database_url, init, **kwargs)
+
+
+def track_pool_usage() -> dict[str, Any]:
+    """
+    リクエスト単位の接続取得記録の開始
+
+    目的・理由:
+    - X-Rayミドルウェアがリクエストごとに呼び、エンドポイントでの接続取得回数・待ち時間を集計する
+      （戻り値の辞書を子タスクと共有するため、エンドポイントが別タスクで動いても集計される）
+    """
+    usage: dict[str, Any] = {"acquires": 0, "wait_ms_total": 0.0, "wait_ms_max": 0.0, "pools": {}}
+    _request_pool_usage.set(usage)
+    return usage
@@ -0,0 +1,164 @@
+"""
+同一読み取りの合流（シングルフライト）
+
+目的・理由:
+- アクセス集中時は同じページ（GET /tasks?status=pending&limit=20 等）や同じタスクへの読み取りが
+  同時に多数届き、それぞれが接続プール（max_size=10）から接続を取得してしまう
+- 正規化したクエリ・パラメータをキーに、実行中の同一読み取りがあればその結果を待つだけにし、
+  DB呼び出し（接続取得を含む）を1回にまとめる
+- 合流率を内部APIとX-Rayで確認できるようにする
+
+影響範囲:
+- タスク一覧取得API、タスク詳細取得API（読み取り）
+- タスク作成/更新/削除、一括操作（forget()で実行中の読み取りとの合流を打ち切る）
+
+前提条件・制約:
+- 合流するのは同時に実行中の読み取りのみ（結果は保持しない。キャッシュではない）
+- 書き込み後に開始した読み取りが書き込み前に開始した読み取りに合流しないよう、
+  書き込み時にforget()を呼ぶこと（他レプリカの書き込みはタスクキャッシュの無効化通知で反映）
+- asyncioの単一スレッド上で使用すること（ロック不要）
+"""
+
+import asyncio
+import os
+from typing import Any, Awaitable, Callable, Hashable
+
+from aws_xray_sdk.core import xray_recorder
+
+
+# 目的・理由: 合流の有効/無効（切り分け用）
+# 影響範囲: タスク一覧取得API、タスク詳細取得API
+# 前提条件・制約: 環境変数TASK_SINGLE_FLIGHT_ENABLEDがfalseの場合は無効
+TASK_SINGLE_FLIGHT_ENABLED = os.getenv("TASK_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+
+
+class _LeaderCancelled(Exception):
+    """先行呼び出しのリクエストがキャンセル・期限切れになった（待機側は自分で実行し直す）"""
+
+
+def flight_key(*parts: Any) -> Hashable:
+    """
+    合流キーの生成
+
+    目的・理由:
+    - パラメータに含まれるリスト（複数ステータス等）をタプルにし、辞書キーにできる形に正規化する
+    """
+    return tuple(tuple(part) if isinstance(part, list) else part for part in parts)
+
+
+class SingleFlight:
+    """
+    キー単位の実行中呼び出しの合流
+
+    目的・理由:
+    - 最初の呼び出し（先行）だけが処理を実行し、同じキーの後続（待機）は先行の結果・例外を受け取る
+    - 先行のリクエストがキャンセル・期限切れ（asyncio.TimeoutError）になった場合、待機側は先行を引き継いで実行し直す
+      （期限はリクエストごとに異なるため、短い期限の先行の失敗を待機側に共有しない）
+
+    影響範囲:
+    - タスク一覧取得API、タスク詳細取得API
+    """
+
+    def __init__(self, enabled: bool) -> None:
+        self.enabled = enabled
+        self._flights: dict[Hashable, tuple["asyncio.Future[Any]", list[int]]] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+        self.max_waiters = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> tuple[Any, bool]:
+        """
+        合流付き実行
+
+        目的・理由:
+        - 実行中の同一キーがあればその結果を待ち、なければ自分で実行する
+
+        前提条件・制約:
+        - 戻り値は (結果, 他の呼び出しの結果を共有したか)
+        - 結果は待機側と共有されるため、呼び出し側で変更しないこと
+        """
+        self.calls += 1
+        if not self.enabled:
+            self.executions += 1
+            return await func(), False
+
+        while key in self._flights:
+            future, waiters = self._flights[key]
+            waiters[0] += 1
+            self.max_waiters = max(self.max_waiters, waiters[0])
+            try:
+                result = await asyncio.shield(future)
+            except _LeaderCancelled:
+                continue
+            self.coalesced += 1
+            return result, True
+
+        future = asyncio.get_running_loop().create_future()
+        self._flights[key] = (future, [0])
+        self.executions += 1
+        try:
+            result = await func()
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            future.set_exception(_LeaderCancelled())
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            if self._flights.get(key, (None,))[0] is future:
+                del self._flights[key]
+            # 待機側がいない場合の "exception was never retrieved" 警告を抑止
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    def forget(self) -> None:
+        """
+        実行中の呼び出しとの合流の打ち切り
+
+        目的・理由:
+        - 書き込みのコミット後に開始した読み取りが、それ以前に開始した読み取りの結果を受け取らないようにする
+        - 既に待機している呼び出しは先行の結果を受け取る（書き込み完了前に開始しているため）
+        """
+        self._flights.clear()
+
+    def stats(self) -> dict[str, Any]:
+        """
+        統計情報
+
+        目的・理由:
+        - 合流率（DB呼び出しを省略できた割合）を内部エンドポイントで確認する
+        """
+        return {
+            "enabled": self.enabled,
+            "in_flight": len(self._flights),
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "coalesce_ratio": self.coalesced / self.calls if self.calls else 0.0,
+            "max_waiters": self.max_waiters,
+        }
+
+
+# グローバルインスタンス（タスクの読み取り用）
+read_flight = SingleFlight(TASK_SINGLE_FLIGHT_ENABLED)
+
+
+def record_flight_result(shared: bool) -> None:
+    """
+    合流結果のX-Ray記録
+
+    目的・理由:
+    - リクエストセグメントに合流したか（coalesced）、自分で実行したか（leader）をアノテーション
+      （合流したリクエストにはPostgreSQLサブセグメントがない理由をトレース上で判別する）
+
+    前提条件・制約:
+    - セグメントがない場合（X-Rayミドルウェア外）は何もしない
+    """
+    segment = xray_recorder.current_segment()
+    if segment is None:
+        return
+    segment.put_annotation("single_flight", "coalesced" if shared else "leader")
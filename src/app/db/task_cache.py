@@ -0,0 +1,321 @@
+"""
+タスク単体キャッシュ（プロセス内LRU + TTL、LISTEN/NOTIFYによるレプリカ間無効化）
+
+目的・理由:
+- GET /tasks/{id} の読み取りは少数のホットなタスクに集中するため、
+  プロセス内キャッシュでDB往復を削減する
+- 更新/削除時はローカルで即時無効化し、PostgreSQLのNOTIFYで他のECSタスクにも無効化を伝える
+- TTLにより、NOTIFYの取りこぼし（リスナー再接続中など）があっても鮮度の上限を保証する
+
+影響範囲:
+- タスク詳細取得API（読み取り）
+- タスク更新/削除API、一括更新/削除API（無効化）
+- PostgreSQL（LISTEN専用接続を1本使用）
+
+前提条件・制約:
+- キャッシュはプロセス単位。レプリカ間の不整合はNOTIFY遅延（通常ミリ秒）かTTLまで
+- 一括操作は対象IDを列挙せず、全エントリの無効化（ペイロード"*"）を通知する
+"""
+
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Optional
+
+import asyncpg
+from aws_xray_sdk.core import xray_recorder
+
+
+# 目的・理由: NOTIFYチャネル名（全レプリカで共通）
+INVALIDATION_CHANNEL = "task_cache_invalidation"
+
+# 目的・理由: 全エントリ無効化を表すペイロード
+INVALIDATE_ALL = "*"
+
+# 目的・理由: キャッシュサイズと鮮度の上限
+# 影響範囲: タスク詳細取得API
+# 前提条件・制約: 環境変数TASK_CACHE_MAX_ENTRIES / TASK_CACHE_TTL_SECONDSで変更可能（0で無効）
+TASK_CACHE_MAX_ENTRIES = int(os.getenv("TASK_CACHE_MAX_ENTRIES", "1024"))
+TASK_CACHE_TTL_SECONDS = float(os.getenv("TASK_CACHE_TTL_SECONDS", "30"))
+
+# 目的・理由: 直近に無効化（更新/削除）されたIDを保持する期間（秒）
+# 影響範囲: リードレプリカへの振り分け（直近に更新されたタスクはプライマリから読む）
+# 前提条件・制約: DATABASE_READ_MAX_LAG_SECONDS以上であること
+RECENT_INVALIDATION_SECONDS = 60.0
+
+
+class TaskCache:
+    """
+    LRU + TTLキャッシュ
+
+    目的・理由:
+    - 上限件数を超えた場合は最も使われていないエントリから追い出す
+    - 読み込み中に無効化が発生した場合、古い値を格納しないよう世代番号で判定する
+
+    影響範囲:
+    - タスク詳細取得API
+
+    前提条件・制約:
+    - asyncioの単一スレッド上で使用すること（ロック不要）
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[uuid.UUID, tuple[Any, float]]" = OrderedDict()
+        self._generation = 0
+        self._recent_invalidations: "OrderedDict[uuid.UUID, float]" = OrderedDict()
+        self._invalidated_all_at = float("-inf")
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.ttl_seconds > 0
+
+    def get(self, task_id: uuid.UUID) -> Optional[Any]:
+        """
+        キャッシュ参照
+
+        目的・理由:
+        - TTL内のエントリを返し、LRU順を更新する
+        - 期限切れは削除してミス扱い
+        """
+        entry = self._entries.get(task_id)
+        if entry is None or time.monotonic() - entry[1] >= self.ttl_seconds:
+            if entry is not None:
+                del self._entries[task_id]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(task_id)
+        self.hits += 1
+        return entry[0]
+
+    def generation(self) -> int:
+        """
+        現在の世代番号
+
+        目的・理由:
+        - DB読み込み前に取得し、put()時に比較する（読み込み中の無効化を検出）
+        """
+        return self._generation
+
+    def put(self, task_id: uuid.UUID, value: Any, generation: int) -> None:
+        """
+        キャッシュ格納
+
+        目的・理由:
+        - 読み込み開始後に無効化があった場合は格納しない（古い値の再格納を防ぐ）
+        - 上限超過時はLRUで追い出す
+        """
+        if not self.enabled or generation != self._generation:
+            return
+
+        self._entries[task_id] = (value, time.monotonic())
+        self._entries.move_to_end(task_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, task_id: Optional[uuid.UUID] = None) -> None:
+        """
+        無効化
+
+        目的・理由:
+        - task_id指定時はそのエントリのみ、未指定時は全エントリを削除
+        - 世代番号を進め、読み込み中の古い値が格納されないようにする
+        """
+        self._generation += 1
+        self.invalidations += 1
+        now = time.monotonic()
+        if task_id is None:
+            self._entries.clear()
+            self._invalidated_all_at = now
+        else:
+            self._entries.pop(task_id, None)
+            self._recent_invalidations[task_id] = now
+            self._recent_invalidations.move_to_end(task_id)
+        while self._recent_invalidations:
+            oldest_id, invalidated_at = next(iter(self._recent_invalidations.items()))
+            if now - invalidated_at < RECENT_INVALIDATION_SECONDS:
+                break
+            del self._recent_invalidations[oldest_id]
+
+    def recently_invalidated(self, task_id: uuid.UUID, within_seconds: float) -> bool:
+        """
+        直近の無効化の有無
+
+        目的・理由:
+        - 更新/削除から within_seconds 以内のタスクを判定し、遅延のあるレプリカから
+          更新前の行を読んでキャッシュに格納することを防ぐ（他レプリカの更新もNOTIFYで反映）
+
+        前提条件・制約:
+        - within_secondsはRECENT_INVALIDATION_SECONDS以下であること
+        - 全件無効化（一括操作、LISTEN再接続）は全IDの無効化として扱う
+        """
+        now = time.monotonic()
+        if now - self._invalidated_all_at < within_seconds:
+            return True
+        invalidated_at = self._recent_invalidations.get(task_id)
+        return invalidated_at is not None and now - invalidated_at < within_seconds
+
+    def stats(self) -> dict[str, Any]:
+        """
+        統計情報
+
+        目的・理由:
+        - ヒット率・追い出し回数を内部エンドポイントとX-Rayで確認する
+        """
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# グローバルキャッシュ
+task_cache = TaskCache(TASK_CACHE_MAX_ENTRIES, TASK_CACHE_TTL_SECONDS)
+
+# LISTEN専用接続と再接続タスク
+_listener_conn: Optional[asyncpg.Connection] = None
+_listener_task: Optional["asyncio.Task[None]"] = None
+
+
+def record_cache_result(result: str) -> None:
+    """
+    キャッシュ結果のX-Ray記録
+
+    目的・理由:
+    - リクエストセグメントにhit/missをアノテーション、カウンタをメタデータとして記録
+
+    影響範囲:
+    - X-Rayトレース
+
+    前提条件・制約:
+    - セグメントがない場合（X-Rayミドルウェア外）は何もしない
+    """
+    segment = xray_recorder.current_segment()
+    if segment is None:
+        return
+    segment.put_annotation("task_cache", result)
+    segment.put_annotation("task_cache_hits", task_cache.hits)
+    segment.put_annotation("task_cache_misses", task_cache.misses)
+    segment.put_annotation("task_cache_evictions", task_cache.evictions)
+
+
+async def publish_invalidation(conn: asyncpg.Connection, task_id: Optional[uuid.UUID] = None) -> None:
+    """
+    無効化の通知
+
+    目的・理由:
+    - 自プロセスのキャッシュを即時無効化し、NOTIFYで他レプリカへ伝える
+    - 書き込みと同じ接続で送るため、トランザクション内ならコミット時に配信される
+
+    影響範囲:
+    - 全レプリカのタスクキャッシュ
+
+    前提条件・制約:
+    - task_id未指定時は全エントリ無効化
+    """
+    task_cache.invalidate(task_id)
+    payload = INVALIDATE_ALL if task_id is None else str(task_id)
+    await conn.execute("SELECT pg_notify($1, $2)", INVALIDATION_CHANNEL, payload)
+
+
+def _on_notification(conn: Any, pid: int, channel: str, payload: str) -> None:
+    """NOTIFY受信時のコールバック（他レプリカ・自プロセスの書き込み）"""
+    if payload == INVALIDATE_ALL:
+        task_cache.invalidate()
+        return
+    try:
+        task_cache.invalidate(uuid.UUID(payload))
+    except ValueError:
+        task_cache.invalidate()
+
+
+async def _listen_forever(database_url: str) -> None:
+    """
+    LISTEN接続の維持
+
+    目的・理由:
+    - 専用接続でLISTENし、切断時は再接続する
+    - 切断中は通知を取りこぼすため、再接続時に全エントリを無効化する
+
+    前提条件・制約:
+    - stop_invalidation_listener()でキャンセルされるまで動作
+    """
+    global _listener_conn
+
+    backoff = 1.0
+    while True:
+        try:
+            _listener_conn = await asyncpg.connect(database_url)
+            await _listener_conn.add_listener(INVALIDATION_CHANNEL, _on_notification)
+            task_cache.invalidate()
+            backoff = 1.0
+
+            closed = asyncio.get_running_loop().create_future()
+            _listener_conn.add_termination_listener(lambda _: closed.done() or closed.set_result(None))
+            await closed
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Task cache listener error: {e}")
+
+        # 切断中の通知取りこぼしに備えて無効化し、再接続
+        task_cache.invalidate()
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 30.0)
+
+
+async def start_invalidation_listener(database_url: str) -> None:
+    """
+    無効化リスナー起動
+
+    目的・理由:
+    - アプリケーション起動時にLISTEN専用接続を張る
+
+    影響範囲:
+    - PostgreSQL（接続1本）
+
+    前提条件・制約:
+    - キャッシュ無効（TASK_CACHE_MAX_ENTRIES=0等）の場合は起動しない
+    """
+    global _listener_task
+
+    if not task_cache.enabled or _listener_task is not None:
+        return
+    _listener_task = asyncio.create_task(_listen_forever(database_url))
+
+
+async def stop_invalidation_listener() -> None:
+    """
+    無効化リスナー停止
+
+    目的・理由:
+    - アプリケーション終了時にLISTEN接続を閉じる
+    """
+    global _listener_task, _listener_conn
+
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+
+    if _listener_conn is not None and not _listener_conn.is_closed():
+        await _listener_conn.close()
+    _listener_conn = None
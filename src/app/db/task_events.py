@@ -0,0 +1,303 @@
+"""
+タスク変更イベントの配信（LISTEN/NOTIFY → SSE購読者へのファンアウト）
+
+目的・理由:
+- クライアントはGET /tasksのポーリングで変更を検知しており、読み取り負荷の大半を占める
+- 作成/更新/削除時にNOTIFYでイベントを送り、プロセスごとに1本のLISTEN接続で受信して
+  GET /tasks/stream（Server-Sent Events）の購読者へ配る
+- 購読者ごとに上限付きのバッファを持ち、読み取りが追いつかない購読者は切断する
+  （遅い購読者のためにメモリが増え続けることを防ぐ）
+
+影響範囲:
+- タスク作成/更新/削除API、一括操作API（NOTIFY送信）
+- タスク変更ストリームAPI（購読）
+- PostgreSQL（LISTEN専用接続を1本使用）
+
+前提条件・制約:
+- イベントはプロセス内の連番（SSEのid）で配信し、再接続時の再送（Last-Event-ID）には対応しない
+- LISTEN接続の切断中に送られたイベントは失われるため、再接続時に全購読者へresyncを送る
+- 一括操作は対象行を列挙せず、件数のみのイベントを1件送る
+- NOTIFYのペイロード上限（8000バイト）に収まるよう、イベントにはタスク1件分の列のみ含める
+"""
+
+import asyncio
+import json
+import os
+from typing import Any, Optional
+
+import asyncpg
+
+from api.serialization import dumps, task_dict
+
+
+# 目的・理由: NOTIFYチャネル名（全レプリカで共通）
+EVENTS_CHANNEL = "task_events"
+
+# 目的・理由: 購読者ごとのバッファ上限（イベント数）。超えた購読者は切断する
+# 影響範囲: /tasks/stream
+# 前提条件・制約: 環境変数TASK_STREAM_BUFFER_SIZEで変更可能
+TASK_STREAM_BUFFER_SIZE = int(os.getenv("TASK_STREAM_BUFFER_SIZE", "256"))
+
+# 目的・理由: プロセスあたりの同時購読者数の上限（超えた場合は503）
+# 影響範囲: /tasks/stream
+# 前提条件・制約: 環境変数TASK_STREAM_MAX_SUBSCRIBERSで変更可能
+TASK_STREAM_MAX_SUBSCRIBERS = int(os.getenv("TASK_STREAM_MAX_SUBSCRIBERS", "5000"))
+
+# 目的・理由: イベントがない間のコメント送信間隔（ALBのアイドルタイムアウト・切断検知のため）
+# 影響範囲: /tasks/stream
+# 前提条件・制約: 環境変数TASK_STREAM_HEARTBEAT_SECONDSで変更可能（ALBのアイドルタイムアウト60秒未満）
+TASK_STREAM_HEARTBEAT_SECONDS = float(os.getenv("TASK_STREAM_HEARTBEAT_SECONDS", "15"))
+
+# 目的・理由: イベント配信の有効/無効
+# 影響範囲: NOTIFY送信、LISTEN接続、/tasks/stream
+# 前提条件・制約: 環境変数TASK_EVENTS_ENABLEDがfalseの場合はNOTIFYを送らず、LISTEN接続も張らない
+TASK_EVENTS_ENABLED = os.getenv("TASK_EVENTS_ENABLED", "true").lower() == "true"
+
+
+class Subscriber:
+    """
+    購読者（SSE接続1本）
+
+    目的・理由:
+    - 上限付きキューにエンコード済みのSSEフレームを受け取る
+    - statuses指定時は、変更前後のステータスのいずれかが一致するイベントのみ受け取る
+      （フィルター外へ移動したタスクも検知できるようにする）
+
+    前提条件・制約:
+    - droppedがTrueになったら送信を打ち切ること（バッファ溢れ）
+    """
+
+    def __init__(self, statuses: Optional[frozenset[str]], buffer_size: int) -> None:
+        self.statuses = statuses
+        self.queue: "asyncio.Queue[bytes]" = asyncio.Queue(maxsize=buffer_size)
+        self.dropped = False
+
+    def accepts(self, event_statuses: tuple[Optional[str], ...]) -> bool:
+        """フィルター判定（ステータスを持たないイベントは全購読者へ配る）"""
+        if self.statuses is None or not any(event_statuses):
+            return True
+        return any(value in self.statuses for value in event_statuses)
+
+
+class TaskEventHub:
+    """
+    プロセス内のイベントファンアウト
+
+    目的・理由:
+    - 受信したイベントをSSEフレームに1回だけエンコードし、全購読者で同じbytesを共有する
+    - キューが満杯の購読者は待たずに切断扱いにする（配信側は購読者を待たない）
+
+    影響範囲:
+    - タスク変更ストリームAPI
+
+    前提条件・制約:
+    - asyncioの単一スレッド上で使用すること（ロック不要）
+    """
+
+    def __init__(self, buffer_size: int, max_subscribers: int) -> None:
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers: set[Subscriber] = set()
+        self._sequence = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def subscribe(self, statuses: Optional[frozenset[str]]) -> Optional[Subscriber]:
+        """購読開始（上限到達時はNone）"""
+        if len(self._subscribers) >= self.max_subscribers:
+            return None
+        subscriber = Subscriber(statuses, self.buffer_size)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """購読終了"""
+        self._subscribers.discard(subscriber)
+
+    def publish(self, event: str, data: str, event_statuses: tuple[Optional[str], ...] = ()) -> None:
+        """
+        イベント配信
+
+        目的・理由:
+        - SSEフレーム（event/id/data）を生成し、フィルターに一致する購読者のキューへ入れる
+        - キューが満杯の購読者はdroppedにして購読者一覧から外す
+        """
+        self._sequence += 1
+        self.published += 1
+        frame = f"event: {event}\nid: {self._sequence}\ndata: {data}\n\n".encode("utf-8")
+        for subscriber in list(self._subscribers):
+            if not subscriber.accepts(event_statuses):
+                continue
+            try:
+                subscriber.queue.put_nowait(frame)
+                self.delivered += 1
+            except asyncio.QueueFull:
+                subscriber.dropped = True
+                self._subscribers.discard(subscriber)
+                self.dropped += 1
+
+    def stats(self) -> dict[str, Any]:
+        """
+        統計情報
+
+        目的・理由:
+        - 購読者数・配信数・切断数（バッファ溢れ）を内部エンドポイントで確認する
+        """
+        return {
+            "enabled": TASK_EVENTS_ENABLED,
+            "listening": _listener_conn is not None and not _listener_conn.is_closed(),
+            "subscribers": len(self._subscribers),
+            "max_subscribers": self.max_subscribers,
+            "buffer_size": self.buffer_size,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped_subscribers": self.dropped,
+        }
+
+
+# グローバルハブ
+event_hub = TaskEventHub(TASK_STREAM_BUFFER_SIZE, TASK_STREAM_MAX_SUBSCRIBERS)
+
+# LISTEN専用接続と再接続タスク
+_listener_conn: Optional[asyncpg.Connection] = None
+_listener_task: Optional["asyncio.Task[None]"] = None
+
+
+async def publish_task_event(
+    conn: asyncpg.Connection,
+    operation: str,
+    row: Any = None,
+    previous_status: Optional[str] = None,
+    count: Optional[int] = None,
+) -> None:
+    """
+    変更イベントの送信
+
+    目的・理由:
+    - 書き込みと同じ接続でNOTIFYを送り、全レプリカのLISTEN接続（自プロセスを含む）へ届ける
+
+    影響範囲:
+    - 全レプリカのタスク変更ストリーム購読者
+
+    前提条件・制約:
+    - operationはcreated/updated/deleted（rowはタスク1行、削除時はid・statusのみでも可）、
+      またはbulk_created/bulk_updated/bulk_deleted（countのみ）
+    - トランザクション内ならコミット時に配信される
+    """
+    if not TASK_EVENTS_ENABLED:
+        return
+    event: dict[str, Any] = {"op": operation}
+    if row is not None:
+        event["task"] = task_dict(row) if operation != "deleted" else {"id": row["id"], "status": row["status"]}
+    if previous_status is not None:
+        event["previous_status"] = previous_status
+    if count is not None:
+        event["count"] = count
+    await conn.execute("SELECT pg_notify($1, $2)", EVENTS_CHANNEL, dumps(event).decode("utf-8"))
+
+
+async def publish_task_events(conn: asyncpg.Connection, operation: str, rows: list) -> None:
+    """
+    変更イベントの一括送信
+
+    目的・理由:
+    - 複数行の書き込み（グループコミット）で、行ごとのイベントを1文のpg_notifyで送る（往復1回）
+
+    前提条件・制約:
+    - operationはcreated/updated（rowsはタスクの行）
+    """
+    if not TASK_EVENTS_ENABLED or not rows:
+        return
+    payloads = [dumps({"op": operation, "task": task_dict(row)}).decode("utf-8") for row in rows]
+    await conn.execute("SELECT pg_notify($1, payload) FROM unnest($2::text[]) AS payload", EVENTS_CHANNEL, payloads)
+
+
+def _on_notification(conn: Any, pid: int, channel: str, payload: str) -> None:
+    """NOTIFY受信時のコールバック（ペイロードをそのままSSEのdataとして配る）"""
+    try:
+        event = json.loads(payload)
+        operation = event["op"]
+    except (ValueError, KeyError, TypeError):
+        print(f"⚠️ Invalid task event payload: {payload[:200]}")
+        return
+    task = event.get("task") or {}
+    event_hub.publish(operation, payload, (task.get("status"), event.get("previous_status")))
+
+
+async def _listen_forever(database_url: str) -> None:
+    """
+    LISTEN接続の維持
+
+    目的・理由:
+    - 専用接続でLISTENし、切断時は再接続する
+    - 切断中のイベントは失われるため、再接続時に全購読者へresyncを送る（一覧の再取得を促す）
+
+    前提条件・制約:
+    - stop_event_listener()でキャンセルされるまで動作
+    """
+    global _listener_conn
+
+    backoff = 1.0
+    connected_once = False
+    while True:
+        try:
+            _listener_conn = await asyncpg.connect(database_url)
+            await _listener_conn.add_listener(EVENTS_CHANNEL, _on_notification)
+            if connected_once:
+                event_hub.publish("resync", '{"op":"resync"}')
+            connected_once = True
+            backoff = 1.0
+
+            closed = asyncio.get_running_loop().create_future()
+            _listener_conn.add_termination_listener(lambda _: closed.done() or closed.set_result(None))
+            await closed
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Task event listener error: {e}")
+
+        await asyncio.sleep(backoff)
+        backoff = min(backoff * 2, 30.0)
+
+
+async def start_event_listener(database_url: str) -> None:
+    """
+    イベントリスナー起動
+
+    目的・理由:
+    - アプリケーション起動時にLISTEN専用接続を張る（購読者数によらず1本）
+
+    影響範囲:
+    - PostgreSQL（接続1本）
+
+    前提条件・制約:
+    - TASK_EVENTS_ENABLED=falseの場合は起動しない
+    """
+    global _listener_task
+
+    if not TASK_EVENTS_ENABLED or _listener_task is not None:
+        return
+    _listener_task = asyncio.create_task(_listen_forever(database_url))
+
+
+async def stop_event_listener() -> None:
+    """
+    イベントリスナー停止
+
+    目的・理由:
+    - アプリケーション終了時にLISTEN接続を閉じる
+    """
+    global _listener_task, _listener_conn
+
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
+
+    if _listener_conn is not None and not _listener_conn.is_closed():
+        await _listener_conn.close()
+    _listener_conn = None
@@ -0,0 +1,690 @@
+"""
+タスクリポジトリ（クエリ定義とプリペアドステートメント管理）
+
+目的・理由:
+- タスクに対するSQLをこのモジュールに集約し、エンドポイントごとのSQL文字列の重複をなくす
+- UPDATEの項目の組み合わせや一覧取得のフィルター形状は有限のため、起動時にすべての
+  SQLを確定（コンパイル）しておき、リクエストごとのf-string組み立てをなくす
+- 接続プールのinitフックで、接続ごとに一度だけPREPAREする（以降はBind/Executeのみ、
+  リクエストごとのParse・計画作成を省略）
+- ステートメント単位の実行回数・エラー回数・所要時間を集計し、内部APIで確認できるようにする
+
+影響範囲:
+- タスクCRUD/一覧/エクスポートAPI、件数取得（counts）、冪等キー（idempotency）
+- PostgreSQL（接続ごとにプリペアドステートメントを保持）
+
+前提条件・制約:
+- 接続プールはconnection_class=TaskConnection、init=prepare_task_statementsで作成すること
+  （それ以外の接続では、通常のクエリ実行にフォールバックする）
+- 起動直後でtasksテーブルが未作成の場合、PREPAREは初回実行時まで遅延する
+- 一括更新/削除（bulk）のSQLは更新列 × 対象指定（ids/条件の組み合わせ）の形状を初回使用時に確定・登録する
+- 一覧取得の複数条件・並び順・省略列の組み合わせは多いため、既定の並び順・全列の形状のみ起動時に確定・PREPAREし、
+  それ以外は初回使用時にSQLを確定してasyncpgの文キャッシュ（LRU）に任せる
+  （接続ごとのPREPAREを少なく保ち、接続プールの拡張・接続の入れ替え時の接続確立を遅くしない）
+"""
+
+import re
+import time
+from itertools import combinations
+from typing import Any, Iterable, Optional
+
+import asyncpg
+
+from api.pagination import build_seek_condition
+from middleware.deadline import statement_timeout
+
+
+# 目的・理由: SELECT * を使わず列を固定する（列追加時にプリペアドステートメントの結果型が変わらない）
+TASK_COLUMNS = ("id", "title", "description", "status", "created_at", "updated_at", "version")
+_SELECT_COLUMNS = ", ".join(TASK_COLUMNS)
+
+# 目的・理由: 部分更新可能な列（UPDATEバリアントの生成順序もこの順）
+UPDATABLE_FIELDS = ("title", "description", "status")
+
+# 目的・理由: 一覧取得で常に取得する列（カーソル生成とETag計算に必要）
+# 前提条件・制約: これ以外の列（title/description/status）はfields指定で省略できる（並び順の列を除く）
+LIST_KEY_COLUMNS = ("id", "created_at", "updated_at")
+
+# 目的・理由: 一覧取得の並び順（"-"付きは降順）→ (列, 降順か)。同順位はidで並べる
+LIST_SORTS = {
+    "-created_at": ("created_at", True),
+    "created_at": ("created_at", False),
+    "-updated_at": ("updated_at", True),
+    "updated_at": ("updated_at", False),
+    "title": ("title", False),
+    "-title": ("title", True),
+}
+DEFAULT_LIST_SORT = "-created_at"
+
+# 目的・理由: 日時の範囲条件（fromは以上、toは未満）。タプルの順序がパラメータ順
+RANGE_FILTERS = {
+    "created_from": "created_at >=",
+    "created_to": "created_at <",
+    "updated_from": "updated_at >=",
+    "updated_to": "updated_at <",
+}
+
+# 目的・理由: 一括更新/削除の対象条件（BulkTaskFilterの項目）→ SQLの条件。辞書の順序がパラメータ順
+BULK_FILTERS = {
+    "status": "status =",
+    "created_from": "created_at >=",
+    "created_to": "created_at <",
+}
+
+# 目的・理由: 一覧取得の並び順ごとの複合インデックス
+# - キーは (status,) + 並び順の列 + id で、ステータス指定・並び順・キーセットを1回の範囲スキャンで処理する
+# - INCLUDEでdescription以外の列を持たせ、fields指定（descriptionなし）の一覧をIndex Only Scanにする
+# 前提条件・制約: 名前の"tasks"はlist_index_ddl()でテーブル名に置き換える
+LIST_INDEXES = (
+    ("idx_tasks_created_at_id", "(created_at DESC, id DESC) INCLUDE (title, status, updated_at)"),
+    ("idx_tasks_status_created_at_id", "(status, created_at DESC, id DESC) INCLUDE (title, updated_at)"),
+    ("idx_tasks_updated_at_id", "(updated_at DESC, id DESC) INCLUDE (title, status, created_at)"),
+    ("idx_tasks_status_updated_at_id", "(status, updated_at DESC, id DESC) INCLUDE (title, created_at)"),
+    ("idx_tasks_title_id", "(title, id) INCLUDE (status, created_at, updated_at)"),
+    ("idx_tasks_status_title_id", "(status, title, id) INCLUDE (created_at, updated_at)"),
+)
+
+# 目的・理由: 全文検索（tsvector生成列）と誤字に強いタイトル検索（pg_trgm）のGINインデックス
+SEARCH_INDEXES = (
+    ("idx_tasks_search_vector", "USING GIN (search_vector)"),
+    ("idx_tasks_title_trgm", "USING GIN (title gin_trgm_ops)"),
+)
+
+# 目的・理由: LIST_INDEXESで置き換えられた単一列インデックス（書き込みコスト削減のため削除する）
+SUPERSEDED_INDEXES = ("idx_tasks_status", "idx_tasks_created_at")
+
+
+def list_index_ddl(table: str = "tasks") -> list[str]:
+    """
+    一覧取得用インデックスのDDL
+
+    前提条件・制約:
+    - tableはベンチマーク・EXPLAIN検証用（同じ列を持つテーブル）
+    """
+    return [
+        f"CREATE INDEX IF NOT EXISTS {name.replace('tasks', table, 1)} ON {table} {definition}"
+        for name, definition in LIST_INDEXES
+    ]
+
+
+# 目的・理由: 全文検索の設定（語幹処理をしないsimple。日本語は分かち書きせず、記号・空白区切りの語として扱う）
+# 前提条件・制約: tasks.search_vectorの生成式と一致させること
+SEARCH_CONFIG = "simple"
+
+
+def list_columns(fields: Optional[Iterable[str]], sort: str = DEFAULT_LIST_SORT) -> tuple[str, ...]:
+    """
+    一覧取得で取得する列
+
+    目的・理由:
+    - fields指定（疎なフィールドセット）をSQLの射影に反映する
+    - 列順はTASK_COLUMNSに揃え、同じ組み合わせが同じクエリ名になるようにする
+
+    前提条件・制約:
+    - 並び順の列はカーソル生成のため常に含める
+    """
+    if fields is None:
+        return TASK_COLUMNS
+    wanted = set(fields).union(LIST_KEY_COLUMNS, (LIST_SORTS[sort][0],))
+    return tuple(column for column in TASK_COLUMNS if column in wanted)
+
+
+def _filter_suffix(status_count: int, ranges: tuple[str, ...]) -> str:
+    """クエリ名の条件部分（ステータス1件/複数件、範囲条件）"""
+    suffix = "" if not status_count else ("_status" if status_count == 1 else "_statuses")
+    return suffix + "".join(f"_{name}" for name in ranges)
+
+
+def _list_name(
+    has_cursor: bool,
+    columns: tuple[str, ...],
+    status_count: int,
+    ranges: tuple[str, ...],
+    sort: str,
+) -> str:
+    """一覧取得クエリ名（条件 × 並び順 × カーソル/オフセット × 省略列）"""
+    name = "list" + _filter_suffix(status_count, ranges)
+    if sort != DEFAULT_LIST_SORT:
+        column, descending = LIST_SORTS[sort]
+        name += f"_by_{column}_{'desc' if descending else 'asc'}"
+    name += "_cursor" if has_cursor else "_offset"
+    omitted = [column for column in TASK_COLUMNS if column not in columns]
+    if omitted:
+        name += "_without_" + "_".join(omitted)
+    return name
+
+
+def list_query_name(
+    has_cursor: bool,
+    columns: tuple[str, ...] = TASK_COLUMNS,
+    status_count: int = 0,
+    ranges: tuple[str, ...] = (),
+    sort: str = DEFAULT_LIST_SORT,
+) -> str:
+    """
+    一覧取得クエリ名（未登録の形状はSQLを確定して登録）
+
+    前提条件・制約:
+    - status_countは指定されたステータスの件数（0: 指定なし、1: 等価条件、2以上: ANY）
+    - rangesはRANGE_FILTERSのキー（RANGE_FILTERSの順）
+    """
+    status_count = min(status_count, 2)
+    name = _list_name(has_cursor, columns, status_count, ranges, sort)
+    if name not in QUERIES:
+        _register(name, list_sql(has_cursor, columns, status_count, ranges, sort))
+    return name
+
+
+def count_query_name(status_count: int = 0, ranges: tuple[str, ...] = ()) -> str:
+    """件数取得クエリ名（未登録の形状はSQLを確定して登録）"""
+    status_count = min(status_count, 2)
+    name = "count" + _filter_suffix(status_count, ranges)
+    if name not in QUERIES:
+        _register(name, f"SELECT COUNT(*) FROM tasks{filter_clause(status_count, ranges)}")
+    return name
+
+
+def update_query_name(fields: Iterable[str], versioned: bool, compare_version: bool = False) -> str:
+    """UPDATEクエリ名（更新列の組み合わせ × If-Match / expected_versionの有無）"""
+    if compare_version:
+        return "update_" + "_".join(fields) + "_cas"
+    return "update_" + "_".join(fields) + ("_if_match" if versioned else "")
+
+
+def _bulk_target_sql(filters: Optional[tuple[str, ...]], param: int) -> str:
+    """
+    一括更新/削除の対象行を選ぶCTE（batch）のSQL
+
+    目的・理由:
+    - ids指定（filtersがNone）: WHERE id = ANY($n::uuid[]) の1文で全件を対象にする
+    - 条件指定: id順のキーセット（id > $n ... LIMIT $m）でチャンクに分割する
+      （更新後も条件に一致し続ける行を再処理しないよう、id位置で前進する）
+    - FOR UPDATEで対象行をロックし、更新前ステータス（件数キャッシュ用）を取得
+
+    前提条件・制約:
+    - paramは直前までのパラメータ数
+    - パラメータ順: idsの配列 または [条件の値（BULK_FILTERSの順）], 直前のid, チャンクサイズ
+    """
+    if filters is None:
+        return f"SELECT id, status FROM tasks WHERE id = ANY(${param + 1}::uuid[]) FOR UPDATE"
+    conditions = [f"{BULK_FILTERS[name]} ${param + i}" for i, name in enumerate(filters, 1)]
+    param += len(filters)
+    conditions.append(f"id > ${param + 1}")
+    return f"SELECT id, status FROM tasks WHERE {' AND '.join(conditions)} ORDER BY id LIMIT ${param + 2} FOR UPDATE"
+
+
+def _bulk_name(operation: str, filters: Optional[tuple[str, ...]]) -> str:
+    """一括更新/削除クエリ名（操作 × 対象指定）"""
+    return f"bulk_{operation}" + ("_by_ids" if filters is None else "_by_" + "_".join(filters))
+
+
+def bulk_update_query_name(fields: tuple[str, ...], filters: Optional[tuple[str, ...]]) -> str:
+    """
+    一括更新クエリ名（未登録の形状はSQLを確定して登録）
+
+    前提条件・制約:
+    - fieldsは更新列（UPDATABLE_FIELDSの順）、filtersは対象条件（BULK_FILTERSの順。ids指定時はNone）
+    - パラメータ順: 更新列の値, 対象指定（_bulk_target_sql）
+    - RETURNINGは全列と更新前のステータス（previous_status）
+    """
+    name = _bulk_name("update_" + "_".join(fields), filters)
+    if name not in QUERIES:
+        assignments = [f"{field} = ${i}" for i, field in enumerate(fields, 1)]
+        returning = ", ".join(f"tasks.{column}" for column in TASK_COLUMNS)
+        _register(
+            name,
+            f"WITH batch AS ({_bulk_target_sql(filters, len(fields))}) "
+            f"UPDATE tasks SET {', '.join(assignments)}, updated_at = NOW(), version = tasks.version + 1 "
+            f"FROM batch WHERE tasks.id = batch.id "
+            f"RETURNING {returning}, batch.status AS previous_status",
+        )
+    return name
+
+
+def bulk_delete_query_name(filters: Optional[tuple[str, ...]]) -> str:
+    """
+    一括削除クエリ名（未登録の形状はSQLを確定して登録）
+
+    前提条件・制約:
+    - filtersは対象条件（BULK_FILTERSの順。ids指定時はNone）
+    - パラメータ順: 対象指定（_bulk_target_sql）
+    - RETURNINGは全列と削除前のステータス（previous_status）
+    """
+    name = _bulk_name("delete", filters)
+    if name not in QUERIES:
+        returning = ", ".join(f"tasks.{column}" for column in TASK_COLUMNS)
+        _register(
+            name,
+            f"WITH batch AS ({_bulk_target_sql(filters, 0)}) "
+            f"DELETE FROM tasks USING batch WHERE tasks.id = batch.id "
+            f"RETURNING {returning}, batch.status AS previous_status",
+        )
+    return name
+
+
+def search_query_name(has_status: bool, has_cursor: bool) -> str:
+    """検索クエリ名（ステータス指定の有無 × カーソルの有無）"""
+    return "search" + ("_status" if has_status else "") + ("_cursor" if has_cursor else "")
+
+
+def prefix_tsquery(text: str) -> Optional[str]:
+    """
+    検索語から前方一致のtsquery文字列を生成
+
+    目的・理由:
+    - 入力中の語でも一致するよう、各語を前方一致（:*）にしてANDで結合する
+    - 語は英数字・日本語等の単語構成文字のみ取り出すため、tsqueryの構文に影響する記号は含まれない
+
+    前提条件・制約:
+    - 語が1つもない場合はNone
+    """
+    terms = re.findall(r"\w+", text.lower())
+    if not terms:
+        return None
+    return " & ".join(f"'{term}':*" for term in terms)
+
+
+def search_sql(has_status: bool, has_cursor: bool, table: str = "tasks") -> str:
+    """
+    検索SQL
+
+    目的・理由:
+    - search_vector（GINインデックス）の全文一致と、title（pg_trgm GINインデックス）の
+      語類似度一致（<%、誤字に強い）のORで候補を絞る
+    - スコア = ts_rank_cd（全文一致の順位）+ word_similarity（タイトルの類似度）
+    - (score, id) の行値比較でキーセットページネーションする
+
+    前提条件・制約:
+    - パラメータ順: 検索文字列, tsquery文字列, [status], [cursorのscore, cursorのid], limit
+    - tableはベンチマーク用（同じ列・インデックスを持つテーブル）
+    """
+    tsquery = f"to_tsquery('{SEARCH_CONFIG}', $2)"
+    conditions = [f"(search_vector @@ {tsquery} OR $1 <% title)"]
+    param = 2
+    if has_status:
+        param += 1
+        conditions.append(f"status = ${param}")
+    seek = ""
+    if has_cursor:
+        seek = f" WHERE (score, id) < (${param + 1}::float8, ${param + 2}::uuid)"
+        param += 2
+    return (
+        f"SELECT {_SELECT_COLUMNS}, score FROM ("
+        f"SELECT {_SELECT_COLUMNS}, "
+        f"(ts_rank_cd(search_vector, {tsquery}) + word_similarity($1, title))::float8 AS score "
+        f"FROM {table} WHERE {' AND '.join(conditions)}"
+        f") AS ranked{seek} ORDER BY score DESC, id DESC LIMIT ${param + 1}"
+    )
+
+
+def _filter_conditions(status_count: int, ranges: tuple[str, ...]) -> list[str]:
+    """
+    絞り込み条件
+
+    前提条件・制約:
+    - パラメータ順: [status（複数件の場合は配列）], [範囲条件の値（RANGE_FILTERSの順）]
+    """
+    conditions = []
+    if status_count == 1:
+        conditions.append("status = $1")
+    elif status_count > 1:
+        conditions.append("status = ANY($1::text[])")
+    for name in ranges:
+        conditions.append(f"{RANGE_FILTERS[name]} ${len(conditions) + 1}")
+    return conditions
+
+
+def filter_clause(status_count: int, ranges: tuple[str, ...]) -> str:
+    """
+    絞り込み条件のWHERE句（件数取得・件数推定用）
+
+    前提条件・制約:
+    - 条件がない場合は空文字列
+    """
+    conditions = _filter_conditions(min(status_count, 2), ranges)
+    return f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+
+def list_sql(
+    has_cursor: bool,
+    columns: tuple[str, ...] = TASK_COLUMNS,
+    status_count: int = 0,
+    ranges: tuple[str, ...] = (),
+    sort: str = DEFAULT_LIST_SORT,
+    table: str = "tasks",
+) -> str:
+    """
+    一覧取得SQL
+
+    目的・理由:
+    - ORDER BY（並び順の列, id）をLIST_INDEXESのキー順と一致させ、ソートなしの範囲スキャンにする
+
+    前提条件・制約:
+    - パラメータ順: [status], [範囲条件], [cursorの並び順の値, cursorのid], limit, [offset]
+    - tableはEXPLAIN検証用（同じ列・インデックスを持つテーブル）
+    """
+    conditions = _filter_conditions(status_count, ranges)
+    param = len(conditions)
+    column, descending = LIST_SORTS[sort]
+    if has_cursor:
+        conditions.append(build_seek_condition(param + 1, param + 2, column, descending))
+        param += 2
+    where_clause = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+    direction = "DESC" if descending else "ASC"
+    sql = (
+        f"SELECT {', '.join(columns)} FROM {table}{where_clause} "
+        f"ORDER BY {column} {direction}, id {direction} LIMIT ${param + 1}"
+    )
+    if not has_cursor:
+        sql += f" OFFSET ${param + 2}"
+    return sql
+
+
+def _update_sql(fields: tuple[str, ...], versioned: bool) -> str:
+    """
+    UPDATE SQL
+
+    目的・理由:
+    - 更新前のステータス（件数キャッシュ用）を同じ往復で取得する
+    - versioned=Trueの場合、更新前のupdated_atがIf-Matchの値と一致する行のみ対象にする
+
+    前提条件・制約:
+    - パラメータ順: 更新列の値（UPDATABLE_FIELDS順）, id, [updated_atの配列]
+    """
+    assignments = [f"{field} = ${i}" for i, field in enumerate(fields, 1)]
+    id_param = len(fields) + 1
+    version_condition = f" AND updated_at = ANY(${id_param + 1}::timestamptz[])" if versioned else ""
+    returning = ", ".join(f"tasks.{column}" for column in TASK_COLUMNS)
+    return (
+        f"WITH previous AS (SELECT id, status FROM tasks WHERE id = ${id_param}{version_condition} FOR UPDATE) "
+        f"UPDATE tasks SET {', '.join(assignments)}, updated_at = NOW(), version = tasks.version + 1 "
+        f"FROM previous WHERE tasks.id = previous.id "
+        f"RETURNING {returning}, previous.status AS previous_status"
+    )
+
+
+def _compare_and_swap_sql(fields: tuple[str, ...]) -> str:
+    """
+    バージョン比較付きUPDATE SQL（compare-and-swap）
+
+    目的・理由:
+    - WHERE id = ? AND version = ? の1文で比較と更新を行い、事前のSELECT ... FOR UPDATEで書き込みを直列化しない
+    - 不一致（他の更新が先に反映済み）の場合は、同じ往復で現在の行を返す（appliedがFALSEの行）
+
+    前提条件・制約:
+    - パラメータ順: 更新列の値（UPDATABLE_FIELDS順）, id, 期待するversion
+    - 戻り値は0行（行が存在しない）または1行（applied = TRUEなら更新後の行とprevious_status）
+    - 現在の行はFOR SHAREで読む（更新中のトランザクションがあれば、そのコミット後の行を返す）
+    - 更新前のステータスはversionが一致した行のもの（すべての更新でversionが増えるため、比較成功時は同じ行）
+    """
+    assignments = [f"{field} = ${i}" for i, field in enumerate(fields, 1)]
+    id_param = len(fields) + 1
+    version_param = id_param + 1
+    returning = ", ".join(f"tasks.{column}" for column in TASK_COLUMNS)
+    return (
+        f"WITH previous AS (SELECT id, status FROM tasks WHERE id = ${id_param} AND version = ${version_param}), "
+        f"updated AS (UPDATE tasks SET {', '.join(assignments)}, updated_at = NOW(), version = tasks.version + 1 "
+        f"FROM previous WHERE tasks.id = previous.id AND tasks.version = ${version_param} "
+        f"RETURNING {returning}, previous.status AS previous_status), "
+        f"latest AS (SELECT {_SELECT_COLUMNS} FROM tasks "
+        f"WHERE id = ${id_param} AND NOT EXISTS (SELECT 1 FROM updated) FOR SHARE) "
+        f"SELECT {_SELECT_COLUMNS}, previous_status, TRUE AS applied FROM updated "
+        f"UNION ALL SELECT {_SELECT_COLUMNS}, NULL, FALSE FROM latest"
+    )
+
+
+def _compile_queries() -> dict[str, str]:
+    """
+    全クエリの生成
+
+    目的・理由:
+    - 頻出のSQLを列挙する（UPDATE 7通り × 3、一覧 4通り、検索 4通り）
+    - 一覧は既定の並び順・範囲条件なし・ステータス0/1件・全列の形状のみ
+      （fields指定の省略列・その他の条件・並び順はlist_query_nameで初回使用時に登録）
+    """
+    queries = {
+        "select_by_id": f"SELECT {_SELECT_COLUMNS} FROM tasks WHERE id = $1",
+        "select_by_ids": f"SELECT {_SELECT_COLUMNS} FROM tasks WHERE id = ANY($1::uuid[])",
+        "select_updated_at": "SELECT updated_at FROM tasks WHERE id = $1",
+        "select_recent": f"SELECT {_SELECT_COLUMNS} FROM tasks ORDER BY created_at DESC LIMIT 20",
+        "insert": (
+            "INSERT INTO tasks (title, description, status) VALUES ($1, $2, $3) "
+            f"RETURNING {_SELECT_COLUMNS}"
+        ),
+        # グループコミット（db/write_batcher.py）。IDはアプリ側で採番し、RETURNINGの行をIDで対応付ける
+        "insert_batch": (
+            "INSERT INTO tasks (id, title, description, status) "
+            "SELECT * FROM unnest($1::uuid[], $2::varchar[], $3::varchar[], $4::varchar[]) "
+            f"RETURNING {_SELECT_COLUMNS}"
+        ),
+        "insert_with_id": (
+            "INSERT INTO tasks (id, title, description, status) VALUES ($1, $2, $3, $4) "
+            f"RETURNING {_SELECT_COLUMNS}"
+        ),
+        "delete": "DELETE FROM tasks WHERE id = $1 RETURNING status",
+        "delete_if_match": "DELETE FROM tasks WHERE id = $1 AND updated_at = ANY($2::timestamptz[]) RETURNING status",
+        "count": "SELECT COUNT(*) FROM tasks",
+        "count_status": "SELECT COUNT(*) FROM tasks WHERE status = $1",
+        "export": f"SELECT {_SELECT_COLUMNS} FROM tasks",
+        "export_status": f"SELECT {_SELECT_COLUMNS} FROM tasks WHERE status = $1",
+        # 冪等キー（db/idempotency.py）。確保は期限切れの行のみ上書きし、処理中の行は確保側の終了まで待つ
+        "idempotency_select": (
+            "SELECT request_hash, status_code, response_body, etag FROM idempotency_keys "
+            "WHERE key = $1 AND expires_at > now()"
+        ),
+        "idempotency_claim": (
+            "INSERT INTO idempotency_keys (key, request_hash, expires_at) "
+            "VALUES ($1, $2, now() + make_interval(secs => $3)) "
+            "ON CONFLICT (key) DO UPDATE SET request_hash = EXCLUDED.request_hash, status_code = NULL, "
+            "response_body = NULL, etag = NULL, expires_at = EXCLUDED.expires_at "
+            "WHERE idempotency_keys.expires_at <= now() RETURNING key"
+        ),
+        "idempotency_store": (
+            "UPDATE idempotency_keys SET status_code = $2, response_body = $3, etag = $4 WHERE key = $1"
+        ),
+        "idempotency_purge": (
+            "WITH purged AS (DELETE FROM idempotency_keys WHERE key IN ("
+            "SELECT key FROM idempotency_keys WHERE expires_at <= now() LIMIT $1) RETURNING 1) "
+            "SELECT count(*) FROM purged"
+        ),
+    }
+    for status_count in (0, 1):
+        for has_cursor in (False, True):
+            name = _list_name(has_cursor, TASK_COLUMNS, status_count, (), DEFAULT_LIST_SORT)
+            queries[name] = list_sql(has_cursor, TASK_COLUMNS, status_count)
+    for has_status in (False, True):
+        for has_cursor in (False, True):
+            queries[search_query_name(has_status, has_cursor)] = search_sql(has_status, has_cursor)
+    for size in range(1, len(UPDATABLE_FIELDS) + 1):
+        for fields in combinations(UPDATABLE_FIELDS, size):
+            for versioned in (False, True):
+                queries[update_query_name(fields, versioned)] = _update_sql(fields, versioned)
+            queries[update_query_name(fields, False, compare_version=True)] = _compare_and_swap_sql(fields)
+    return queries
+
+
+# 目的・理由: クエリ名 → SQL（起動時に確定、一覧（省略列・条件・並び順）・件数の追加形状は初回使用時に追加）
+QUERIES: dict[str, str] = _compile_queries()
+
+# 目的・理由: 接続ごとに明示的にPREPAREするクエリ（起動時に確定したもの）
+# 前提条件・制約: 追加形状はasyncpgの文キャッシュ（接続ごとのLRU）で準備される
+_PREPARED_NAMES = frozenset(QUERIES)
+
+# ステートメント別の実行統計: {クエリ名: {"calls", "errors", "total_seconds", "max_seconds"}}
+_stats: dict[str, dict[str, Any]] = {
+    name: {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0} for name in QUERIES
+}
+_prepare_failures = 0
+
+
+def _register(name: str, sql: str) -> None:
+    """追加形状のクエリ登録（統計の枠も作成）"""
+    QUERIES[name] = sql
+    _stats[name] = {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+
+
+class TaskConnection(asyncpg.Connection):
+    """
+    プリペアドステートメントを保持する接続
+
+    目的・理由:
+    - 接続ごとのPreparedStatementを接続オブジェクト自身に持たせる
+      （プールのプロキシ経由でも属性参照が委譲されるため、そのまま参照できる）
+    - クエリ実行のtimeout未指定時は、リクエストの残り時間（期限）をtimeoutにする
+      （期限切れのリクエストのクエリはasyncpgがキャンセル要求を送って止める）
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.task_statements: dict[str, Any] = {}
+
+    async def execute(self, query: str, *args: Any, timeout: Optional[float] = None) -> str:
+        return await super().execute(query, *args, timeout=statement_timeout(timeout))
+
+    async def executemany(self, command: str, args: Any, *, timeout: Optional[float] = None) -> None:
+        return await super().executemany(command, args, timeout=statement_timeout(timeout))
+
+    async def fetch(self, query: str, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> list:
+        return await super().fetch(query, *args, timeout=statement_timeout(timeout), **kwargs)
+
+    async def fetchrow(self, query: str, *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> Any:
+        return await super().fetchrow(query, *args, timeout=statement_timeout(timeout), **kwargs)
+
+    async def fetchval(self, query: str, *args: Any, column: int = 0, timeout: Optional[float] = None) -> Any:
+        return await super().fetchval(query, *args, column=column, timeout=statement_timeout(timeout))
+
+    async def copy_records_to_table(self, table_name: str, *, timeout: Optional[float] = None, **kwargs: Any) -> str:
+        return await super().copy_records_to_table(table_name, timeout=statement_timeout(timeout), **kwargs)
+
+
+async def prepare_task_statements(conn: asyncpg.Connection) -> None:
+    """
+    接続プールのinitフック
+
+    目的・理由:
+    - 新しい接続の確立時に起動時に確定した全クエリをPREPAREする
+    - 失敗した場合（テーブル未作成等）は初回実行時のPREPAREに任せ、接続確立は妨げない
+
+    影響範囲:
+    - PostgreSQL（接続確立時にPREPAREを実行）
+    """
+    global _prepare_failures
+
+    statements = getattr(conn, "task_statements", None)
+    if statements is None:
+        return
+    try:
+        for name in _PREPARED_NAMES:
+            statements[name] = await conn.prepare(QUERIES[name])
+    except asyncpg.PostgresError as e:
+        _prepare_failures += 1
+        statements.clear()
+        print(f"⚠️ Task statement preparation deferred: {e}")
+
+
+async def _statement(conn: Any, name: str, refresh: bool = False) -> Optional[Any]:
+    """
+    接続のプリペアドステートメント取得
+
+    前提条件・制約:
+    - TaskConnection以外の接続、追加形状のクエリではNone（通常のクエリ実行にフォールバック）
+    - 未準備またはrefresh指定時はその場でPREPAREする
+    """
+    statements = getattr(conn, "task_statements", None)
+    if not isinstance(statements, dict) or name not in _PREPARED_NAMES:
+        return None
+    statement = statements.get(name)
+    if statement is None or refresh:
+        statement = statements[name] = await conn.prepare(QUERIES[name])
+    return statement
+
+
+async def _run(conn: Any, name: str, method: str, args: tuple) -> Any:
+    """
+    クエリ実行と統計記録
+
+    目的・理由:
+    - プリペアドステートメントがあればBind/Executeのみで実行する
+    - スキーマ変更で計画が無効になった場合（FeatureNotSupportedError）は再PREPAREして1回だけ再試行
+    - リクエストの残り時間（期限）をtimeoutにする（期限切れはasyncio.TimeoutError）
+    """
+    stats = _stats[name]
+    start = time.perf_counter()
+    try:
+        timeout = statement_timeout()
+        statement = await _statement(conn, name)
+        if statement is None:
+            return await getattr(conn, method)(QUERIES[name], *args, timeout=timeout)
+        try:
+            return await getattr(statement, method)(*args, timeout=timeout)
+        except asyncpg.FeatureNotSupportedError:
+            statement = await _statement(conn, name, refresh=True)
+            return await getattr(statement, method)(*args, timeout=timeout)
+    except Exception:
+        stats["errors"] += 1
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stats["calls"] += 1
+        stats["total_seconds"] += elapsed
+        stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+
+def sql(name: str) -> str:
+    """クエリ名のSQL（X-Rayのsanitized_query用）"""
+    return QUERIES[name]
+
+
+async def fetch(conn: Any, name: str, *args: Any) -> list:
+    """名前付きクエリの実行（全行）"""
+    return await _run(conn, name, "fetch", args)
+
+
+async def fetchrow(conn: Any, name: str, *args: Any) -> Optional[asyncpg.Record]:
+    """名前付きクエリの実行（1行）"""
+    return await _run(conn, name, "fetchrow", args)
+
+
+async def fetchval(conn: Any, name: str, *args: Any) -> Any:
+    """名前付きクエリの実行（1値）"""
+    return await _run(conn, name, "fetchval", args)
+
+
+async def cursor(conn: Any, name: str, *args: Any) -> Any:
+    """
+    名前付きクエリのサーバーサイドカーソル
+
+    前提条件・制約:
+    - トランザクション内で呼び出すこと
+    - 統計の所要時間はカーソルのオープンまで（以降の読み込みは含まない）
+    """
+    return await _run(conn, name, "cursor", args)
+
+
+def statement_stats() -> dict[str, Any]:
+    """
+    ステートメント別の実行統計
+
+    目的・理由:
+    - 呼び出し回数・エラー回数・平均/最大所要時間を内部APIで確認する
+
+    前提条件・制約:
+    - プロセス起動からの累計値（実行されていないステートメントは含めない）
+    """
+    statements = {}
+    for name, stats in _stats.items():
+        if not stats["calls"]:
+            continue
+        statements[name] = {
+            "calls": stats["calls"],
+            "errors": stats["errors"],
+            "mean_ms": stats["total_seconds"] * 1000 / stats["calls"],
+            "max_ms": stats["max_seconds"] * 1000,
+            "total_ms": stats["total_seconds"] * 1000,
+        }
+    return {
+        "registered": len(QUERIES),
+        "prepared": len(_PREPARED_NAMES),
+        "prepare_failures": _prepare_failures,
+        "statements": statements,
+    }
@@ -0,0 +1,227 @@
+"""
+タスク作成のグループコミット（同時作成の1文INSERTへのまとめ込み）
+
+目的・理由:
+- 書き込みの集中時、タスク作成1件ごとに接続を取得してコミットしており、
+  スループットがPostgreSQLの処理能力ではなくコミット待ち（WAL書き込み）と接続プールのサイズで頭打ちになる
+- 同時に届いた作成を数ミリ秒（または最大件数まで）集め、1文の複数行INSERT ... RETURNINGで登録する
+  （接続取得・往復・コミットがバッチ1回で済む）
+- 各呼び出し元には自分の行を返す（IDをアプリ側で採番し、RETURNINGの行をIDで対応付ける）
+
+影響範囲:
+- タスク作成API（Idempotency-Keyなし、TASK_INSERT_BATCH_ENABLED=true時）
+- PostgreSQL（INSERT INTO tasks ... SELECT FROM unnest(...)、変更イベントのNOTIFY）
+
+前提条件・制約:
+- 既定は無効（1件ずつINSERT）。有効時は1件あたり最大TASK_INSERT_BATCH_MAX_WAIT_MSの待ちが加わる
+- バッチは1文（1トランザクション）のため、1行でも制約違反があれば全体が失敗する。
+  その場合は1件ずつINSERTし直し、違反した行の呼び出し元にのみ例外を返す
+- バッチのINSERTはリクエストの期限（コンテキスト変数）を引き継がない（複数リクエストで共有するため）。
+  呼び出し元の待ちのみ自分の期限で打ち切る（打ち切った場合も行は作成されうる）
+"""
+
+import asyncio
+import contextvars
+import os
+import uuid
+from typing import Any, Optional
+
+import asyncpg
+
+from db import task_repository
+from db.postgres import get_db_pool
+from db.task_events import publish_task_events
+from middleware.deadline import statement_timeout
+
+
+# 目的・理由: グループコミットの有効/無効
+# 影響範囲: タスク作成API（Idempotency-Keyなし）
+# 前提条件・制約: 環境変数TASK_INSERT_BATCH_ENABLEDがtrueの場合のみ有効
+TASK_INSERT_BATCH_ENABLED = os.getenv("TASK_INSERT_BATCH_ENABLED", "false").lower() == "true"
+
+# 目的・理由: 最初の作成から書き込むまでの最大待ち時間（ミリ秒）。コミット1回分程度にする
+# 影響範囲: グループコミット有効時のタスク作成の応答時間
+# 前提条件・制約: 環境変数TASK_INSERT_BATCH_MAX_WAIT_MSで変更可能
+TASK_INSERT_BATCH_MAX_WAIT_MS = float(os.getenv("TASK_INSERT_BATCH_MAX_WAIT_MS", "2"))
+
+# 目的・理由: 1文でINSERTする最大件数（達した時点で待たずに書き込む）
+# 影響範囲: グループコミット有効時のINSERT 1文あたりの行数
+# 前提条件・制約: 環境変数TASK_INSERT_BATCH_MAX_SIZEで変更可能
+TASK_INSERT_BATCH_MAX_SIZE = int(os.getenv("TASK_INSERT_BATCH_MAX_SIZE", "100"))
+
+# バッチの件数分布のバケット（件数の上限）
+BATCH_SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500)
+
+
+class _PendingInsert:
+    """書き込み待ちの作成1件（採番済みのIDと、行を受け取るFuture）"""
+
+    __slots__ = ("id", "values", "future")
+
+    def __init__(self, values: tuple[str, Optional[str], str]) -> None:
+        self.id = uuid.uuid4()
+        self.values = values
+        self.future: "asyncio.Future[tuple[asyncpg.Record, int]]" = asyncio.get_running_loop().create_future()
+
+
+class InsertBatcher:
+    """
+    タスク作成のバッチャー
+
+    目的・理由:
+    - insert()の呼び出しを待ち行列に集め、最大件数に達するか最大待ち時間が経過したら1文で書き込む
+    - 書き込み（flush）は呼び出し元と別のタスクで実行し、呼び出し元がキャンセルされても他の行の書き込みを止めない
+
+    前提条件・制約:
+    - asyncioの単一スレッド上で使用すること（ロック不要）
+    - 書き込みタスクは空のコンテキストで実行する（最初の呼び出し元の期限・接続取得の記録を引き継がない）
+    - pool_getter省略時はプライマリの接続プール（get_db_pool）
+    """
+
+    def __init__(self, max_size: int, max_wait_ms: float, pool_getter: Optional[Any] = None) -> None:
+        self.max_size = max(1, max_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self._pool_getter = pool_getter
+        self._pending: list[_PendingInsert] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: set["asyncio.Task[None]"] = set()
+        self.batches = 0
+        self.rows = 0
+        self.max_batch = 0
+        self.fallbacks = 0
+        self.failed = 0
+        self._size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    async def insert(self, title: str, description: Optional[str], status: str) -> tuple[asyncpg.Record, int]:
+        """
+        タスク作成（書き込みまで待つ）
+
+        目的・理由:
+        - 待ち行列に加え、自分の行が書き込まれたら (行, 同じ文で書き込んだ件数) を返す
+
+        前提条件・制約:
+        - 呼び出し元のリクエストの期限で待ちを打ち切る（asyncio.TimeoutError）
+        - 行の制約違反はasyncpgの例外をそのまま送出する
+        """
+        pending = _PendingInsert((title, description, status))
+        self._pending.append(pending)
+        if len(self._pending) >= self.max_size:
+            self._start_flush()
+        elif self._timer is None:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.max_wait, self._start_flush, context=contextvars.Context())
+
+        # shieldで待つ（呼び出し元のキャンセル・期限切れでFutureをキャンセルしない）
+        return await asyncio.wait_for(asyncio.shield(pending.future), statement_timeout())
+
+    def _start_flush(self) -> None:
+        """待ち行列を切り出し、書き込みタスクを開始する"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending[: self.max_size], self._pending[self.max_size:]
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._flush(batch), context=contextvars.Context())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+        if self._pending:
+            self._start_flush()
+
+    async def _flush(self, batch: list[_PendingInsert]) -> None:
+        """
+        バッチの書き込み
+
+        目的・理由:
+        - IDを含む列ごとの配列をunnestで展開し、1文でINSERTする
+        - 1文のINSERTが制約違反等で失敗した場合は、1件ずつINSERTし直して失敗を該当行に限定する
+        - 接続の取得失敗・タイムアウト等は全件に同じ例外を返す
+        """
+        try:
+            pool = await (self._pool_getter or get_db_pool)()
+            async with pool.acquire() as conn:
+                try:
+                    rows = await task_repository.fetch(
+                        conn,
+                        "insert_batch",
+                        [pending.id for pending in batch],
+                        [pending.values[0] for pending in batch],
+                        [pending.values[1] for pending in batch],
+                        [pending.values[2] for pending in batch],
+                    )
+                except asyncpg.PostgresError:
+                    if len(batch) == 1:
+                        raise
+                    self.fallbacks += 1
+                    await self._insert_each(conn, batch)
+                    return
+                await publish_task_events(conn, "created", rows)
+            self._record(len(batch))
+            by_id = {row["id"]: row for row in rows}
+            for pending in batch:
+                if not pending.future.done():
+                    pending.future.set_result((by_id[pending.id], len(batch)))
+        except Exception as e:
+            for pending in batch:
+                if not pending.future.done():
+                    self.failed += 1
+                    pending.future.set_exception(e)
+
+    async def _insert_each(self, conn: Any, batch: list[_PendingInsert]) -> None:
+        """1件ずつのINSERT（バッチの失敗時）"""
+        rows = []
+        for pending in batch:
+            try:
+                row = await task_repository.fetchrow(conn, "insert_with_id", pending.id, *pending.values)
+            except asyncpg.PostgresError as e:
+                self.failed += 1
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+                continue
+            rows.append(row)
+            self._record(1)
+            if not pending.future.done():
+                pending.future.set_result((row, 1))
+        await publish_task_events(conn, "created", rows)
+
+    def _record(self, size: int) -> None:
+        """書き込んだバッチの集計"""
+        self.batches += 1
+        self.rows += size
+        self.max_batch = max(self.max_batch, size)
+        index = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound), len(BATCH_SIZE_BUCKETS))
+        self._size_counts[index] += 1
+
+    async def close(self) -> None:
+        """待ち行列と書き込み中のバッチの完了を待つ（アプリケーション終了時）"""
+        if self._pending:
+            self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict[str, Any]:
+        """
+        統計情報
+
+        目的・理由:
+        - バッチ数・行数・平均/最大件数・件数分布から、まとめ込みの効果と待ち時間の設定を確認する
+        """
+        labels = [f"le_{bound}" for bound in BATCH_SIZE_BUCKETS] + ["gt_" + str(BATCH_SIZE_BUCKETS[-1])]
+        return {
+            "enabled": TASK_INSERT_BATCH_ENABLED,
+            "max_size": self.max_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": len(self._pending),
+            "in_flight": len(self._flushes),
+            "batches": self.batches,
+            "rows": self.rows,
+            "avg_batch_size": round(self.rows / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch,
+            "batch_sizes": dict(zip(labels, self._size_counts)),
+            "fallbacks": self.fallbacks,
+            "failed_rows": self.failed,
+        }
+
+
+# グローバルバッチャー
+insert_batcher = InsertBatcher(TASK_INSERT_BATCH_MAX_SIZE, TASK_INSERT_BATCH_MAX_WAIT_MS)
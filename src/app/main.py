@@ -16,6 +16,7 @@ FastAPIエントリポイント
 - 環境変数が設定されていること（DATABASE_URL等）
 """
 
+import asyncio
 import os
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
@@ -23,8 +24,14 @@ from typing import AsyncGenerator
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api import health, tasks
-from db.postgres import init_db, close_db
+from api import bulk, health, internal, tasks
+from db.idempotency import start_idempotency_cleanup, stop_idempotency_cleanup
+from db.partitions import start_partition_maintenance, stop_partition_maintenance
+from db.postgres import init_db, close_db, get_database_url, get_db_pool
+from db.task_cache import start_invalidation_listener, stop_invalidation_listener
+from db.task_events import start_event_listener, stop_event_listener
+from db.write_batcher import insert_batcher
+from middleware.deadline import DeadlineMiddleware, deadline_exceeded_handler
 from middleware.xray import XRayMiddleware
 
 
@@ -34,19 +41,30 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     アプリケーションのライフサイクル管理
 
     目的・理由:
-    - アプリ起動時にDB接続プールを初期化
-    - アプリ終了時にDB接続を適切にクローズ
+    - アプリ起動時にDB接続プール、タスクキャッシュの無効化リスナー、タスク変更イベントのリスナー、
+      冪等キーの定期削除、tasksパーティションの定期処理（作成・保持期間の適用）を初期化
+    - アプリ終了時に書き込み待ちのタスク作成（グループコミット）を完了させ、DB接続を適切にクローズ
 
     影響範囲:
     - PostgreSQL接続プール（asyncpg）
+    - LISTEN専用接続（タスクキャッシュ無効化、タスク変更イベント）
 
     前提条件・制約:
     - DATABASE_URL環境変数が設定されていること
     """
     # 起動時処理
     await init_db()
+    await start_invalidation_listener(get_database_url())
+    await start_event_listener(get_database_url())
+    await start_idempotency_cleanup(await get_db_pool())
+    await start_partition_maintenance(await get_db_pool())
     yield
-    # 終了時処理
+    # 終了時処理（書き込み待ちのタスク作成を先に完了させる）
+    await insert_batcher.close()
+    await stop_partition_maintenance()
+    await stop_idempotency_cleanup()
+    await stop_event_listener()
+    await stop_invalidation_listener()
     await close_db()
 
 
@@ -65,14 +83,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Idempotent-Replayed"],  # 条件付きリクエスト（If-None-Match/If-Match）・冪等キー用
 )
 
 # X-Rayミドルウェア（AWS X-Rayトレーシング）
 app.add_middleware(XRayMiddleware)
 
+# リクエスト期限ミドルウェア（最も外側。期限到達・クライアント切断で処理をキャンセル）
+app.add_middleware(DeadlineMiddleware)
+
+# DB呼び出し・接続取得のタイムアウトは504
+app.add_exception_handler(asyncio.TimeoutError, deadline_exceeded_handler)
+
 # ルーター登録
 app.include_router(health.router)
 app.include_router(tasks.router)
+app.include_router(bulk.router)
+if internal.ENABLE_INTERNAL_API:
+    app.include_router(internal.router)
 
 
 @app.get("/")
@@ -0,0 +1,292 @@
+"""
+リクエスト期限（デッドライン）ミドルウェア
+
+目的・理由:
+- 接続プールのcommand_timeout（60秒）しか上限がなく、ALBが既に504を返したリクエストでも
+  DB処理（pg_sleep等）が最大60秒接続を占有し続けていた
+- X-Request-Timeoutヘッダー（秒）またはルートごとの既定値からリクエストの期限を決め、
+  DB呼び出し（asyncpgのtimeout）・接続取得・外部API呼び出し（httpxのtimeout）へ残り時間を渡す
+- 期限到達時、またはクライアント切断時は処理中のタスクをキャンセルし、接続を解放する
+
+影響範囲:
+- すべてのAPIエンドポイント（ストリーム送出のエンドポイントを除く）
+- DB呼び出し（TaskConnection・タスククエリ・接続取得）、外部API呼び出し
+- X-Rayトレース（タイムアウトした処理のサブセグメントはfault、セグメントにdeadlineアノテーション）
+
+前提条件・制約:
+- 純粋なASGIミドルウェアとして最も外側（X-Rayミドルウェアより外）に登録すること
+  （受信チャネルを1か所で読み、切断を検知するため）
+- DBのタイムアウト時、asyncpgはサーバーへキャンセル要求を送る（サーバー側の実行も止まる）
+- time.sleep等、イベントループをブロックする処理はキャンセルできない
+"""
+
+import asyncio
+import os
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from aws_xray_sdk.core import xray_recorder
+
+
+# 目的・理由: リクエストの期限の既定値（秒）。ALBのアイドルタイムアウト（60秒）より短くする
+# 影響範囲: ROUTE_TIMEOUT_SECONDSに該当しないエンドポイント
+# 前提条件・制約: 環境変数REQUEST_TIMEOUT_SECONDSで変更可能
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "30"))
+
+# 目的・理由: X-Request-Timeoutヘッダーで指定できる期限の上限（秒）
+# 影響範囲: X-Request-Timeoutヘッダー付きのリクエスト
+# 前提条件・制約: 環境変数REQUEST_TIMEOUT_MAX_SECONDSで変更可能（超える値は上限に丸める）
+REQUEST_TIMEOUT_MAX_SECONDS = float(os.getenv("REQUEST_TIMEOUT_MAX_SECONDS", "60"))
+
+# 目的・理由: ルートごとの期限の既定値（秒、パスの前方一致・最長一致）。Noneは期限なし
+# 影響範囲: 該当するエンドポイント
+# 前提条件・制約: 期限なしのルート（ストリーム送出）はX-Request-Timeoutヘッダーも無視する
+ROUTE_TIMEOUT_SECONDS: dict[str, Optional[float]] = {
+    "/health": 5.0,
+    "/tasks/bulk": 60.0,  # 一括作成・一括更新・一括削除（チャンク分割で長くなりうる）
+    "/tasks/export": None,  # ストリーム送出（所要時間はテーブルサイズに比例）
+    "/tasks/stream": None,  # Server-Sent Events（クライアント切断まで継続）
+}
+
+# 目的・理由: 期限ヘッダー名
+REQUEST_TIMEOUT_HEADER = b"x-request-timeout"
+
+# 目的・理由: 期限到達からタスクをキャンセルするまでの猶予（秒）
+# 前提条件・制約: DB呼び出し等のタイムアウト（期限ちょうど）を先に発生させ、例外ハンドラーで504を返すため
+CANCEL_GRACE_SECONDS = 0.25
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """リクエストの期限切れ（DB呼び出し・接続取得の前に残り時間がない）"""
+
+
+class RequestDeadline:
+    """
+    リクエスト単位の期限
+
+    目的・理由:
+    - 期限（イベントループの時刻）と、キャンセルした理由（exceeded/client_disconnected）を保持する
+    - コンテキスト変数で共有し、エンドポイントが別タスクで動いても同じオブジェクトを参照する
+    """
+
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self.expires_at = asyncio.get_running_loop().time() + timeout
+        self.cancel_reason: Optional[str] = None
+
+    def remaining(self) -> float:
+        return self.expires_at - asyncio.get_running_loop().time()
+
+
+_request_deadline: ContextVar[Optional[RequestDeadline]] = ContextVar("request_deadline", default=None)
+
+
+def current_deadline() -> Optional[RequestDeadline]:
+    """現在のリクエストの期限（ミドルウェア外・期限なしのルートではNone）"""
+    return _request_deadline.get()
+
+
+def statement_timeout(timeout: Optional[float] = None) -> Optional[float]:
+    """
+    DB呼び出しのタイムアウト（秒）
+
+    目的・理由:
+    - 指定値とリクエストの残り時間の小さい方を返す（どちらもなければNone = command_timeout）
+
+    前提条件・制約:
+    - 残り時間がない場合はDeadlineExceeded（DBへ送る前に打ち切る）
+    """
+    deadline = _request_deadline.get()
+    if deadline is None:
+        return timeout
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"request deadline of {deadline.timeout:g}s exceeded")
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def outbound_timeout(timeout: float) -> float:
+    """
+    外部API呼び出しのタイムアウト（秒）
+
+    目的・理由:
+    - 外部APIの既定のタイムアウトとリクエストの残り時間の小さい方を返す
+    """
+    remaining = statement_timeout(timeout)
+    return timeout if remaining is None else remaining
+
+
+def _route_timeout(path: str) -> tuple[bool, Optional[float]]:
+    """ルートの期限の既定値（戻り値は (ルート定義に該当したか, 秒)）"""
+    matches = [prefix for prefix in ROUTE_TIMEOUT_SECONDS if path.startswith(prefix)]
+    if not matches:
+        return False, REQUEST_TIMEOUT_SECONDS
+    return True, ROUTE_TIMEOUT_SECONDS[max(matches, key=len)]
+
+
+def request_timeout(scope: Scope) -> Optional[float]:
+    """
+    リクエストの期限（秒）
+
+    目的・理由:
+    - X-Request-Timeoutヘッダーがあればその値（上限で丸める）、なければルートの既定値
+
+    前提条件・制約:
+    - ヘッダーが正の数でない場合はValueError
+    """
+    matched, timeout = _route_timeout(scope["path"])
+    if matched and timeout is None:
+        return None
+    header = next((value for name, value in scope["headers"] if name == REQUEST_TIMEOUT_HEADER), None)
+    if header is None:
+        return timeout
+    try:
+        requested = float(header.decode("latin-1"))
+    except ValueError:
+        requested = 0.0
+    if not 0 < requested < float("inf"):
+        raise ValueError("X-Request-Timeout must be a positive number of seconds")
+    return min(requested, REQUEST_TIMEOUT_MAX_SECONDS)
+
+
+def _error_response(status_code: int, code: str, message: str) -> JSONResponse:
+    """HTTPExceptionと同じ形式のエラーレスポンス"""
+    return JSONResponse(status_code=status_code, content={"detail": {"error": {"code": code, "message": message}}})
+
+
+async def deadline_exceeded_handler(request: Request, exc: Exception) -> JSONResponse:
+    """
+    タイムアウト例外のハンドラー
+
+    目的・理由:
+    - DB呼び出し・接続取得のタイムアウト（asyncio.TimeoutError）を504にする
+    - X-Rayセグメントにdeadlineアノテーションを付ける（タイムアウトしたサブセグメントはfault記録済み）
+
+    前提条件・制約:
+    - main.pyでasyncio.TimeoutErrorに対して登録する
+    """
+    segment = xray_recorder.current_segment()
+    if segment is not None:
+        segment.put_annotation("deadline", "exceeded")
+    deadline = _request_deadline.get()
+    message = f"request deadline of {deadline.timeout:g}s exceeded" if deadline is not None else "operation timed out"
+    return _error_response(504, "DEADLINE_EXCEEDED", message)
+
+
+class _ReceiveWatcher:
+    """
+    受信チャネルの監視
+
+    目的・理由:
+    - 受信チャネルを自分だけが読み、アプリケーションには1件ずつ受け渡す（バッファは1件分）
+    - リクエスト本文を読み終えた後も読み続け、http.disconnectで切断を検知する
+    - 切断時は未読の本文を捨てて切断を受け渡す（本文を読まないエンドポイント（GET等）では
+      受信済みのhttp.requestがバッファに残るため、切断をバッファへ入れようとすると待ち続けてしまう）
+
+    前提条件・制約:
+    - 本文が複数のメッセージに分かれる場合、アプリケーションが本文を読み終えるまで切断は検知できない
+    """
+
+    def __init__(self, receive: Receive) -> None:
+        self._receive = receive
+        self._queue: "asyncio.Queue[Message]" = asyncio.Queue(maxsize=1)
+        self.disconnected = False
+
+    async def run(self) -> None:
+        while True:
+            message = await self._receive()
+            if message["type"] == "http.disconnect":
+                self.disconnected = True
+                while not self._queue.empty():
+                    self._queue.get_nowait()
+                self._queue.put_nowait(message)
+                return
+            await self._queue.put(message)
+
+    async def receive(self) -> Message:
+        if self.disconnected and self._queue.empty():
+            return {"type": "http.disconnect"}
+        return await self._queue.get()
+
+
+class DeadlineMiddleware:
+    """
+    リクエスト期限ミドルウェア
+
+    目的・理由:
+    - 期限をコンテキスト変数に設定してアプリケーションを別タスクで実行し、
+      期限到達（+猶予）・クライアント切断のいずれか早い方でタスクをキャンセルする
+    - 期限到達時、レスポンス未送信なら504を返す
+
+    影響範囲:
+    - すべてのAPIエンドポイント（期限なしのルートを除く）
+
+    前提条件・制約:
+    - レスポンス送信完了後の切断（keep-aliveの終了等）ではキャンセルしない（BackgroundTasksを止めない）
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            timeout = request_timeout(scope)
+        except ValueError as e:
+            await _error_response(400, "VALIDATION_ERROR", str(e))(scope, receive, send)
+            return
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        deadline = RequestDeadline(timeout)
+        token = _request_deadline.set(deadline)
+        response = {"started": False, "complete": False}
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["started"] = True
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                response["complete"] = True
+            await send(message)
+
+        watcher = _ReceiveWatcher(receive)
+        watch_task = asyncio.create_task(watcher.run())
+        app_task = asyncio.create_task(self.app(scope, watcher.receive, send_wrapper))
+        try:
+            pending = {app_task, watch_task}
+            while not app_task.done():
+                remaining = max(deadline.remaining() + CANCEL_GRACE_SECONDS, 0)
+                done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    deadline.cancel_reason = "exceeded"
+                    break
+                if watch_task in done and not response["complete"] and watcher.disconnected:
+                    deadline.cancel_reason = "client_disconnected"
+                    break
+
+            if deadline.cancel_reason is not None:
+                app_task.cancel()
+                try:
+                    await app_task
+                except asyncio.CancelledError:
+                    pass
+                print(f"⏱️ Request cancelled ({deadline.cancel_reason}): {scope['method']} {scope['path']}")
+                if deadline.cancel_reason == "exceeded" and not response["started"]:
+                    message = f"request deadline of {deadline.timeout:g}s exceeded"
+                    await _error_response(504, "DEADLINE_EXCEEDED", message)(scope, receive, send)
+                return
+
+            await app_task
+        finally:
+            watch_task.cancel()
+            if not app_task.done():
+                app_task.cancel()
+            _request_deadline.reset(token)
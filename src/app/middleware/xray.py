@@ -5,6 +5,8 @@ X-Rayミドルウェア
 - FastAPIリクエストをX-Rayでトレーシング
 - ALBから送信されるX-Amzn-Trace-Idヘッダーを読み取り、トレースを継続
 - カスタム属性（Annotations/Metadata）を追加
+- DB接続の取得回数・待ち時間・接続プールの状態をメタデータ（db_pool）に記録
+- 期限切れ・クライアント切断でキャンセルされたリクエストをfaultとして記録（deadlineアノテーション）
 
 影響範囲:
 - すべてのAPIエンドポイント
@@ -15,6 +17,7 @@ X-Rayミドルウェア
 - 環境変数ENVIRONMENT, VERSIONが設定されていること（任意）
 """
 
+import asyncio
 import os
 from typing import Callable
 
@@ -23,6 +26,9 @@ from starlette.middleware.base import BaseHTTPMiddleware
 
 from aws_xray_sdk.core import xray_recorder
 
+from db.pool_manager import track_pool_usage
+from middleware.deadline import current_deadline
+
 
 class XRayMiddleware(BaseHTTPMiddleware):
     """
@@ -80,6 +86,9 @@ class XRayMiddleware(BaseHTTPMiddleware):
             sampling=self._extract_sampling(trace_header) if trace_header else 1,
         )
 
+        # エンドポイントでの接続取得の集計
+        pool_usage = track_pool_usage()
+
         try:
             # カスタム属性（Annotations）
             segment.put_annotation("environment", os.environ.get("ENVIRONMENT", "development"))
@@ -112,12 +121,24 @@ class XRayMiddleware(BaseHTTPMiddleware):
 
             return response
 
+        except asyncio.CancelledError:
+            # 期限切れ・クライアント切断によるキャンセル（DeadlineMiddleware）
+            deadline = current_deadline()
+            reason = deadline.cancel_reason if deadline is not None else None
+            segment.put_annotation("deadline", reason or "cancelled")
+            segment.add_fault_flag()
+            raise
+
         except Exception as e:
             # エラー情報をX-Rayに記録
             segment.put_metadata("error", {"message": str(e), "type": type(e).__name__})
             raise
 
         finally:
+            # 接続プールのメタデータ（接続を取得したリクエストのみ）
+            if pool_usage["acquires"]:
+                segment.put_metadata("db_pool", pool_usage)
+
             # X-Rayセグメント終了
             xray_recorder.end_segment()
 
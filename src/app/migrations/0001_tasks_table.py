@@ -0,0 +1,45 @@
+"""
+tasksテーブル（created_atの月次パーティション）
+
+目的・理由:
+- 以前の起動時の自動作成（init_db）と同じ最終形にする。既存のデータベースにも適用できるよう各文を冪等にする
+  （IF NOT EXISTS、既存の単一テーブルは行を移さずパーティション化）
+- 一覧用の複合インデックスで置き換えた単一列インデックスは、パーティション化の前に削除する
+  （変換時に_legacy付きの名前で残らないようにする）
+
+前提条件・制約:
+- トランザクション外で実行する（変換の範囲の検査・一意インデックスの作成を、読み書きを止めずに行うため）。
+  途中で失敗した場合は次回に最初から再実行する
+- 変換した場合のみ、インデックスを親テーブルに作成する。既存テーブルの同じ名前のインデックス（_legacy付き）は
+  作成せずに接続され、新しい（空の）パーティションの作成は一瞬で終わる。変換しない場合は0002でオンラインに作成する
+"""
+
+from db.migrate import create_index_concurrently
+from db.partitions import TASKS_TABLE_DDL, convert_to_partitioned, ensure_partitions
+from db.task_repository import LIST_INDEXES, SEARCH_CONFIG, SEARCH_INDEXES, SUPERSEDED_INDEXES
+
+TRANSACTION = False
+
+
+async def upgrade(conn):
+    await conn.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    await conn.execute(TASKS_TABLE_DDL)
+
+    # 以前の単一テーブルに後から追加した列（パーティション化の前に親テーブルと列を揃える）
+    await conn.execute("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;")
+    await conn.execute(f"""
+        ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A')
+                || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B')
+            ) STORED;
+    """)
+
+    for name in SUPERSEDED_INDEXES:
+        await conn.execute(f"DROP INDEX IF EXISTS {name};")
+        await conn.execute(f"DROP INDEX IF EXISTS {name}_legacy;")
+
+    if await convert_to_partitioned(conn):
+        for name, definition in LIST_INDEXES + SEARCH_INDEXES:
+            await create_index_concurrently(conn, name, "tasks", definition)
+    await ensure_partitions(conn)
@@ -0,0 +1,20 @@
+"""
+tasksのインデックス（一覧用の複合インデックス、全文検索・pg_trgmのGIN）
+
+目的・理由:
+- 書き込みを止めずに作成する（パーティションごとのCREATE INDEX CONCURRENTLY）
+- 作成済みのインデックス（以前の起動時の自動作成、0001での変換時の作成）は何もしない
+
+前提条件・制約:
+- トランザクション外で実行する。途中で失敗した場合は次回に最初から再実行する（作成済みのものは飛ばす）
+"""
+
+from db.migrate import create_index_concurrently
+from db.task_repository import LIST_INDEXES, SEARCH_INDEXES
+
+TRANSACTION = False
+
+
+async def upgrade(conn):
+    for name, definition in LIST_INDEXES + SEARCH_INDEXES:
+        await create_index_concurrently(conn, name, "tasks", definition)
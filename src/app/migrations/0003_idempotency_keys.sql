@@ -0,0 +1,13 @@
+-- 冪等キー（POST /tasksのIdempotency-Key）
+-- キーと応答を保存し、同じキーの再送には保存済みの応答を返す（db/idempotency.py）
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key VARCHAR(255) PRIMARY KEY,
+    request_hash BYTEA NOT NULL,
+    status_code SMALLINT,
+    response_body BYTEA,
+    etag VARCHAR(100),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+-- 期限切れキーの定期削除用
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
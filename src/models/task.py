@@ -91,14 +91,15 @@ class TaskListResponse(BaseModel):
     タスク一覧レスポンスモデル
 
     目的: GET /tasks のレスポンス
-    理由: ページネーション情報を含める
+    理由: ページネーション情報を含める（next_cursorは次ページのカーソル）
     影響範囲: GET /tasks
-    前提条件: なし
+    前提条件: 次ページがない場合next_cursorはNone
     """
     tasks: list[TaskResponse]
     total: int
     limit: int
     offset: int
+    next_cursor: Optional[str] = None
 
 
 class ErrorResponse(BaseModel):